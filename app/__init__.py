@@ -30,8 +30,8 @@ def create_app():
         app.config['DEBUG'] = False
         # Production file paths
         app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', os.path.join(os.getcwd(), 'static', 'uploads'))
-        app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'filesystem')
-        app.config['SESSION_FILE_DIR'] = os.environ.get('SESSION_FILE_DIR', '/tmp/flask_sessions')
+        # Shared by every worker and instance (see app.sessions)
+        app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'sqlalchemy')
         app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
     else:
         # Development configuration
@@ -40,12 +40,30 @@ def create_app():
         app.config['DEBUG'] = True
         # Development file paths
         app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), '..', 'static', 'uploads')
-        app.config['SESSION_TYPE'] = 'filesystem'
-        app.config['SESSION_FILE_DIR'] = '/tmp/flask_sessions'
+        app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'cookie')
         app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
     
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool sizing and timeouts for this kind of database (see app.database)
+    from app.database import engine_options
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
+    app.config['SEARCH_ENGINE'] = os.environ.get('SEARCH_ENGINE', 'memory')
+    app.config['SESSION_SWEEP_SECONDS'] = int(os.environ.get('SESSION_SWEEP_SECONDS', 3600))
+    # Password KDF and the per-worker hashing pool (see app.passwords)
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 8))
+    # Lifetime of signed password reset links, in seconds (see app.reset_tokens)
+    app.config['RESET_TOKEN_MAX_AGE'] = int(os.environ.get('RESET_TOKEN_MAX_AGE', 3600))
+    # Outbound email delivery (see app.outbox); development prints emails by default
+    app.config['EMAIL_TRANSPORT'] = os.environ.get(
+        'EMAIL_TRANSPORT', 'formspree' if os.environ.get('FLASK_ENV') == 'production' else 'console')
+    app.config['EMAIL_WORKERS'] = int(os.environ.get('EMAIL_WORKERS', 2))
+    if os.environ.get('EMAIL_FILE_DIR'):
+        app.config['EMAIL_FILE_DIR'] = os.environ['EMAIL_FILE_DIR']
+    if os.environ.get('FORMSPREE_URL'):
+        app.config['FORMSPREE_URL'] = os.environ['FORMSPREE_URL']
 
     # Add custom Jinja2 filters to the app
     @app.template_filter('nl2br')
@@ -59,6 +77,10 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
     
+    # SQLite pragmas / Postgres settings on connect, and pool checkout timing
+    from app.database import engine_profiles
+    engine_profiles.init_app(app)
+    
     # Import models after db is initialized (to avoid circular imports)
     from app.models import User, JobPosting, Application
     
@@ -66,6 +88,14 @@ def create_app():
     from app.routes import main
     app.register_blueprint(main)
     
+    # Register maintenance commands for the flask CLI
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Hash passwords off the request threads
+    from app.passwords import passwords
+    passwords.init_app(app)
+    
     # Create tables and ensure admin user exists within app context
     with app.app_context():
         db.create_all()
@@ -74,6 +104,34 @@ def create_app():
         # Create default admin user if none exists
         create_default_admin()
     
+    # Set up database full-text search and build the in-memory job indexes for this worker
+    from app.fulltext import fulltext
+    from app.search import job_search
+    from app.autocomplete import job_suggestions
+    from app.fuzzy import fuzzy_search
+    from app.facets import job_facets
+    from app.fragments import job_fragments
+    from app.stats import system_stats
+    from app.presence import presence
+    from app.reporting import reporting
+    from app.activity import activity
+    from app.user_grid import user_grid
+    from app.outbox import email_outbox
+    from app.sessions import server_sessions
+    fulltext.init_app(app)
+    job_search.init_app(app)
+    job_suggestions.init_app(app)
+    fuzzy_search.init_app(app)
+    job_facets.init_app(app)
+    job_fragments.init_app(app)
+    system_stats.init_app(app)
+    presence.init_app(app)
+    reporting.init_app(app)
+    activity.init_app(app)
+    user_grid.init_app(app)
+    email_outbox.init_app(app)
+    server_sessions.init_app(app)
+    
     # Ensure uploads directory exists
     uploads_dir = os.path.join(app.static_folder, 'uploads')
     if not os.path.exists(uploads_dir):
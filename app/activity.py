@@ -0,0 +1,236 @@
+"""
+Append-only activity log behind the admin activity feeds.
+
+Routes call record_activity() after a change commits. Events are queued
+in process and written to activity_events in one multi-row INSERT once
+ACTIVITY_BATCH_SIZE are waiting or the oldest has waited
+ACTIVITY_FLUSH_SECONDS, so a request never pays for its own log row.
+Reading a feed flushes first, so a worker always sees its own events.
+Events still queued when a worker dies are lost; the log is for display.
+
+Rows are never updated. Old ones are removed by time, oldest first and in
+bounded batches, which keeps each delete short and maps directly onto
+dropping time partitions should the table be partitioned by occurred_at.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+# Flush the queue once this many events are waiting...
+ACTIVITY_BATCH_SIZE = 50
+
+# ...or once the oldest one has waited this long
+ACTIVITY_FLUSH_SECONDS = 5
+
+# Events older than this are pruned
+ACTIVITY_RETENTION_DAYS = 90
+
+# Rows removed per pruning statement
+PRUNE_BATCH_SIZE = 5000
+
+# How often a worker prunes on its own, in seconds
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+class ActivityLog:
+    """Per-worker queue of activity events and their batched writer"""
+
+    def __init__(self, batch_size=ACTIVITY_BATCH_SIZE, flush_seconds=ACTIVITY_FLUSH_SECONDS,
+                 retention_days=ACTIVITY_RETENTION_DAYS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._queue = []
+        self._oldest = None  # time.monotonic() of the oldest queued event
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+
+    def record(self, event_type, action, actor_id=None, actor_name=None, details=None, occurred_at=None):
+        with self._lock:
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append({
+                'occurred_at': occurred_at or datetime.utcnow(),
+                'event_type': event_type,
+                'action': action,
+                'actor_id': actor_id,
+                'actor_name': actor_name,
+                'details': (details or '')[:255] or None,
+            })
+
+    def flush_due(self):
+        with self._lock:
+            if not self._queue:
+                return False
+            return (len(self._queue) >= self.batch_size
+                    or time.monotonic() - self._oldest >= self.flush_seconds)
+
+    def flush(self):
+        """Write the queued events in one INSERT; returns how many were written"""
+        from app.models import db, ActivityEvent
+
+        with self._lock:
+            events, self._queue = self._queue, []
+            self._oldest = None
+        if not events:
+            return 0
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(ActivityEvent.__table__.insert(), events)
+        except Exception as e:
+            print(f"Error writing activity events: {e}")
+            # Put them back in front of anything queued meanwhile
+            with self._lock:
+                self._queue[:0] = events
+                self._oldest = time.monotonic()
+            return 0
+        return len(events)
+
+    def prune_due(self):
+        return time.monotonic() >= self._next_prune
+
+    def prune(self, older_than_days=None, max_batches=None):
+        """Delete events older than the retention period; returns how many
+
+        With max_batches, stops after that many batches and leaves the next
+        prune due at once, so a backlog drains a batch at a time.
+        """
+        from app.models import db, ActivityEvent
+
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+        days = self.retention_days if older_than_days is None else older_than_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        events = ActivityEvent.__table__
+
+        removed = 0
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                # Oldest events first, so every batch is a range at the start of the index
+                batch = db.select(events.c.id).where(events.c.occurred_at < cutoff)\
+                    .order_by(events.c.occurred_at, events.c.id).limit(PRUNE_BATCH_SIZE)
+                with db.engine.begin() as connection:
+                    deleted = connection.execute(
+                        events.delete().where(events.c.id.in_(batch.scalar_subquery()))
+                    ).rowcount
+                removed += deleted
+                batches += 1
+                if deleted < PRUNE_BATCH_SIZE:
+                    return removed
+            # More old events may remain; prune again on the next request
+            self._next_prune = time.monotonic()
+            return removed
+        except Exception as e:
+            print(f"Error pruning activity events: {e}")
+            return removed
+
+
+class Activity:
+    """Flask extension that queues activity events and writes them in batches"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        log = ActivityLog(
+            batch_size=app.config.get('ACTIVITY_BATCH_SIZE', ACTIVITY_BATCH_SIZE),
+            flush_seconds=app.config.get('ACTIVITY_FLUSH_SECONDS', ACTIVITY_FLUSH_SECONDS),
+            retention_days=app.config.get('ACTIVITY_RETENTION_DAYS', ACTIVITY_RETENTION_DAYS)
+        )
+        app.extensions['activity_log'] = log
+
+        @app.teardown_request
+        def flush_activity(exc=None):
+            if log.flush_due():
+                log.flush()
+            # One bounded batch per request; `flask prune-activity` clears a backlog in one go
+            if log.prune_due():
+                log.prune(max_batches=1)
+
+        def flush_at_exit():
+            with app.app_context():
+                log.flush()
+
+        atexit.register(flush_at_exit)
+
+
+activity = Activity()
+
+
+def get_activity_log():
+    """Get the activity log for the current app"""
+    return current_app.extensions.get('activity_log')
+
+
+def record_activity(event_type, action, actor_id=None, actor_name=None, details=None):
+    """Queue an activity event; event_type is 'user', 'job', 'application' or 'admin'"""
+    log = get_activity_log()
+    if log is not None:
+        log.record(event_type, action, actor_id=actor_id, actor_name=actor_name, details=details)
+
+
+def get_recent_activity(limit=10, event_types=None):
+    """Newest events first, optionally of the given types only
+
+    One range read on the occurred_at index (or the event_type,
+    occurred_at index when filtering by type).
+    """
+    from app.models import ActivityEvent
+
+    log = get_activity_log()
+    if log is not None:
+        log.flush()
+
+    query = ActivityEvent.query
+    if event_types:
+        query = query.filter(ActivityEvent.event_type.in_(event_types))
+    return query.order_by(ActivityEvent.occurred_at.desc(), ActivityEvent.id.desc()).limit(limit).all()
+
+
+def seed_activity(limit=20):
+    """Fill an empty log with the latest users, jobs and applications
+
+    So the feeds are not blank right after the table is created. Only reads
+    the newest ``limit`` rows of each table. Run once from init_production.py
+    or ``flask seed-activity``, never from worker start-up, where two workers
+    could both find the log empty and seed it twice.
+    """
+    from app.models import db, User, JobPosting, Application, ActivityEvent
+
+    if db.session.query(ActivityEvent.id).first() is not None:
+        return 0
+
+    events = []
+    for user in db.session.query(User.id, User.username, User.role, User.created_at)\
+            .order_by(User.created_at.desc()).limit(limit):
+        events.append({
+            'occurred_at': user.created_at, 'event_type': 'user', 'action': 'New User',
+            'actor_id': user.id, 'actor_name': user.username, 'details': f"Registered as {user.role.title()}",
+        })
+    for job in db.session.query(JobPosting.title, JobPosting.posted_date, User.id, User.username)\
+            .outerjoin(User, JobPosting.employer_id == User.id)\
+            .order_by(JobPosting.posted_date.desc()).limit(limit):
+        events.append({
+            'occurred_at': job.posted_date, 'event_type': 'job', 'action': 'Job Posted',
+            'actor_id': job.id, 'actor_name': job.username, 'details': f"{job.title} position",
+        })
+    for application in db.session.query(Application.application_date, JobPosting.title, User.id, User.username)\
+            .join(JobPosting, Application.job_id == JobPosting.id)\
+            .join(User, Application.seeker_id == User.id)\
+            .order_by(Application.application_date.desc()).limit(limit):
+        events.append({
+            'occurred_at': application.application_date, 'event_type': 'application', 'action': 'Application',
+            'actor_id': application.id, 'actor_name': application.username,
+            'details': f"Applied to {application.title}",
+        })
+
+    events = [event for event in events if event['occurred_at'] is not None]
+    if events:
+        db.session.execute(ActivityEvent.__table__.insert(), events)
+        db.session.commit()
+    return len(events)
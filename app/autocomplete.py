@@ -0,0 +1,216 @@
+"""
+Typeahead suggestions for the job search box.
+
+Titles, company names and locations of active job postings are kept in a
+sorted array of word-start suffixes, so "dev" finds "Senior Developer".
+The frequency-weighted top suggestions for short prefixes are computed
+when the index is built. Other prefixes up to MEMOISED_PREFIX_LENGTH
+characters that match something are memoised on first use, so memory is
+bounded by the index however many different strings clients send;
+longer prefixes cover a narrow suffix range and are scanned each time.
+Updates only invalidate the prefixes a changed phrase can match. Requests
+are answered from memory without touching the database.
+"""
+import bisect
+import heapq
+import re
+import threading
+
+from flask import current_app
+
+from app.search import TOKEN_PATTERN
+
+# JobPosting field -> suggestion type
+SUGGESTION_FIELDS = {
+    'title': 'title',
+    'company_name': 'company',
+    'location': 'location',
+}
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Prefixes up to this length are computed eagerly when the index is built
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+# Longest prefix whose top list is memoised
+MEMOISED_PREFIX_LENGTH = 3
+
+# Word starts per phrase that are indexed, so long titles stay cheap
+MAX_WORD_STARTS = 5
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Lowercase text and collapse runs of whitespace"""
+    if not text:
+        return ''
+    return WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+
+class SuggestionIndex:
+    """Sorted word-start suffix array with memoised top-N per prefix"""
+
+    def __init__(self, top_n=MAX_LIMIT):
+        self.top_n = top_n
+        self._lock = threading.RLock()
+        self._entries = []  # sorted (suffix, kind, phrase)
+        self._counts = {}  # (kind, phrase) -> number of active jobs
+        self._display = {}  # (kind, phrase) -> text as first posted
+        self._jobs = {}  # job id -> tuple of (kind, phrase)
+        self._top = {}  # (prefix, kind or None) -> list of (kind, phrase)
+
+    def rebuild(self):
+        """Load every active job posting and rebuild the suggestions"""
+        from app.models import db, JobPosting
+
+        columns = [JobPosting.id] + [getattr(JobPosting, field) for field in SUGGESTION_FIELDS]
+        rows = db.session.query(*columns).filter(JobPosting.is_active == True).all()
+
+        with self._lock:
+            self._entries = []
+            self._counts = {}
+            self._display = {}
+            self._jobs = {}
+            self._top = {}
+            for row in rows:
+                self._add_job(row.id, self._job_phrases(row), sort=False)
+            self._entries.sort()
+            self._precompute()
+
+    def index_job(self, job):
+        """Add or refresh a job; inactive jobs are removed instead"""
+        phrases = self._job_phrases(job) if job.is_active else {}
+        with self._lock:
+            self._remove_job(job.id)
+            if phrases:
+                self._add_job(job.id, phrases)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            self._remove_job(job_id)
+
+    def suggest(self, prefix, limit=DEFAULT_LIMIT, kind=None):
+        """Return the most common phrases with a word starting with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        with self._lock:
+            top = self._top.get((prefix, kind))
+            if top is None:
+                top = self._compute_top(prefix, kind)
+                # Only prefixes of indexed words, and only short ones, are kept
+                if top and len(prefix) <= MEMOISED_PREFIX_LENGTH:
+                    self._top[(prefix, kind)] = top
+            return [
+                {'text': self._display[key], 'type': key[0], 'count': self._counts[key]}
+                for key in top[:limit]
+            ]
+
+    def _compute_top(self, prefix, kind=None):
+        """Scan the suffix range for prefix; caller holds the lock"""
+        start = bisect.bisect_left(self._entries, (prefix,))
+        end = bisect.bisect_left(self._entries, (prefix + '\uffff',))
+        keys = {
+            (entry_kind, phrase)
+            for _, entry_kind, phrase in self._entries[start:end]
+            if kind is None or entry_kind == kind
+        }
+        counts = self._counts
+        return heapq.nsmallest(self.top_n, keys, key=lambda key: (-counts[key], key[1]))
+
+    def _precompute(self):
+        """Fill the top lists for every short prefix; caller holds the lock"""
+        prefixes = set()
+        for suffix, _, _ in self._entries:
+            for length in range(1, min(PRECOMPUTED_PREFIX_LENGTH, len(suffix)) + 1):
+                prefixes.add(suffix[:length])
+        for prefix in prefixes:
+            self._top[(prefix, None)] = self._compute_top(prefix)
+
+    def _add_job(self, job_id, phrases, sort=True):
+        """Count a job's phrases; caller holds the lock"""
+        self._jobs[job_id] = tuple(phrases)
+        for key, display in phrases.items():
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            if count == 0:
+                self._display[key] = display
+                for suffix in self._suffixes(key[1]):
+                    entry = (suffix, key[0], key[1])
+                    if sort:
+                        bisect.insort(self._entries, entry)
+                    else:
+                        self._entries.append(entry)
+            if sort:
+                self._invalidate(key)
+
+    def _remove_job(self, job_id):
+        """Uncount a job's phrases; caller holds the lock"""
+        for key in self._jobs.pop(job_id, ()):
+            count = self._counts.get(key, 0) - 1
+            if count > 0:
+                self._counts[key] = count
+            else:
+                self._counts.pop(key, None)
+                self._display.pop(key, None)
+                for suffix in self._suffixes(key[1]):
+                    entry = (suffix, key[0], key[1])
+                    position = bisect.bisect_left(self._entries, entry)
+                    if position < len(self._entries) and self._entries[position] == entry:
+                        del self._entries[position]
+            self._invalidate(key)
+
+    def _invalidate(self, key):
+        """Forget memoised top lists for every prefix the phrase can match"""
+        kind, phrase = key
+        for suffix in self._suffixes(phrase):
+            for length in range(1, min(MEMOISED_PREFIX_LENGTH, len(suffix)) + 1):
+                self._top.pop((suffix[:length], None), None)
+                self._top.pop((suffix[:length], kind), None)
+
+    @staticmethod
+    def _suffixes(phrase):
+        starts = [match.start() for match in TOKEN_PATTERN.finditer(phrase)][:MAX_WORD_STARTS]
+        return [phrase[start:] for start in starts]
+
+    @staticmethod
+    def _job_phrases(job):
+        phrases = {}
+        for field, kind in SUGGESTION_FIELDS.items():
+            value = getattr(job, field, None)
+            phrase = normalize(value)
+            if phrase:
+                phrases[(kind, phrase)] = WHITESPACE_PATTERN.sub(' ', value).strip()
+        return phrases
+
+
+class JobSuggestions:
+    """Flask extension that builds the suggestion index for each worker"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.search import register_job_index
+
+        index = SuggestionIndex()
+        app.extensions['job_suggestions'] = index
+        register_job_index(app, index)
+
+        with app.app_context():
+            try:
+                index.rebuild()
+            except Exception as e:
+                print(f"Error building suggestion index: {e}")
+
+
+job_suggestions = JobSuggestions()
+
+
+def get_suggestion_index():
+    """Get the suggestion index for the current app"""
+    return current_app.extensions.get('job_suggestions')
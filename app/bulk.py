@@ -0,0 +1,121 @@
+"""
+Set-based bulk operations for the admin pages.
+
+Each operation changes every selected row with one UPDATE or DELETE (plus
+one DELETE of the applications of deleted jobs) inside the caller's
+transaction, instead of loading and saving the rows one by one. Rows are
+selected either by id or by the filters of the listing they came from.
+
+Bulk statements bypass the ORM, so the reporting counts are adjusted by
+hand in the same transaction, and once the caller commits,
+refresh_after_bulk() brings the job indexes, the facet and fragment caches
+and the system overview up to date.
+"""
+from collections import Counter
+from datetime import datetime
+
+# Most ids accepted in one bulk request; larger selections go by filter
+MAX_BULK_IDS = 1000
+
+BULK_USER_ACTIONS = ('activate', 'deactivate')
+BULK_JOB_ACTIONS = ('activate', 'deactivate', 'expire', 'delete')
+
+
+def parse_bulk_ids(values):
+    """Ids from repeated form fields and/or comma-separated lists"""
+    ids = []
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if part.isdigit():
+                ids.append(int(part))
+    return list(dict.fromkeys(ids))[:MAX_BULK_IDS]
+
+
+def _execute_returning(model, clauses, statement, *columns):
+    """Run an UPDATE or DELETE of model rows matching clauses
+
+    Returns the given columns of the affected rows: with RETURNING where
+    the database supports it, else by selecting the rows first.
+    """
+    from app.models import db
+
+    options = {'synchronize_session': False}
+    dialect = db.session.get_bind().dialect
+    returning = dialect.delete_returning if statement.is_delete else dialect.update_returning
+    if returning:
+        return db.session.execute(statement.where(*clauses).returning(*columns),
+                                  execution_options=options).all()
+
+    rows = db.session.execute(db.select(*columns).where(*clauses).with_for_update()).all()
+    if rows:
+        db.session.execute(statement.where(model.id.in_([row[0] for row in rows])),
+                           execution_options=options)
+    return rows
+
+
+def bulk_set_users_active(clauses, active, exclude_id=None, now=None):
+    """Activate or deactivate the selected users; returns the changed ids"""
+    from app.models import db, User
+
+    clauses = list(clauses) + [db.or_(User.is_active != active, User.is_active.is_(None))]
+    if exclude_id is not None:
+        clauses.append(User.id != exclude_id)
+    statement = db.update(User).values(is_active=active, updated_at=now or datetime.utcnow())
+    return [row.id for row in _execute_returning(User, clauses, statement, User.id)]
+
+
+def bulk_set_jobs_active(clauses, active, now=None):
+    """Activate or deactivate the selected jobs; returns the changed ids
+
+    Activated drafts are published, as with the single-job toggle.
+    """
+    from app.models import db, JobPosting
+    from app.reporting import record_count_changes, job_state
+
+    now = now or datetime.utcnow()
+    values = {'is_active': active}
+    if active:
+        values.update(is_draft=False, published_at=db.func.coalesce(JobPosting.published_at, now))
+    statement = db.update(JobPosting).values(**values)
+    rows = _execute_returning(JobPosting, list(clauses) + [JobPosting.is_active != active],
+                              statement, JobPosting.id)
+    if rows:
+        record_count_changes('jobs', {job_state(not active): -len(rows), job_state(active): len(rows)})
+    return [row.id for row in rows]
+
+
+def bulk_delete_jobs(clauses):
+    """Delete the selected jobs and their applications
+
+    Returns (deleted job ids, number of applications deleted).
+    """
+    from app.models import db, JobPosting, Application
+    from app.reporting import record_count_changes, record_application_deletes, job_state
+
+    selected = db.select(JobPosting.id).where(*clauses).scalar_subquery()
+    applications = Application.query.filter(Application.job_id.in_(selected))
+    record_application_deletes(applications)
+    removed_applications = applications.delete(synchronize_session=False)
+
+    rows = _execute_returning(JobPosting, clauses, db.delete(JobPosting), JobPosting.id, JobPosting.is_active)
+    removed = Counter(job_state(row.is_active) for row in rows)
+    if removed:
+        record_count_changes('jobs', {state: -count for state, count in removed.items()})
+    return [row.id for row in rows], removed_applications
+
+
+def refresh_after_bulk(job_ids=(), user_ids=(), deactivated_users=False):
+    """Update derived state once a bulk change has committed"""
+    from app.search import refresh_jobs
+    from app.stats import invalidate_system_overview
+    from app.presence import get_presence
+
+    if job_ids:
+        refresh_jobs(job_ids)
+    if user_ids and deactivated_users:
+        presence = get_presence()
+        if presence is not None:
+            for user_id in user_ids:
+                presence.forget(user_id)
+    invalidate_system_overview()
@@ -0,0 +1,95 @@
+"""
+Maintenance commands for the flask CLI.
+
+Run them with the app's environment loaded, e.g.
+``flask --app app reconcile-application-counts``.
+"""
+import click
+from flask.cli import with_appcontext
+
+
+def register_commands(app):
+    """Attach the maintenance commands to app.cli"""
+    app.cli.add_command(reconcile_application_counts)
+    app.cli.add_command(backfill_reports)
+    app.cli.add_command(seed_activity)
+    app.cli.add_command(prune_activity)
+    app.cli.add_command(send_email)
+    app.cli.add_command(sweep_sessions)
+
+
+@click.command('reconcile-application-counts')
+@with_appcontext
+def reconcile_application_counts():
+    """Recount every job's application counters from the applications table"""
+    from app.models import JobPosting
+
+    drifted = JobPosting.reconcile_application_counts()
+    click.echo(f"Application counters reconciled; {drifted} job(s) were out of step.")
+
+
+@click.command('backfill-reports')
+@with_appcontext
+def backfill_reports():
+    """Rebuild the reporting count and rollup tables from the raw tables"""
+    from app.reporting import backfill_reports as rebuild
+
+    counts, rollups = rebuild()
+    click.echo(f"Reports backfilled; {counts} count row(s) and {rollups} rollup row(s) written.")
+
+
+@click.command('seed-activity')
+@with_appcontext
+def seed_activity():
+    """Fill an empty activity log with the latest users, jobs and applications"""
+    from app.activity import seed_activity as seed
+
+    seeded = seed()
+    click.echo(f"Activity log seeded; {seeded} event(s) written.")
+
+
+@click.command('prune-activity')
+@click.option('--days', type=int, default=None, help='Keep this many days of events (default: ACTIVITY_RETENTION_DAYS).')
+@with_appcontext
+def prune_activity(days):
+    """Delete activity events older than the retention period"""
+    from app.activity import get_activity_log
+
+    removed = get_activity_log().prune(older_than_days=days)
+    click.echo(f"Activity log pruned; {removed} event(s) removed.")
+
+
+@click.command('send-email')
+@click.option('--once', is_flag=True, help='Deliver what is due now and exit instead of polling.')
+@with_appcontext
+def send_email(once):
+    """Deliver the queued outbound email (for deployments with EMAIL_WORKERS=0)"""
+    import time
+    from app.models import db
+    from app.outbox import get_outbox
+
+    outbox = get_outbox()
+    delivered = 0
+    while True:
+        attempted = outbox.deliver_due()
+        db.session.remove()
+        delivered += attempted
+        if attempted < outbox.batch_size:
+            if once:
+                break
+            time.sleep(outbox.poll_seconds)
+    click.echo(f"Outbox delivered; {delivered} email(s) attempted.")
+
+
+@click.command('sweep-sessions')
+@with_appcontext
+def sweep_sessions():
+    """Delete expired server-side sessions (for deployments with SESSION_SWEEP_SECONDS=0)"""
+    from app.sessions import get_session_interface
+
+    interface = get_session_interface()
+    if interface is None:
+        click.echo("Sessions are kept in cookies; there is nothing to sweep.")
+        return
+    removed = interface.sweep()
+    click.echo(f"Sessions swept; {removed} expired session(s) removed.")
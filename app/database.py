@@ -0,0 +1,160 @@
+"""
+Database engine profiles.
+
+The kind of database behind SQLALCHEMY_DATABASE_URI picks a profile from
+DatabaseConfig.get_engine_profile(): pool sizing, pre-ping, recycling and
+a statement timeout for Postgres, and WAL mode, relaxed syncing, a busy
+timeout, memory mapping and a bigger page cache for SQLite. Pool options
+and the Postgres startup options are passed to the engine; pragmas are
+applied to each new connection.
+
+Connection pools are timed: every checkout records how long the caller
+waited for a connection (opening or pinging one included), so /health
+shows whether a worker's pool is too small for its threads.
+"""
+import threading
+import time
+from collections import deque
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import QueuePool
+
+from config.db_config import DatabaseConfig
+
+# Recent checkout waits kept for the percentiles in stats()
+WAIT_SAMPLES = 512
+
+# Waits longer than this count as having queued for a connection, in seconds
+WAIT_THRESHOLD = 0.005
+
+
+class PoolMetrics:
+    """Checkout counts and wait times of one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._checkouts = 0
+        self._queued = 0
+        self._timeouts = 0
+        self._seconds = 0.0
+        self._longest = 0.0
+
+    def record(self, seconds):
+        with self._lock:
+            self._checkouts += 1
+            self._seconds += seconds
+            self._longest = max(self._longest, seconds)
+            self._waits.append(seconds)
+            if seconds > WAIT_THRESHOLD:
+                self._queued += 1
+
+    def record_timeout(self, seconds):
+        with self._lock:
+            self._timeouts += 1
+            self._longest = max(self._longest, seconds)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+
+            def percentile(fraction):
+                if not waits:
+                    return None
+                return round(waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000, 2)
+
+            return {
+                'checkouts': self._checkouts,
+                'queued': self._queued,
+                'timeouts': self._timeouts,
+                'wait_mean_ms': round(self._seconds / self._checkouts * 1000, 2) if self._checkouts else None,
+                'wait_p50_ms': percentile(0.5),
+                'wait_p95_ms': percentile(0.95),
+                'wait_max_ms': round(self._longest * 1000, 2),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports checkout waits to a PoolMetrics"""
+
+    metrics = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except sa_exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # Invalidation replaces the pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database at url"""
+    options = dict(DatabaseConfig.get_engine_profile(url)['engine_options'])
+    if options:
+        # Only profiles with a connection pool have options; in-memory SQLite keeps its single connection
+        options['poolclass'] = TimedQueuePool
+    return options
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+class EngineProfiles:
+    """Flask extension that applies the engine profile and times the pool"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import db
+
+        profile = DatabaseConfig.get_engine_profile(app.config.get('SQLALCHEMY_DATABASE_URI'))
+        metrics = PoolMetrics()
+        with app.app_context():
+            engine = db.engine
+        # Listeners go on before the first connection is opened
+        if profile['pragmas']:
+            event.listen(engine, 'connect', _apply_pragmas(profile['pragmas']))
+        if isinstance(engine.pool, TimedQueuePool):
+            engine.pool.metrics = metrics
+        app.extensions['engine_profile'] = {'name': profile['name'], 'engine': engine, 'metrics': metrics}
+
+
+engine_profiles = EngineProfiles()
+
+
+def pool_stats():
+    """Pool occupancy and checkout waits of this worker, for /health"""
+    if not has_app_context():
+        return None
+    state = current_app.extensions.get('engine_profile')
+    if state is None:
+        return None
+    pool = state['engine'].pool
+    stats = {'profile': state['name'], 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    stats.update(state['metrics'].stats())
+    return stats
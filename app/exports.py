@@ -0,0 +1,209 @@
+"""
+Streaming bulk exports of users, jobs and applications for admins.
+
+An export is one SELECT over the columns it writes, read through its own
+connection in chunks of EXPORT_CHUNK_ROWS rows (yield_per, which uses a
+server-side cursor on PostgreSQL and fetchmany on SQLite). Each chunk is
+encoded as CSV or NDJSON, optionally gzipped with a running compressor,
+and handed to the response before the next one is read, so a worker only
+ever holds one chunk however many rows the export has.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+# Rows read from the database and encoded per chunk
+EXPORT_CHUNK_ROWS = 1000
+
+# Leading characters that make spreadsheet tools read a CSV cell as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _parse_datetime(value):
+    try:
+        return datetime.fromisoformat(value.strip()) if value and value.strip() else None
+    except ValueError:
+        return None
+
+
+def parse_export_args(args):
+    """Read the filters shared by every export from request arguments
+
+    ``since`` and ``until`` bound the creation, posting or application date
+    (ISO dates or datetimes, ``until`` exclusive); unreadable values are
+    ignored, as with the listing filters.
+    """
+    return {
+        'since': _parse_datetime(args.get('since')),
+        'until': _parse_datetime(args.get('until')),
+        'gzip': args.get('gzip', '').strip().lower() in ('1', 'true', 'yes'),
+    }
+
+
+def _date_clauses(column, filters):
+    clauses = []
+    if filters.get('since'):
+        clauses.append(column >= filters['since'])
+    if filters.get('until'):
+        clauses.append(column < filters['until'])
+    return clauses
+
+
+def users_export(args, filters):
+    """Users, optionally by role, username/email prefix (q) and active state"""
+    from app.models import db, User
+    from app.user_grid import parse_user_grid_args, user_grid_clauses
+
+    statement = db.select(
+        User.id, User.username, User.email, User.role, User.full_name, User.phone,
+        User.location, User.created_at, User.last_login, User.is_active
+    ).where(*user_grid_clauses(parse_user_grid_args(args)), *_date_clauses(User.created_at, filters))
+    active = args.get('active', '').strip().lower()
+    if active in ('yes', 'no'):
+        statement = statement.where(User.is_active == (active == 'yes'))
+    return statement.order_by(User.id)
+
+
+def jobs_export(args, filters):
+    """Job postings, with the status, search and facet filters of /admin/manage_jobs"""
+    from app.models import db, User, JobPosting
+    from app.facets import parse_facet_filters, facet_clauses
+
+    statement = db.select(
+        JobPosting.id, JobPosting.title, JobPosting.company_name, JobPosting.location,
+        JobPosting.job_type, JobPosting.salary_range, JobPosting.employer_id,
+        User.username.label('employer_username'), JobPosting.posted_date, JobPosting.is_active,
+        JobPosting.is_draft, JobPosting.application_count
+    ).outerjoin(User, JobPosting.employer_id == User.id).where(
+        *facet_clauses(parse_facet_filters(args)),
+        *_date_clauses(JobPosting.posted_date, filters)
+    )
+    statement = statement.where(*JobPosting.admin_clauses(args.get('status', '').strip(),
+                                                          args.get('search', '').strip()))
+    employer_id = args.get('employer_id', type=int)
+    if employer_id:
+        statement = statement.where(JobPosting.employer_id == employer_id)
+    return statement.order_by(JobPosting.id)
+
+
+def applications_export(args, filters):
+    """Applications, optionally by status and job"""
+    from app.models import db, JobPosting, Application, APPLICATION_STATUSES
+
+    statement = db.select(
+        Application.id, Application.job_id, JobPosting.title.label('job_title'), Application.seeker_id,
+        Application.full_name, Application.email, Application.phone, Application.status,
+        Application.application_date, Application.years_experience, Application.expected_salary,
+        Application.highest_qualification
+    ).join(JobPosting, Application.job_id == JobPosting.id).where(
+        *_date_clauses(Application.application_date, filters)
+    )
+    status = args.get('status', '').strip()
+    if status in APPLICATION_STATUSES:
+        statement = statement.where(Application.status == status)
+    job_id = args.get('job_id', type=int)
+    if job_id:
+        statement = statement.where(Application.job_id == job_id)
+    return statement.order_by(Application.id)
+
+
+EXPORT_STATEMENTS = {
+    'users': users_export,
+    'jobs': jobs_export,
+    'applications': applications_export,
+}
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # Quote would-be formulas so opening the export can't run them
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class CsvEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def header(self):
+        self.writer.writerow(self.columns)
+        return self._take()
+
+    def rows(self, rows):
+        self.writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return self._take()
+
+    def _take(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+class NdjsonEncoder:
+    def __init__(self, columns):
+        self.columns = columns
+
+    def header(self):
+        return ''
+
+    def rows(self, rows):
+        return ''.join(
+            json.dumps({column: _json_value(value) for column, value in zip(self.columns, row)},
+                       separators=(',', ':')) + '\n'
+            for row in rows
+        )
+
+
+ENCODERS = {
+    'csv': CsvEncoder,
+    'ndjson': NdjsonEncoder,
+}
+
+
+def stream_export(statement, fmt, compress=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the encoded (and optionally gzipped) export one chunk at a time
+
+    Must run inside an app context; routes wrap it in stream_with_context.
+    """
+    from app.models import db
+
+    encoder = ENCODERS[fmt]([column.key for column in statement.selected_columns])
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    chunk = emit(encoder.header())
+    if chunk:
+        yield chunk
+    with db.engine.connect() as connection:
+        result = connection.execution_options(yield_per=chunk_rows).execute(statement)
+        for rows in result.partitions():
+            chunk = emit(encoder.rows(rows))
+            if chunk:
+                yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def export_filename(kind, fmt, compress=False, now=None):
+    stamp = (now or datetime.utcnow()).strftime('%Y%m%d-%H%M%S')
+    return f"findjob-{kind}-{stamp}.{fmt}" + ('.gz' if compress else '')
@@ -0,0 +1,201 @@
+"""
+Faceted filtering for job listings.
+
+All facet counts come from a single grouped aggregation over
+(job_type, location, posted-age bucket). Because every dimension is in
+the grouping, the counts for one facet can honour the selections made in
+the other facets (and the total number of matches falls out for free)
+without issuing one COUNT query per facet value. Public listings reuse
+recent counts for a short while; the cache is dropped whenever a job
+changes, so the counts are at most FACET_CACHE_SECONDS out of date.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func
+
+# Buckets for the "posted within N days" facet
+POSTED_WITHIN_DAYS = (1, 7, 30)
+
+POSTED_WITHIN_LABELS = {
+    1: 'Last 24 hours',
+    7: 'Last 7 days',
+    30: 'Last 30 days',
+}
+
+# Most location values shown in the location facet
+MAX_LOCATION_FACETS = 10
+
+# How long public listings reuse facet counts, and for how many queries
+FACET_CACHE_SECONDS = 60
+FACET_CACHE_SIZE = 256
+
+
+def parse_facet_filters(args):
+    """Read the facet selections from request arguments"""
+    posted_within = args.get('posted_within', type=int)
+    if posted_within not in POSTED_WITHIN_DAYS:
+        posted_within = None
+    return {
+        'job_type': args.get('job_type', '').strip() or None,
+        'location': args.get('location', '').strip() or None,
+        'posted_within': posted_within,
+    }
+
+
+def facet_clauses(filters, now=None):
+    """SQL filter clauses for JobPosting matching the facet selections"""
+    from app.models import JobPosting
+
+    now = now or datetime.utcnow()
+    clauses = []
+    if filters.get('job_type'):
+        clauses.append(JobPosting.job_type == filters['job_type'])
+    if filters.get('location'):
+        clauses.append(JobPosting.location.ilike(f"%{filters['location']}%"))
+    if filters.get('posted_within'):
+        clauses.append(JobPosting.posted_date >= now - timedelta(days=filters['posted_within']))
+    return clauses
+
+
+def facet_counts(base_clauses, filters, now=None):
+    """Count jobs per job type, location and posted-within bucket
+
+    ``base_clauses`` select the job set being browsed (e.g. active jobs
+    matching a keyword). Each facet is counted with the selections of the
+    other facets applied, so its values show how many results picking that
+    value would give. ``total`` is the number of jobs matching everything.
+    """
+    from app.models import db, JobPosting
+
+    now = now or datetime.utcnow()
+
+    # Smallest bucket the posting falls into, NULL when older than all of them
+    age_bucket = case(
+        *[(JobPosting.posted_date >= now - timedelta(days=days), days) for days in POSTED_WITHIN_DAYS],
+        else_=None
+    )
+    bucketed = db.session.query(
+        JobPosting.job_type.label('job_type'),
+        JobPosting.location.label('location'),
+        age_bucket.label('age_bucket')
+    ).filter(*base_clauses).subquery()
+
+    rows = db.session.query(
+        bucketed.c.job_type,
+        bucketed.c.location,
+        bucketed.c.age_bucket,
+        func.count().label('count')
+    ).group_by(bucketed.c.job_type, bucketed.c.location, bucketed.c.age_bucket).all()
+
+    selected_type = filters.get('job_type')
+    selected_location = (filters.get('location') or '').lower()
+    selected_age = filters.get('posted_within')
+
+    job_types = Counter()
+    locations = Counter()
+    posted_within = Counter()
+    total = 0
+    for row in rows:
+        type_matches = not selected_type or row.job_type == selected_type
+        location_matches = not selected_location or selected_location in (row.location or '').lower()
+        age_matches = not selected_age or (row.age_bucket is not None and row.age_bucket <= selected_age)
+
+        if location_matches and age_matches and row.job_type:
+            job_types[row.job_type] += row.count
+        if type_matches and age_matches and row.location:
+            locations[row.location] += row.count
+        if type_matches and location_matches and row.age_bucket is not None:
+            for days in POSTED_WITHIN_DAYS:
+                if row.age_bucket <= days:
+                    posted_within[days] += row.count
+        if type_matches and location_matches and age_matches:
+            total += row.count
+
+    return {
+        'job_type': sorted(job_types.items(), key=lambda item: (-item[1], item[0])),
+        'location': sorted(locations.items(), key=lambda item: (-item[1], item[0]))[:MAX_LOCATION_FACETS],
+        'posted_within': [(days, posted_within[days]) for days in POSTED_WITHIN_DAYS],
+        'total': total,
+    }
+
+
+class FacetCountCache:
+    """Per-worker LRU of facet counts that expires entries after a TTL"""
+
+    def __init__(self, ttl=FACET_CACHE_SECONDS, max_entries=FACET_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires at, counts)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, counts):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, counts)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Job index hooks: any change to a job can move any count
+    def rebuild(self):
+        self.clear()
+
+    def index_job(self, job):
+        self.clear()
+
+    def remove_job(self, job_id):
+        self.clear()
+
+
+class JobFacets:
+    """Flask extension that keeps a facet count cache for each worker"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.search import register_job_index
+
+        cache = FacetCountCache(ttl=app.config.get('FACET_CACHE_SECONDS', FACET_CACHE_SECONDS))
+        app.extensions['facet_cache'] = cache
+        register_job_index(app, cache)
+
+
+job_facets = JobFacets()
+
+
+def cached_facet_counts(cache_key, base_clauses, filters, now=None):
+    """facet_counts() reused for up to FACET_CACHE_SECONDS per cache_key
+
+    ``cache_key`` must identify base_clauses (e.g. the search text); the
+    filters are added to it here.
+    """
+    cache = current_app.extensions.get('facet_cache')
+    if cache is None:
+        return facet_counts(base_clauses, filters, now=now)
+
+    key = (cache_key, tuple(sorted(filters.items())))
+    counts = cache.get(key)
+    if counts is None:
+        counts = facet_counts(base_clauses, filters, now=now)
+        cache.set(key, counts)
+    return counts
@@ -0,0 +1,93 @@
+"""
+Cached HTML fragments for the job listing modals.
+
+/jobs only renders lightweight cards; a job's full details are rendered
+when its modal is first opened and kept per worker so later views skip
+the join and the template. The job index hooks drop a job's fragment
+whenever this worker edits, deactivates or deletes the job. Changes made
+by other workers are caught in two ways: every hit first confirms the job
+is still active with a primary-key lookup, and entries expire after
+FRAGMENT_TTL_SECONDS so edits show up everywhere within that time.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+# Rendered job detail fragments kept per worker
+FRAGMENT_CACHE_SIZE = 500
+
+# Longest a cached fragment is served before being rendered again, in seconds
+FRAGMENT_TTL_SECONDS = 300
+
+# Browser cache lifetime for public job detail fragments
+FRAGMENT_MAX_AGE = 60
+
+
+class JobFragmentCache:
+    """Per-worker LRU of rendered fragments keyed by job id"""
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_SIZE, ttl_seconds=FRAGMENT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._fragments = OrderedDict()  # job id -> (html, expires at)
+
+    def get(self, job_id, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._fragments.get(job_id)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._fragments[job_id]
+                return None
+            self._fragments.move_to_end(job_id)
+            return entry[0]
+
+    def set(self, job_id, html, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._fragments[job_id] = (html, now + self.ttl_seconds)
+            self._fragments.move_to_end(job_id)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+
+    # Job index hooks
+    def rebuild(self):
+        with self._lock:
+            self._fragments.clear()
+
+    def index_job(self, job):
+        self.remove_job(job.id)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            self._fragments.pop(job_id, None)
+
+
+class JobFragments:
+    """Flask extension that keeps a fragment cache for each worker"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.search import register_job_index
+
+        cache = JobFragmentCache(
+            max_entries=app.config.get('FRAGMENT_CACHE_SIZE', FRAGMENT_CACHE_SIZE),
+            ttl_seconds=app.config.get('FRAGMENT_TTL_SECONDS', FRAGMENT_TTL_SECONDS)
+        )
+        app.extensions['job_fragments'] = cache
+        register_job_index(app, cache)
+
+
+job_fragments = JobFragments()
+
+
+def get_fragment_cache():
+    """Get the fragment cache for the current app"""
+    return current_app.extensions.get('job_fragments')
@@ -0,0 +1,302 @@
+"""
+Dialect-aware full-text search over job postings.
+
+PostgreSQL keeps a generated, weighted tsvector column on job_postings
+with a GIN index. SQLite keeps an external-content FTS5 table that is
+synchronised by triggers. Both replace the leading-wildcard LIKE scans
+used by the job search and the admin job filter. The same structures are
+created by the migration in migrations/versions for managed deployments.
+"""
+from flask import current_app
+from sqlalchemy import func, literal_column, text
+
+from config.db_config import DatabaseConfig
+from app.search import SEARCH_FIELD_WEIGHTS, tokenize
+
+
+def ranked_window(scored_sql, params, limit, offset=0, after=None):
+    """Page through a "SELECT id, score" statement, best score first
+
+    Returns (hits, total) with hits as (score, job id) pairs. ``after`` is
+    the last hit of the previous window for seek-style paging.
+
+    One extra row is fetched to tell whether anything follows. The matches
+    are only counted on the first window, and only when they don't all fit
+    in it; later windows return a total of None (0 when nothing matches at
+    all), and callers carry the first window's total along instead.
+    """
+    from app.models import db
+
+    window_params = dict(params, limit=limit + 1, offset=offset)
+    seek = ''
+    if after is not None:
+        seek = "WHERE score < :after_score OR (score = :after_score AND id < :after_id)"
+        window_params.update(after_score=after[0], after_id=after[1])
+
+    rows = db.session.execute(text(
+        f"SELECT id, score FROM ({scored_sql}) AS ranked {seek} "
+        "ORDER BY score DESC, id DESC LIMIT :limit OFFSET :offset"
+    ), window_params).all()
+    more = len(rows) > limit
+    hits = [(float(row.score), row.id) for row in rows[:limit]]
+
+    first_window = not offset and after is None
+    if first_window and not more:
+        return hits, len(hits)
+    if first_window:
+        total = db.session.execute(
+            text(f"SELECT count(*) FROM ({scored_sql}) AS ranked"), params
+        ).scalar()
+        return hits, total
+    if not hits:
+        # Past the end, or nothing matches at all (callers fall back to fuzzy matching)
+        matched = db.session.execute(text(f"SELECT 1 FROM ({scored_sql}) AS ranked LIMIT 1"), params).first()
+        return [], None if matched else 0
+    return hits, None
+
+
+class FullTextBackend:
+    """Fallback backend that matches with LIKE predicates"""
+
+    dialect = 'unknown'
+
+    def install(self, connection):
+        """Create the full-text structures if they are missing"""
+        return False
+
+    def match(self, query_text):
+        """Return a filter clause for JobPosting matching every query token"""
+        from app.models import db, JobPosting
+
+        clauses = []
+        for token in tokenize(query_text):
+            clauses.append(db.or_(
+                JobPosting.title.contains(token),
+                JobPosting.company_name.contains(token),
+                JobPosting.description.contains(token),
+                JobPosting.location.contains(token)
+            ))
+        return db.and_(*clauses) if clauses else None
+
+    def ranked(self, query_text, limit, offset=0, after=None):
+        """Return (hits, total) for active jobs as (score, job id) pairs
+
+        LIKE matching has no relevance score, so hits are ranked newest id
+        first with a score of zero.
+        """
+        from app.models import db, JobPosting
+
+        clause = self.match(query_text)
+        if clause is None:
+            return [], 0
+
+        matches = db.session.query(JobPosting.id).filter(JobPosting.is_active == True, clause)
+        query = matches.filter(JobPosting.id < after[1]) if after is not None else matches
+        rows = query.order_by(JobPosting.id.desc()).offset(offset).limit(limit + 1).all()
+        hits = [(0.0, row.id) for row in rows[:limit]]
+
+        # Counted on the first window only, as in ranked_window()
+        if not offset and after is None:
+            return hits, len(hits) if len(rows) <= limit else matches.count()
+        if not hits:
+            return [], None if matches.first() else 0
+        return hits, None
+
+class PostgresFullText(FullTextBackend):
+    """Weighted tsvector column with a GIN index"""
+
+    dialect = 'postgresql'
+    column_name = 'search_vector'
+    index_name = 'ix_job_postings_search_vector'
+
+    # ts_rank takes weights for the D, C, B and A labels, in that order
+    RANK_FIELDS = ('location', 'description', 'company_name', 'title')
+
+    COLUMN_DDL = """
+        ALTER TABLE job_postings ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(company_name, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C') ||
+            setweight(to_tsvector('english', coalesce(location, '')), 'D')
+        ) STORED
+    """
+    INDEX_DDL = """
+        CREATE INDEX IF NOT EXISTS ix_job_postings_search_vector
+        ON job_postings USING GIN (search_vector)
+    """
+
+    def install(self, connection):
+        exists = connection.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'job_postings' AND column_name = :column"
+        ), {'column': self.column_name}).first()
+        if exists:
+            return False
+        connection.execute(text(self.COLUMN_DDL))
+        connection.execute(text(self.INDEX_DDL))
+        return True
+
+    def tsquery_text(self, query_text):
+        """Build a prefix tsquery string that requires every token"""
+        tokens = tokenize(query_text)
+        if not tokens:
+            return None
+        return ' & '.join(f"{token}:*" for token in tokens)
+
+    def match(self, query_text):
+        tsquery = self.tsquery_text(query_text)
+        if tsquery is None:
+            return None
+        return literal_column(f"job_postings.{self.column_name}").op('@@')(
+            func.to_tsquery('english', tsquery)
+        )
+
+    def ranked(self, query_text, limit, offset=0, after=None):
+        tsquery = self.tsquery_text(query_text)
+        if tsquery is None:
+            return [], 0
+
+        top_weight = max(SEARCH_FIELD_WEIGHTS.values())
+        weights = [SEARCH_FIELD_WEIGHTS[field] / top_weight for field in self.RANK_FIELDS]
+        scored_sql = (
+            "SELECT id, ts_rank(CAST(:weights AS float4[]), search_vector, "
+            "to_tsquery('english', :tsquery)) AS score "
+            "FROM job_postings "
+            "WHERE is_active = :active AND search_vector @@ to_tsquery('english', :tsquery)"
+        )
+        params = {'weights': weights, 'tsquery': tsquery, 'active': True}
+        return ranked_window(scored_sql, params, limit, offset, after)
+
+
+class SqliteFullText(FullTextBackend):
+    """External-content FTS5 table kept in sync with triggers"""
+
+    dialect = 'sqlite'
+    table_name = 'job_postings_fts'
+
+    # Column order matters for bm25() weights
+    COLUMNS = ('title', 'company_name', 'description', 'location')
+
+    TABLE_DDL = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS job_postings_fts USING fts5(
+            title, company_name, description, location,
+            content='job_postings', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """
+    TRIGGERS_DDL = (
+        """
+        CREATE TRIGGER IF NOT EXISTS job_postings_fts_ai AFTER INSERT ON job_postings BEGIN
+            INSERT INTO job_postings_fts(rowid, title, company_name, description, location)
+            VALUES (new.id, new.title, new.company_name, new.description, new.location);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS job_postings_fts_ad AFTER DELETE ON job_postings BEGIN
+            INSERT INTO job_postings_fts(job_postings_fts, rowid, title, company_name, description, location)
+            VALUES ('delete', old.id, old.title, old.company_name, old.description, old.location);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS job_postings_fts_au
+        AFTER UPDATE OF title, company_name, description, location ON job_postings BEGIN
+            INSERT INTO job_postings_fts(job_postings_fts, rowid, title, company_name, description, location)
+            VALUES ('delete', old.id, old.title, old.company_name, old.description, old.location);
+            INSERT INTO job_postings_fts(rowid, title, company_name, description, location)
+            VALUES (new.id, new.title, new.company_name, new.description, new.location);
+        END
+        """,
+    )
+
+    def install(self, connection):
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {'name': self.table_name}).first()
+        if exists:
+            return False
+        connection.execute(text(self.TABLE_DDL))
+        for ddl in self.TRIGGERS_DDL:
+            connection.execute(text(ddl))
+        # Index rows that were written before the table existed
+        connection.execute(text("INSERT INTO job_postings_fts(job_postings_fts) VALUES ('rebuild')"))
+        return True
+
+    def match_expression(self, query_text):
+        """Build an FTS5 query with every token as a quoted prefix"""
+        tokens = tokenize(query_text)
+        if not tokens:
+            return None
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def match(self, query_text):
+        from app.models import JobPosting
+
+        expression = self.match_expression(query_text)
+        if expression is None:
+            return None
+        return JobPosting.id.in_(
+            text("SELECT rowid FROM job_postings_fts WHERE job_postings_fts MATCH :fts_query")
+            .bindparams(fts_query=expression)
+        )
+
+    def ranked(self, query_text, limit, offset=0, after=None):
+        expression = self.match_expression(query_text)
+        if expression is None:
+            return [], 0
+
+        # bm25() is lower-is-better, so negate it to rank like the other engines
+        weights = ', '.join(repr(float(SEARCH_FIELD_WEIGHTS[column])) for column in self.COLUMNS)
+        scored_sql = (
+            f"SELECT job_postings.id AS id, -bm25(job_postings_fts, {weights}) AS score "
+            "FROM job_postings_fts JOIN job_postings ON job_postings.id = job_postings_fts.rowid "
+            "WHERE job_postings_fts MATCH :fts_query AND job_postings.is_active = :active"
+        )
+        params = {'fts_query': expression, 'active': True}
+        return ranked_window(scored_sql, params, limit, offset, after)
+
+
+FULLTEXT_BACKENDS = {
+    PostgresFullText.dialect: PostgresFullText,
+    SqliteFullText.dialect: SqliteFullText,
+}
+
+
+class FullText:
+    """Flask extension that installs and exposes the full-text backend"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Pick a backend from the database type and make sure it exists"""
+        from app.models import db
+
+        database_type = DatabaseConfig.get_database_type(app.config.get('SQLALCHEMY_DATABASE_URI'))
+        backend = FULLTEXT_BACKENDS.get(database_type, FullTextBackend)()
+
+        with app.app_context():
+            try:
+                with db.engine.begin() as connection:
+                    if backend.install(connection):
+                        print(f"Full-text search structures created for {backend.dialect}")
+            except Exception as e:
+                # e.g. SQLite built without FTS5; keep searching with LIKE
+                print(f"Full-text search unavailable, falling back to LIKE: {e}")
+                backend = FullTextBackend()
+
+        app.extensions['fulltext'] = backend
+
+
+fulltext = FullText()
+
+
+def get_fulltext_backend():
+    """Get the full-text backend for the current app"""
+    return current_app.extensions.get('fulltext') or FullTextBackend()
+
+
+def match_jobs(query_text):
+    """Filter clause for JobPosting rows matching query_text, or None"""
+    return get_fulltext_backend().match(query_text)
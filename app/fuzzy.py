@@ -0,0 +1,241 @@
+"""
+Typo-tolerant job search with character trigrams.
+
+On PostgreSQL the pg_trgm extension and GIN trigram indexes on the job
+title, company name and location do the work in the database. Elsewhere
+each worker keeps a trigram posting map over the words of active jobs, so
+a misspelt word like "devloper" is matched to "developer" by looking up
+the words that share its trigrams instead of scanning every job. Either
+way candidates are ranked by similarity and only one window is returned.
+"""
+import heapq
+import threading
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import text
+
+from config.db_config import DatabaseConfig
+from app.search import tokenize
+from app.fulltext import ranked_window
+
+# Fields of JobPosting that typos are corrected against
+FUZZY_FIELDS = ('title', 'company_name', 'location')
+
+# Lowest trigram word similarity that counts as a match, for both engines.
+# pg_trgm's own default for word similarity (<%) is 0.6, so the PostgreSQL
+# matcher sets pg_trgm.word_similarity_threshold to this for its query.
+SIMILARITY_THRESHOLD = 0.3
+
+# Closest vocabulary words considered for each query word
+MAX_WORD_CANDIDATES = 5
+
+
+def trigrams(word):
+    """Character trigrams of a word, padded the way pg_trgm pads them"""
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """In-process trigram posting map over the words of active jobs"""
+
+    name = 'memory'
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._trigram_words = {}  # trigram -> set of words
+        self._word_jobs = {}  # word -> set of job ids
+        self._word_sizes = {}  # word -> number of distinct trigrams
+        self._jobs = {}  # job id -> frozenset of words
+
+    def rebuild(self):
+        """Load every active job posting and rebuild the map"""
+        from app.models import db, JobPosting
+
+        columns = [JobPosting.id] + [getattr(JobPosting, field) for field in FUZZY_FIELDS]
+        rows = db.session.query(*columns).filter(JobPosting.is_active == True).all()
+
+        with self._lock:
+            self._trigram_words = {}
+            self._word_jobs = {}
+            self._word_sizes = {}
+            self._jobs = {}
+            for row in rows:
+                self._add_job(row.id, self._job_words(row))
+
+    def index_job(self, job):
+        """Add or refresh a job; inactive jobs are removed instead"""
+        words = self._job_words(job) if job.is_active else frozenset()
+        with self._lock:
+            self._remove_job(job.id)
+            if words:
+                self._add_job(job.id, words)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            self._remove_job(job_id)
+
+    def similar_words(self, word, limit=MAX_WORD_CANDIDATES):
+        """Return up to limit (similarity, word) pairs above the threshold"""
+        word_trigrams = trigrams(word)
+        with self._lock:
+            shared = Counter()
+            for trigram in word_trigrams:
+                shared.update(self._trigram_words.get(trigram, ()))
+
+            candidates = []
+            for candidate, shared_count in shared.items():
+                # Same measure as pg_trgm: shared trigrams over all distinct trigrams
+                score = shared_count / (len(word_trigrams) + self._word_sizes[candidate] - shared_count)
+                if score >= self.threshold:
+                    candidates.append((score, candidate))
+        return heapq.nlargest(limit, candidates)
+
+    def ranked_search(self, keyword, limit, offset=0, after=None):
+        """Rank jobs by the average best similarity of each query word"""
+        query_words = set(tokenize(keyword))
+        if not query_words:
+            return [], 0
+
+        scores = Counter()
+        for word in query_words:
+            best = {}
+            for score, candidate in self.similar_words(word):
+                with self._lock:
+                    job_ids = tuple(self._word_jobs.get(candidate, ()))
+                for job_id in job_ids:
+                    if score > best.get(job_id, 0.0):
+                        best[job_id] = score
+            for job_id, score in best.items():
+                scores[job_id] += score / len(query_words)
+
+        hits = ((score, job_id) for job_id, score in scores.items())
+        if after is not None:
+            after = tuple(after)
+            hits = (hit for hit in hits if hit < after)
+        return heapq.nlargest(offset + limit, hits)[offset:], len(scores)
+
+    def _add_job(self, job_id, words):
+        """Caller holds the lock"""
+        self._jobs[job_id] = words
+        for word in words:
+            jobs = self._word_jobs.get(word)
+            if jobs is None:
+                jobs = self._word_jobs[word] = set()
+                word_trigrams = trigrams(word)
+                self._word_sizes[word] = len(word_trigrams)
+                for trigram in word_trigrams:
+                    self._trigram_words.setdefault(trigram, set()).add(word)
+            jobs.add(job_id)
+
+    def _remove_job(self, job_id):
+        """Caller holds the lock"""
+        for word in self._jobs.pop(job_id, ()):
+            jobs = self._word_jobs.get(word)
+            if jobs is None:
+                continue
+            jobs.discard(job_id)
+            if not jobs:
+                del self._word_jobs[word]
+                del self._word_sizes[word]
+                for trigram in trigrams(word):
+                    words = self._trigram_words.get(trigram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._trigram_words[trigram]
+
+    @staticmethod
+    def _job_words(job):
+        words = set()
+        for field in FUZZY_FIELDS:
+            words.update(tokenize(getattr(job, field, None)))
+        return frozenset(words)
+
+
+class PostgresTrigramMatcher:
+    """pg_trgm word similarity backed by GIN trigram indexes"""
+
+    name = 'pg_trgm'
+
+    INDEX_DDL = {
+        field: f"CREATE INDEX IF NOT EXISTS ix_job_postings_{field}_trgm "
+               f"ON job_postings USING GIN ({field} gin_trgm_ops)"
+        for field in FUZZY_FIELDS
+    }
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+
+    def install(self, connection):
+        """Enable pg_trgm and create the trigram indexes if missing"""
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for ddl in self.INDEX_DDL.values():
+            connection.execute(text(ddl))
+
+    def ranked_search(self, keyword, limit, offset=0, after=None):
+        from app.models import db
+
+        query_text = ' '.join(tokenize(keyword))
+        if not query_text:
+            return [], 0
+
+        # <% filters on this setting, for the rest of the transaction only
+        db.session.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {'threshold': str(self.threshold)}
+        )
+        # <% uses the GIN indexes; word_similarity ranks the candidates
+        matches = ' OR '.join(f"CAST(:query AS text) <% {field}" for field in FUZZY_FIELDS)
+        similarities = ', '.join(
+            f"word_similarity(CAST(:query AS text), coalesce({field}, ''))" for field in FUZZY_FIELDS
+        )
+        scored_sql = (
+            f"SELECT id, GREATEST({similarities}) AS score FROM job_postings "
+            f"WHERE is_active = :active AND ({matches})"
+        )
+        params = {'query': query_text, 'active': True}
+        return ranked_window(scored_sql, params, limit, offset, after)
+
+
+class FuzzySearch:
+    """Flask extension that sets up trigram matching for the database in use"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import db
+        from app.search import register_job_index
+
+        database_type = DatabaseConfig.get_database_type(app.config.get('SQLALCHEMY_DATABASE_URI'))
+
+        with app.app_context():
+            if database_type == 'postgresql':
+                matcher = PostgresTrigramMatcher()
+                try:
+                    with db.engine.begin() as connection:
+                        matcher.install(connection)
+                    app.extensions['fuzzy_search'] = matcher
+                    return
+                except Exception as e:
+                    print(f"pg_trgm unavailable, using in-process trigram index: {e}")
+
+            index = TrigramIndex()
+            app.extensions['fuzzy_search'] = index
+            register_job_index(app, index)
+            try:
+                index.rebuild()
+            except Exception as e:
+                print(f"Error building trigram index: {e}")
+
+
+fuzzy_search = FuzzySearch()
+
+
+def get_fuzzy_matcher():
+    """Get the trigram matcher for the current app, if one is set up"""
+    return current_app.extensions.get('fuzzy_search')
@@ -0,0 +1,81 @@
+"""
+Request-scoped identity for the logged-in user.
+
+The User row is loaded at most once per request and kept on flask.g.
+Pages that only need to show who is logged in can use the identity
+snapshot (id, username, role, email) kept in the session, which costs
+no query on users at all.
+"""
+from collections import namedtuple
+
+from flask import g, session
+
+SessionIdentity = namedtuple('SessionIdentity', ['id', 'username', 'role', 'email'])
+
+# Session keys holding the identity snapshot, by User attribute
+SNAPSHOT_KEYS = {
+    'username': 'username',
+    'role': 'user_role',
+    'email': 'user_email',
+}
+
+
+def remember_identity(user):
+    """Log user in for this session and store their identity snapshot"""
+    # Server-side sessions move to a fresh id, so one issued before login is useless after
+    regenerate = getattr(session, 'regenerate', None)
+    if regenerate is not None:
+        regenerate()
+    session['user_id'] = user.id
+    _store_snapshot(user)
+    g.current_user = user
+
+
+def forget_identity():
+    """Log the user out, leaving the session empty under a fresh id"""
+    session.clear()
+    regenerate = getattr(session, 'regenerate', None)
+    if regenerate is not None:
+        regenerate()
+    g.pop('current_user', None)
+
+
+def load_current_user():
+    """The logged-in User, queried at most once per request"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+
+    user = g.get('current_user')
+    if user is None or user.id != user_id:
+        from app.models import db, User
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        g.current_user = user
+        # The row is authoritative; correct a snapshot that has gone stale
+        _store_snapshot(user)
+    return user
+
+
+def current_identity():
+    """Identity snapshot of the logged-in user, without touching the database
+
+    Sessions from before the snapshot existed load the user once to fill it.
+    """
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    if any(key not in session for key in SNAPSHOT_KEYS.values()):
+        if load_current_user() is None:
+            return None
+    return SessionIdentity(user_id, session['username'], session['user_role'], session['user_email'])
+
+
+def _store_snapshot(user):
+    # Only assign changed keys so an unchanged session isn't re-sent
+    for attribute, key in SNAPSHOT_KEYS.items():
+        value = getattr(user, attribute)
+        if session.get(key) != value:
+            session[key] = value
@@ -1,10 +1,15 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy import desc, func, and_, or_
 import json
 from datetime import datetime, timedelta
 
+# Application statuses, each with its own counter column on JobPosting
+APPLICATION_STATUSES = ('pending', 'reviewed', 'accepted', 'rejected')
+
+# Characters of a job description shown in the admin job listing
+ADMIN_DESCRIPTION_PREVIEW = 500
+
 
 class User(db.Model):
     """User model for both job seekers and employers"""
@@ -19,6 +24,7 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime, index=True)  # written behind by app.presence
     is_active = db.Column(db.Boolean, default=True)
     
     # Admin-specific fields
@@ -34,6 +40,10 @@ class User(db.Model):
     job_postings = db.relationship('JobPosting', backref='employer', lazy=True, foreign_keys='JobPosting.employer_id')
     applications = db.relationship('Application', backref='seeker', lazy=True, foreign_keys='Application.seeker_id')
     
+    # Serves keyset pagination of the admin user grid on (created_at, id);
+    # the lower(username) and lower(email) search indexes are made by app.user_grid
+    __table_args__ = (db.Index('ix_users_created_at_id', 'created_at', 'id'),)
+    
     def __init__(self, username, email, password, role='seeker', full_name=None, phone=None, location=None, bio=None, created_by=None):
         """Initialize user with enhanced fields"""
         self.username = username
@@ -56,11 +66,33 @@ class User(db.Model):
 
     def check_password(self, password):
         """Check if provided password matches the stored hash"""
-        return check_password_hash(self.password, password)
+        from app.passwords import verify_password
+        return verify_password(self.password, password)
     
     def set_password(self, password):
-        """Set new password (hashed)"""
-        self.password = generate_password_hash(password)
+        """Set new password (hashed in the password hashing pool)"""
+        from app.passwords import hash_password
+        self.password = hash_password(password)
+    
+    def rehash_password_if_needed(self, password):
+        """Re-hash a just-verified password made with outdated KDF parameters"""
+        from app.passwords import password_needs_rehash, get_password_hasher
+        if not password_needs_rehash(self.password):
+            return False
+        self.set_password(password)
+        get_password_hasher().record_rehash()
+        return True
+    
+    def generate_reset_token(self):
+        """Signed, time-limited password reset token; nothing is written"""
+        from app.reset_tokens import issue_reset_token
+        return issue_reset_token(self)
+    
+    @staticmethod
+    def verify_reset_token(token):
+        """User a reset token was issued to, or None if invalid, expired or used"""
+        from app.reset_tokens import load_reset_token
+        return load_reset_token(token)
     
     def get_profile_data(self):
         """Get user profile data for display"""
@@ -141,20 +173,23 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
     
-    def get_applied_jobs(self):
-        """Get all jobs this seeker has applied for with real database data"""
+    def get_applied_jobs(self, per_page=20, cursor=None, page=1):
+        """Get one page of the jobs this seeker has applied for, newest first
+        
+        Pages are fetched by seeking past the (application_date, id) of the
+        previous page. Large text such as the cover letter is left out; it is
+        loaded by get_application_details() when an application is opened.
+        """
+        from app.pagination import ResultWindow, keyset_window
+        
         if self.role != 'seeker':
-            return []
+            return ResultWindow([], 1, per_page, 0)
         
         try:
-            # Query applications with job details using SQLAlchemy joins
-            from sqlalchemy import desc
-            
-            applications = db.session.query(
-                Application.id.label('application_id'),
+            query = db.session.query(
+                Application.id,
                 Application.application_date,
                 Application.status,
-                Application.cover_letter,
                 JobPosting.id.label('job_id'),
                 JobPosting.title.label('job_title'),
                 JobPosting.company_name,
@@ -166,40 +201,70 @@ class User(db.Model):
                 JobPosting, Application.job_id == JobPosting.id
             ).filter(
                 Application.seeker_id == self.id
-            ).order_by(
-                desc(Application.application_date)
-            ).all()
+            )
+            
+            window = keyset_window(query, (Application.application_date, Application.id), per_page,
+                                   cursor=cursor, page=page, parsers=(datetime.fromisoformat, int))
             
             # Convert to list of dictionaries for template use
-            applied_jobs = []
-            for app in applications:
-                applied_jobs.append({
-                    'application_id': app.application_id,
-                    'job_id': app.job_id,
-                    'job_title': app.job_title,
-                    'company_name': app.company_name or 'Not specified',
-                    'location': app.location or 'Not specified',
-                    'job_type': app.job_type or 'Not specified',
-                    'salary_range': app.salary_range,
-                    'application_date': app.application_date,
-                    'status': app.status,
-                    'cover_letter': app.cover_letter,
-                    'posted_date': app.posted_date
-                })
-            
-            return applied_jobs
+            window.items = [{
+                'application_id': app.id,
+                'job_id': app.job_id,
+                'job_title': app.job_title,
+                'company_name': app.company_name or 'Not specified',
+                'location': app.location or 'Not specified',
+                'job_type': app.job_type or 'Not specified',
+                'salary_range': app.salary_range,
+                'application_date': app.application_date,
+                'status': app.status,
+                'posted_date': app.posted_date
+            } for app in window.items]
+            return window
             
         except Exception as e:
             print(f"Error fetching applied jobs: {e}")
-            return []
+            return ResultWindow([], 1, per_page, 0)
+    
+    def get_application_status_counts(self):
+        """Count this seeker's applications per status with one grouped query"""
+        counts = dict.fromkeys(APPLICATION_STATUSES, 0)
+        rows = db.session.query(Application.status, func.count(Application.id))\
+                         .filter(Application.seeker_id == self.id)\
+                         .group_by(Application.status).all()
+        for status, count in rows:
+            counts[status] = count
+        counts['total'] = sum(count for _, count in rows)
+        return counts
+    
+    def get_application_details(self, application_id):
+        """Load one of this seeker's applications in full, with its job"""
+        return Application.query.options(db.joinedload(Application.job_posting))\
+                                .filter_by(id=application_id, seeker_id=self.id).first()
     
     # Get jobs posted by an employer
     def get_posted_jobs(self):
-        """Get all jobs posted by this employer"""
+        """Get all jobs posted by this employer
+        
+        Only the columns the dashboard shows are selected, and application
+        totals come from the counters on JobPosting, so this is one query
+        however many jobs and applications the employer has.
+        """
         if self.role != 'employer':
             return []
         
-        jobs = JobPosting.query.filter_by(employer_id=self.id).order_by(
+        jobs = db.session.query(
+            JobPosting.id,
+            JobPosting.title,
+            JobPosting.description,
+            JobPosting.company_name,
+            JobPosting.location,
+            JobPosting.salary_range,
+            JobPosting.job_type,
+            JobPosting.posted_date,
+            JobPosting.is_active,
+            JobPosting.application_count,
+            JobPosting.pending_count
+        ).filter(JobPosting.employer_id == self.id).order_by(
             JobPosting.posted_date.desc()
         ).all()
         
@@ -213,28 +278,43 @@ class User(db.Model):
             'job_type': job.job_type,
             'posted_date': job.posted_date,
             'is_active': job.is_active,
-            'application_count': len(job.applications) if job.applications else 0,
+            'application_count': job.application_count,
+            'pending_count': job.pending_count,
             'view_count': 0  # Placeholder since we don't track views yet
         } for job in jobs]
     
-    def get_recent_applications(self):
-        """Get recent applications for employer's jobs"""
+    def get_recent_applications(self, limit=10):
+        """Get recent applications for employer's jobs
+        
+        The job title and applicant details are joined into the same query
+        instead of being lazy-loaded for every application.
+        """
         if self.role != 'employer':
             return []
         
-        # Get applications for this employer's jobs
-        applications = db.session.query(Application).join(
+        applications = db.session.query(
+            Application.id,
+            Application.job_id,
+            JobPosting.title.label('job_title'),
+            User.username.label('applicant_name'),
+            User.email.label('applicant_email'),
+            Application.application_date,
+            Application.status,
+            Application.cover_letter
+        ).join(
             JobPosting, Application.job_id == JobPosting.id
+        ).join(
+            User, Application.seeker_id == User.id
         ).filter(
             JobPosting.employer_id == self.id
-        ).order_by(Application.application_date.desc()).limit(10).all()  # Changed from applied_date to application_date
+        ).order_by(Application.application_date.desc()).limit(limit).all()  # Changed from applied_date to application_date
 
         return [{
             'application_id': app.id,
             'job_id': app.job_id,
-            'job_title': app.job_posting.title,
-            'applicant_name': app.seeker.username,
-            'applicant_email': app.seeker.email,
+            'job_title': app.job_title,
+            'applicant_name': app.applicant_name,
+            'applicant_email': app.applicant_email,
             'application_date': app.application_date,
             'status': app.status,
             'cover_letter': app.cover_letter
@@ -242,64 +322,100 @@ class User(db.Model):
     
     @staticmethod
     def get_system_overview():
-        """Get system overview statistics"""
+        """Get system overview statistics
+        
+        Uncached; pages should use app.stats.get_system_overview(), which
+        reuses a recent snapshot.
+        """
         try:
-            from app.models import JobPosting, Application
-            
-            total_users = User.query.count()
-            total_jobs = JobPosting.query.count()
-            total_applications = Application.query.count()
-            
-            # Get counts by role
-            seekers_count = User.query.filter_by(role='seeker').count()
-            employers_count = User.query.filter_by(role='employer').count()
-            admins_count = User.query.filter_by(role='admin').count()
-            
-            # Get recent data (last 30 days)
-            from datetime import datetime, timedelta
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            
-            recent_users = User.query.filter(User.created_at >= thirty_days_ago).all()
-            recent_jobs = JobPosting.query.filter(JobPosting.posted_date >= thirty_days_ago).all()
-            
-            return {
-                'total_users': total_users,
-                'total_jobs': total_jobs,
-                'total_applications': total_applications,
-                'seekers_count': seekers_count,
-                'employers_count': employers_count,
-                'admins_count': admins_count,
-                'recent_users': recent_users[:5],  # Last 5 users
-                'recent_jobs': recent_jobs[:5],   # Last 5 jobs
-                'new_users_this_month': len(recent_users),
-                'new_jobs_this_month': len(recent_jobs),
-                'new_applications_this_month': Application.query.filter(Application.application_date >= thirty_days_ago).count(),
-                'total_employers': employers_count,
-                'active_employers': employers_count,  # Simplified for now
-                'applications_today': Application.query.filter(Application.application_date >= datetime.now().date()).count(),
-                'jobs_posted_today': JobPosting.query.filter(JobPosting.posted_date >= datetime.now().date()).count(),
-                'new_users_today': User.query.filter(User.created_at >= datetime.now().date()).count()
-            }
+            return User.system_overview_snapshot()
         except Exception as e:
             print(f"Error in get_system_overview: {e}")
-            return {
-                'total_users': 0,
-                'total_jobs': 0,
-                'total_applications': 0,
-                'seekers_count': 0,
-                'employers_count': 0,
-                'admins_count': 0,
-                'recent_users': [],
-                'recent_jobs': [],
-                'new_users_this_month': 0,
-                'new_jobs_this_month': 0,
-                'new_applications_this_month': 0,
-                'total_employers': 0,
-                'active_employers': 0,
-                'applications_today': 0,
-                'jobs_posted_today': 0,
-                'new_users_today': 0
-            }
+            return User.empty_system_overview()
+    
+    @staticmethod
+    def system_overview_snapshot():
+        """Compute the system overview, raising on database errors
+        
+        Every count comes from one statement that aggregates each table once
+        with conditional counts; the five newest users and jobs are two small
+        projected queries.
+        """
+        from app.models import JobPosting, Application
+        
+        # Timestamps are stored in UTC
+        now = datetime.utcnow()
+        thirty_days_ago = now - timedelta(days=30)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        def count_where(condition):
+            return func.count(db.case((condition, 1)))
+        
+        users = db.select(
+            func.count(User.id).label('total_users'),
+            count_where(User.role == 'seeker').label('seekers_count'),
+            count_where(User.role == 'employer').label('employers_count'),
+            count_where(User.role == 'admin').label('admins_count'),
+            count_where(User.created_at >= thirty_days_ago).label('new_users_this_month'),
+            count_where(User.created_at >= today).label('new_users_today')
+        ).subquery()
+        jobs = db.select(
+            func.count(JobPosting.id).label('total_jobs'),
+            count_where(JobPosting.posted_date >= thirty_days_ago).label('new_jobs_this_month'),
+            count_where(JobPosting.posted_date >= today).label('jobs_posted_today')
+        ).subquery()
+        applications = db.select(
+            func.count(Application.id).label('total_applications'),
+            count_where(Application.application_date >= thirty_days_ago).label('new_applications_this_month'),
+            count_where(Application.application_date >= today).label('applications_today')
+        ).subquery()
+        
+        # Each derived table is a single row, so the cross join is one row too
+        counts = db.session.execute(
+            db.select(users, jobs, applications)
+              .select_from(users)
+              .join(jobs, db.true())
+              .join(applications, db.true())
+        ).mappings().one()
+        
+        recent_users = db.session.query(
+            User.id, User.username, User.role, User.is_active, User.created_at
+        ).order_by(User.created_at.desc()).limit(5).all()
+        recent_jobs = db.session.query(
+            JobPosting.id, JobPosting.title, JobPosting.company_name,
+            JobPosting.posted_date, JobPosting.application_count
+        ).order_by(JobPosting.posted_date.desc()).limit(5).all()
+        
+        overview = dict(counts)
+        overview.update({
+            'recent_users': recent_users,  # Last 5 users
+            'recent_jobs': recent_jobs,   # Last 5 jobs
+            'total_employers': counts['employers_count'],
+            'active_employers': counts['employers_count'],  # Simplified for now
+        })
+        return overview
+    
+    @staticmethod
+    def empty_system_overview():
+        """System overview with every figure zeroed, shown when counting fails"""
+        return {
+            'total_users': 0,
+            'total_jobs': 0,
+            'total_applications': 0,
+            'seekers_count': 0,
+            'employers_count': 0,
+            'admins_count': 0,
+            'recent_users': [],
+            'recent_jobs': [],
+            'new_users_this_month': 0,
+            'new_jobs_this_month': 0,
+            'new_applications_this_month': 0,
+            'total_employers': 0,
+            'active_employers': 0,
+            'applications_today': 0,
+            'jobs_posted_today': 0,
+            'new_users_today': 0
+        }
     
     @staticmethod
     def get_admin_count():
@@ -312,35 +428,19 @@ class User(db.Model):
     
     @staticmethod
     def get_recent_admin_activities():
-        """Get recent admin activities"""
+        """Get recent admin activities from the activity log"""
         try:
-            # For now, return recent admin logins or actions
-            # You can expand this to track actual admin activities
-            recent_admins = User.query.filter_by(role='admin').order_by(User.created_at.desc()).limit(5).all()
-            
-            activities = []
-            for admin in recent_admins:
-                activities.append({
-                    'username': admin.username,
-                    'action': 'Admin account created',
-                    'date': admin.created_at
-                })
-            
-            return activities
+            from app.activity import get_recent_activity
+            
+            return [{
+                'username': event.actor_name,
+                'action': f"{event.action}: {event.details}" if event.details else event.action,
+                'date': event.occurred_at
+            } for event in get_recent_activity(limit=5, event_types=('admin',))]
         except Exception as e:
             print(f"Error in get_recent_admin_activities: {e}")
             return []
     
-    @staticmethod
-    def get_active_users():
-        """Get list of active users"""
-        try:
-            # Assuming you want all active users
-            return User.query.all()
-        except Exception as e:
-            print(f"Error in get_active_users: {e}")
-            return []
-    
     def get_permissions(self):
         """Get user permissions"""
         if self.role == 'admin':
@@ -409,14 +509,13 @@ class User(db.Model):
     def create_admin(cls, username, email, password, permissions, full_name=None, created_by=None):
         """Create a new admin user with specified permissions"""
         try:
-            from werkzeug.security import generate_password_hash
             import json
             
-            # Create the admin user - remove created_at parameter
+            # Create the admin user - the constructor hashes the password
             new_admin = cls(
                 username=username,
                 email=email,
-                password=generate_password_hash(password),
+                password=password,
                 role='admin',
                 full_name=full_name
                 # Remove created_at=datetime.utcnow() - this should be handled automatically
@@ -476,40 +575,206 @@ class JobPosting(db.Model):
     # Custom questions for this job
     custom_questions = db.Column(db.Text, nullable=True)  # JSON string
     
+    # Application counters, kept in step with the applications table on write
+    application_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    pending_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    reviewed_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    accepted_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rejected_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
     # Relationships
     applications = db.relationship('Application', backref='job_posting', lazy=True, cascade='all, delete-orphan')
     
+    # Serves keyset pagination of the listings on (posted_date, id)
+    __table_args__ = (db.Index('ix_job_postings_posted_date_id', 'posted_date', 'id'),)
+    
     def __repr__(self):
         return f'<JobPosting {self.title}>'
     
+    @staticmethod
+    def count_application(job_id, new_status=None, old_status=None):
+        """Move one application between the counters of a job
+        
+        Pass new_status for a new application, old_status for a removed one
+        and both for a status change. The counters are updated in SQL
+        (count = count + 1) within the caller's transaction, so they commit
+        or roll back together with the application itself.
+        """
+        deltas = {}
+        if new_status in APPLICATION_STATUSES:
+            deltas[f'{new_status}_count'] = deltas.get(f'{new_status}_count', 0) + 1
+        if old_status in APPLICATION_STATUSES:
+            deltas[f'{old_status}_count'] = deltas.get(f'{old_status}_count', 0) - 1
+        if new_status and not old_status:
+            deltas['application_count'] = 1
+        elif old_status and not new_status:
+            deltas['application_count'] = -1
+        
+        values = {
+            getattr(JobPosting, column): getattr(JobPosting, column) + delta
+            for column, delta in deltas.items() if delta
+        }
+        if values:
+            JobPosting.query.filter(JobPosting.id == job_id).update(values, synchronize_session=False)
+    
+    @staticmethod
+    def reconcile_application_counts():
+        """Recount every job's application counters from the applications table
+        
+        Returns the number of jobs whose counters were out of step.
+        """
+        def counted(*criteria):
+            return db.select(func.count(Application.id))\
+                     .where(Application.job_id == JobPosting.id, *criteria)\
+                     .scalar_subquery()
+        
+        recounts = {JobPosting.application_count: counted()}
+        for status in APPLICATION_STATUSES:
+            recounts[getattr(JobPosting, f'{status}_count')] = counted(Application.status == status)
+        
+        drifted = JobPosting.query.filter(
+            or_(*[column != recount for column, recount in recounts.items()])
+        ).count()
+        if drifted:
+            JobPosting.query.update(recounts, synchronize_session=False)
+        db.session.commit()
+        return drifted
+
+    @staticmethod
+    def admin_status_clauses(status):
+        """Filter clauses for the status choices of the admin job listing"""
+        if status == 'active':
+            return [JobPosting.is_active == True, JobPosting.is_draft == False]
+        if status == 'inactive':
+            return [JobPosting.is_active == False, JobPosting.is_draft == False]
+        if status == 'draft':
+            return [JobPosting.is_draft == True]
+        return []
+
+    @staticmethod
+    def admin_clauses(status, search):
+        """Filter clauses for the status and search of the admin job listing"""
+        from app.fulltext import match_jobs
+
+        clauses = JobPosting.admin_status_clauses(status)
+        if search:
+            search_clause = match_jobs(search)
+            if search_clause is not None:
+                clauses.append(search_clause)
+        return clauses
+
+    @staticmethod
+    def get_admin_page(clauses, per_page=25, cursor=None, page=1, total=None):
+        """Get one window of the admin job listing, newest first
+
+        A single projected query joins the employer's username, takes the
+        application totals from the counters and cuts the description down
+        to ADMIN_DESCRIPTION_PREVIEW characters in SQL, so a page holds
+        per_page small rows whatever the size of the table or the postings.
+        Items are plain result rows; ``description_truncated`` is set when
+        the preview is shorter than the description.
+        """
+        from app.pagination import keyset_window
+
+        query = db.session.query(
+            JobPosting.id,
+            JobPosting.title,
+            JobPosting.company_name,
+            JobPosting.location,
+            JobPosting.job_type,
+            JobPosting.salary_range,
+            func.substr(JobPosting.description, 1, ADMIN_DESCRIPTION_PREVIEW).label('description'),
+            (func.length(JobPosting.description) > ADMIN_DESCRIPTION_PREVIEW).label('description_truncated'),
+            JobPosting.posted_date,
+            JobPosting.is_active,
+            JobPosting.is_draft,
+            JobPosting.employer_id,
+            JobPosting.application_count,
+            User.username.label('employer_username')
+        ).outerjoin(User, JobPosting.employer_id == User.id).filter(*clauses)
+
+        return keyset_window(query, (JobPosting.posted_date, JobPosting.id), per_page,
+                             cursor=cursor, page=page, total=total,
+                             parsers=(datetime.fromisoformat, int))
+
     @staticmethod
     def search_jobs(keyword):
-        """Search for jobs by keyword in title or description"""
+        """Search active jobs by keyword using the configured search engine"""
         if not keyword:
             return []
         
-        # Use SQLite LIKE operator for case-insensitive search
-        search_term = f"%{keyword}%"
-        
         try:
-            jobs = JobPosting.query.filter(
-                db.and_(
-                    JobPosting.is_active == True,
-                    db.or_(
-                        JobPosting.title.like(search_term),
-                        JobPosting.description.like(search_term),
-                        JobPosting.company_name.like(search_term),
-                        JobPosting.location.like(search_term)
-                    )
-                )
-            ).order_by(desc(JobPosting.date_posted)).all()
-            
-            return jobs
+            from app.search import get_search_engine
+            
+            job_ids = get_search_engine().search(keyword)
+            if not job_ids:
+                return []
+            
+            # Load the matching rows and keep the engine's ordering
+            jobs_by_id = {
+                job.id: job for job in JobPosting.query.filter(JobPosting.id.in_(job_ids)).all()
+            }
+            return [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
             
         except Exception as e:
             print(f"Search error: {e}")
             return []
 
+    @staticmethod
+    def search_page(keyword, page=1, per_page=10, cursor=None, fuzzy_fallback=True, total=None):
+        """Get one window of search results ranked by relevance
+        
+        Pages can be addressed by number or, for cheap "next" links, by the
+        opaque cursor of the previous window. When nothing matches exactly the
+        window is filled with typo-tolerant trigram matches and ``fuzzy`` is set.
+        Matches are counted on the first page only; later pages take the
+        first page's ``total`` from their links, verified with load_total().
+        """
+        from app.search import get_search_engine
+        from app.fuzzy import get_fuzzy_matcher
+        from app.pagination import ResultWindow, encode_cursor, decode_cursor
+        
+        page = max(page or 1, 1)
+        if not keyword:
+            return ResultWindow([], page, per_page, 0)
+        
+        after = decode_cursor(cursor)
+        try:
+            after = (float(after[0]), int(after[1])) if after else None
+        except (TypeError, ValueError, IndexError):
+            after = None
+        offset = 0 if after else (page - 1) * per_page
+        
+        fuzzy = False
+        total_arg = total
+        try:
+            hits, total = get_search_engine().ranked_search(keyword, per_page, offset=offset, after=after)
+            fuzzy_matcher = get_fuzzy_matcher()
+            if total == 0 and fuzzy_fallback and fuzzy_matcher is not None:
+                hits, total = fuzzy_matcher.ranked_search(keyword, per_page, offset=offset, after=after)
+                fuzzy = True
+        except Exception as e:
+            print(f"Search error: {e}")
+            return ResultWindow([], page, per_page, 0)
+        
+        if total is None:
+            # Not counted past the first page: use the carried total, or what is known so far
+            seen = (page - 1) * per_page + len(hits)
+            total = max(total_arg, seen) if total_arg else seen + (1 if len(hits) == per_page else 0)
+        
+        job_ids = [job_id for _, job_id in hits]
+        jobs_by_id = {}
+        if job_ids:
+            # Cards show the employer, so load it with the jobs
+            jobs_by_id = {
+                job.id: job for job in JobPosting.query.options(db.joinedload(JobPosting.employer))
+                                                   .filter(JobPosting.id.in_(job_ids)).all()
+            }
+        jobs = [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
+        
+        next_cursor = encode_cursor(*hits[-1]) if len(hits) == per_page else None
+        return ResultWindow(jobs, page, per_page, total, next_cursor=next_cursor, fuzzy=fuzzy)
+
 class Application(db.Model):
     """Enhanced Application model for comprehensive job applications"""
     __tablename__ = 'applications'
@@ -569,11 +834,99 @@ class Application(db.Model):
     data_consent = db.Column(db.Boolean, default=False, nullable=False)
     
     # Add unique constraint to prevent duplicate applications
-    __table_args__ = (db.UniqueConstraint('job_id', 'seeker_id', name='unique_job_seeker_application'),)
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'seeker_id', name='unique_job_seeker_application'),
+        # Serves keyset pagination of a seeker's applications on (application_date, id)
+        db.Index('ix_applications_seeker_date_id', 'seeker_id', 'application_date', 'id'),
+    )
     
     def __repr__(self):
         return f'<Application Job:{self.job_id} Seeker:{self.seeker_id}>'
 
+class ActivityEvent(db.Model):
+    """Append-only log of user, job, application and admin events, written by app.activity"""
+    __tablename__ = 'activity_events'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    occurred_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)  # 'user', 'job', 'application', 'admin'
+    action = db.Column(db.String(50), nullable=False)
+    # No foreign key: events outlive the users they mention
+    actor_id = db.Column(db.Integer)
+    actor_name = db.Column(db.String(80))
+    details = db.Column(db.String(255))
+
+    __table_args__ = (
+        # Feeds read the newest events, all of them or of some types
+        db.Index('ix_activity_events_occurred_at_id', 'occurred_at', 'id'),
+        db.Index('ix_activity_events_type_occurred_at', 'event_type', 'occurred_at'),
+    )
+
+    def __repr__(self):
+        return f'<ActivityEvent {self.event_type}:{self.action} {self.occurred_at}>'
+
+class OutboundEmail(db.Model):
+    """Email waiting for, or done with, delivery by app.outbox"""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(40), nullable=False)  # e.g. 'password_reset'
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), default='pending', nullable=False)  # 'pending', 'sending', 'sent', 'failed'
+    attempts = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # When a pending email is next due, or when a claim on a sending one lapses
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(32))
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Workers claim the emails that are due, oldest first
+        db.Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+        db.Index('ix_email_outbox_claim_token', 'claim_token'),
+    )
+
+    def __repr__(self):
+        return f'<OutboundEmail {self.kind} to {self.recipient} {self.status}>'
+
+class ServerSession(db.Model):
+    """Session data kept server-side by app.sessions when SESSION_TYPE is 'sqlalchemy'"""
+    __tablename__ = 'user_sessions'
+
+    id = db.Column(db.String(64), primary_key=True)  # random id, signed in the session cookie
+    data = db.Column(db.LargeBinary, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<ServerSession expires {self.expires_at}>'
+
+class ReportCount(db.Model):
+    """Current number of rows per reporting dimension, kept by app.reporting"""
+    __tablename__ = 'report_counts'
+
+    metric = db.Column(db.String(40), primary_key=True)  # 'users', 'jobs', 'applications'
+    dimension = db.Column(db.String(40), primary_key=True)  # role, active/inactive or status
+    count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    def __repr__(self):
+        return f'<ReportCount {self.metric}:{self.dimension}={self.count}>'
+
+class ReportRollup(db.Model):
+    """Rows created per hour or day and dimension, kept by app.reporting"""
+    __tablename__ = 'report_rollups'
+
+    granularity = db.Column(db.String(8), primary_key=True)  # 'hour' or 'day'
+    metric = db.Column(db.String(40), primary_key=True)  # 'users_registered', 'jobs_posted', ...
+    period_start = db.Column(db.DateTime, primary_key=True)
+    dimension = db.Column(db.String(40), primary_key=True)
+    count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    def __repr__(self):
+        return f'<ReportRollup {self.granularity} {self.metric}:{self.dimension} {self.period_start}={self.count}>'
+
 # Helper function to create all tables
 def create_tables(app):
     """Create all database tables"""
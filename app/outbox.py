@@ -0,0 +1,377 @@
+"""
+Durable outbound email queue.
+
+Request handlers only call enqueue_email(), which adds a row to
+email_outbox in the request's own transaction, so an email is queued
+exactly when the change that caused it commits. Background threads in
+each worker (EMAIL_WORKERS of them, started with the first request) or
+``flask send-email`` deliver the queue:
+
+* A worker claims up to EMAIL_BATCH_SIZE due emails at once by stamping
+  them with a claim token and a lease, so workers in other processes skip
+  them. Before each send the worker renews that email's lease, and it
+  records the outcome straight after, so only a claim whose worker died
+  or stalled lapses, after CLAIM_LEASE_SECONDS.
+* Each email goes through the configured transport. Every thread shares
+  the transport, and with it one keep-alive HTTP session.
+* Failures are retried with exponential backoff and jitter, up to
+  EMAIL_MAX_ATTEMPTS; errors the provider reports as permanent are not.
+
+Transports are looked up by name in EMAIL_TRANSPORTS (EMAIL_TRANSPORT
+setting): 'formspree' posts to Formspree, 'console' prints and 'file'
+writes .eml files, which is what tests and local development use.
+"""
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from flask import current_app, g
+
+# Delivery threads per worker; 0 leaves delivery to `flask send-email`
+EMAIL_WORKERS = 2
+
+# Emails claimed and sent per round trip to the queue
+EMAIL_BATCH_SIZE = 20
+
+# How long an idle delivery thread sleeps before looking again, in seconds
+EMAIL_POLL_SECONDS = 5
+
+# Attempts before an email is given up on
+EMAIL_MAX_ATTEMPTS = 8
+
+# Retry delay after the first failure, doubled after each further one, and its cap
+EMAIL_BACKOFF_SECONDS = 30
+EMAIL_BACKOFF_MAX_SECONDS = 3600
+
+# A claimed email becomes due again if not settled within this long. The
+# lease is renewed before each send, so it only has to outlast one send
+# (at most sum(HTTP_TIMEOUT) seconds), not a whole batch.
+CLAIM_LEASE_SECONDS = 120
+
+# Sent emails are kept this long, then pruned
+EMAIL_RETENTION_DAYS = 30
+
+# How often a worker prunes sent emails, in seconds
+PRUNE_INTERVAL_SECONDS = 3600
+
+FORMSPREE_URL = 'https://formspree.io/f/xeolrqde'
+
+# (connect, read) timeouts for HTTP transports, in seconds
+HTTP_TIMEOUT = (5, 15)
+
+
+class EmailDeliveryError(Exception):
+    """A transport failed to send; permanent errors are not retried"""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class EmailTransport:
+    """Base class for the ways emails leave the application"""
+
+    name = 'base'
+
+    def send(self, email):
+        """Send one OutboundEmail row; raise EmailDeliveryError on failure"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections or files"""
+
+
+class ConsoleTransport(EmailTransport):
+    """Prints emails instead of sending them"""
+
+    name = 'console'
+
+    def send(self, email):
+        print(f"""
+=== EMAIL ({email.kind}) ===
+To: {email.recipient}
+Subject: {email.subject}
+
+{email.body}
+===========================
+        """)
+
+
+class FileTransport(EmailTransport):
+    """Writes each email to an .eml file in a directory"""
+
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, email):
+        message = EmailMessage()
+        message['To'] = email.recipient
+        message['Subject'] = email.subject
+        message['X-FindJob-Kind'] = email.kind
+        message.set_content(email.body)
+        path = os.path.join(self.directory, f"{email.id:08d}-{email.kind}.eml")
+        try:
+            with open(path, 'wb') as handle:
+                handle.write(message.as_bytes())
+        except OSError as e:
+            raise EmailDeliveryError(f"Could not write {path}: {e}")
+
+
+class FormspreeTransport(EmailTransport):
+    """Posts emails to a Formspree form over one keep-alive session"""
+
+    name = 'formspree'
+
+    def __init__(self, url=FORMSPREE_URL, timeout=HTTP_TIMEOUT, connections=EMAIL_WORKERS):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = url
+        self.timeout = timeout
+        self._requests = requests
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=max(connections, 1)))
+
+    def send(self, email):
+        form_data = {
+            'email': email.recipient,
+            'subject': email.subject,
+            'message': email.body,
+            '_replyto': email.recipient,
+            '_subject': email.subject
+        }
+        try:
+            response = self.session.post(self.url, data=form_data, timeout=self.timeout,
+                                         headers={'Accept': 'application/json'})
+        except self._requests.RequestException as e:
+            raise EmailDeliveryError(f"Formspree unreachable: {e}")
+        if response.status_code == 200:
+            return
+        # Rate limits and server errors pass; anything else will fail again
+        permanent = 400 <= response.status_code < 500 and response.status_code != 429
+        raise EmailDeliveryError(f"Formspree error: {response.status_code} - {response.text[:120]}",
+                                 permanent=permanent)
+
+    def close(self):
+        self.session.close()
+
+
+EMAIL_TRANSPORTS = {
+    ConsoleTransport.name: ConsoleTransport,
+    FileTransport.name: FileTransport,
+    FormspreeTransport.name: FormspreeTransport,
+}
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next try after the given number of failures"""
+    delay = min(EMAIL_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), EMAIL_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Outbox:
+    """Claims due emails from email_outbox and sends them through a transport"""
+
+    def __init__(self, transport, workers=EMAIL_WORKERS, batch_size=EMAIL_BATCH_SIZE,
+                 poll_seconds=EMAIL_POLL_SECONDS, max_attempts=EMAIL_MAX_ATTEMPTS):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+
+    def claim(self, now=None):
+        """Claim a batch of due emails; returns them as rows"""
+        from app.models import db, OutboundEmail
+
+        now = now or datetime.utcnow()
+        token = uuid.uuid4().hex
+        emails = OutboundEmail.__table__
+        due = [emails.c.status.in_(('pending', 'sending')), emails.c.next_attempt_at <= now]
+
+        with db.engine.begin() as connection:
+            candidates = db.select(emails.c.id).where(*due)\
+                .order_by(emails.c.next_attempt_at, emails.c.id).limit(self.batch_size)
+            if connection.dialect.name == 'postgresql':
+                candidates = candidates.with_for_update(skip_locked=True)
+            ids = connection.execute(candidates).scalars().all()
+            if not ids:
+                return []
+            # Re-checking the due condition leaves out emails claimed meanwhile
+            connection.execute(
+                emails.update().where(emails.c.id.in_(ids), *due).values(
+                    status='sending', claim_token=token,
+                    next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+                )
+            )
+            return connection.execute(
+                db.select(emails).where(emails.c.claim_token == token).order_by(emails.c.id)
+            ).all()
+
+    def renew(self, email):
+        """Extend the lease on one claimed email; False if the claim lapsed and was taken over"""
+        from app.models import db, OutboundEmail
+
+        emails = OutboundEmail.__table__
+        with db.engine.begin() as connection:
+            return connection.execute(
+                emails.update().where(emails.c.id == email.id, emails.c.claim_token == email.claim_token)
+                .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=CLAIM_LEASE_SECONDS))
+            ).rowcount == 1
+
+    def settle(self, email, error=None):
+        """Record the outcome of sending one claimed email"""
+        from app.models import db, OutboundEmail
+
+        now = datetime.utcnow()
+        emails = OutboundEmail.__table__
+        attempts = email.attempts + 1
+        mine = emails.update().where(emails.c.id == email.id, emails.c.claim_token == email.claim_token)
+        if error is None:
+            values = {'status': 'sent', 'sent_at': now, 'last_error': None}
+        else:
+            give_up = getattr(error, 'permanent', False) or attempts >= self.max_attempts
+            print(f"Error sending {email.kind} email {email.id} (attempt {attempts}): {error}")
+            values = {'status': 'failed' if give_up else 'pending', 'last_error': str(error)[:255],
+                      'next_attempt_at': now + timedelta(seconds=0 if give_up else backoff_delay(attempts))}
+        with db.engine.begin() as connection:
+            connection.execute(mine.values(attempts=attempts, claim_token=None, **values))
+
+    def deliver_due(self, now=None):
+        """Send one batch of due emails; returns how many were attempted
+
+        Each email's lease is renewed just before it is sent and the result
+        recorded right after, so a slow batch never outlives the lease of an
+        email still to be sent or settled. An email whose claim lapsed in the
+        meantime belongs to another worker and is skipped.
+        """
+        batch = self.claim(now)
+        for email in batch:
+            if not self.renew(email):
+                continue
+            try:
+                self.transport.send(email)
+                error = None
+            except Exception as e:
+                error = e
+            self.settle(email, error)
+        return len(batch)
+
+    def prune(self, older_than_days=EMAIL_RETENTION_DAYS):
+        """Delete sent emails older than the retention period; returns how many"""
+        from app.models import db, OutboundEmail
+
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+        emails = OutboundEmail.__table__
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        with db.engine.begin() as connection:
+            return connection.execute(
+                emails.delete().where(emails.c.status == 'sent', emails.c.sent_at < cutoff)
+            ).rowcount
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self, app):
+        """Start the delivery threads of this worker, once"""
+        if not self.workers or self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._run, args=(app,), name=f'outbox-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self, app):
+        from app.models import db
+
+        while True:
+            attempted = 0
+            with app.app_context():
+                try:
+                    attempted = self.deliver_due()
+                    if time.monotonic() >= self._next_prune:
+                        self.prune()
+                except Exception as e:
+                    print(f"Error delivering queued email: {e}")
+                finally:
+                    db.session.remove()
+            # A full batch suggests more are waiting
+            if attempted < self.batch_size:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+
+def make_transport(app):
+    """Build the transport named by the EMAIL_TRANSPORT setting"""
+    name = app.config.get('EMAIL_TRANSPORT', ConsoleTransport.name)
+    transport_class = EMAIL_TRANSPORTS.get(name)
+    if transport_class is None:
+        print(f"Unknown EMAIL_TRANSPORT {name!r}; printing emails instead")
+        return ConsoleTransport()
+    if transport_class is FileTransport:
+        return FileTransport(app.config.get('EMAIL_FILE_DIR', os.path.join(app.instance_path, 'outbox')))
+    if transport_class is FormspreeTransport:
+        return FormspreeTransport(url=app.config.get('FORMSPREE_URL', FORMSPREE_URL),
+                                  connections=app.config.get('EMAIL_WORKERS', EMAIL_WORKERS))
+    return transport_class()
+
+
+class EmailOutbox:
+    """Flask extension that delivers the email queue from each worker"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        outbox = Outbox(
+            make_transport(app),
+            workers=app.config.get('EMAIL_WORKERS', EMAIL_WORKERS),
+            batch_size=app.config.get('EMAIL_BATCH_SIZE', EMAIL_BATCH_SIZE),
+            poll_seconds=app.config.get('EMAIL_POLL_SECONDS', EMAIL_POLL_SECONDS),
+            max_attempts=app.config.get('EMAIL_MAX_ATTEMPTS', EMAIL_MAX_ATTEMPTS)
+        )
+        app.extensions['email_outbox'] = outbox
+
+        # Started by the first request, so CLI commands and tests stay single-threaded
+        @app.before_request
+        def start_outbox():
+            outbox.start(app)
+
+        @app.teardown_request
+        def wake_outbox(exc=None):
+            if g.pop('outbox_pending', False):
+                outbox.wake()
+
+
+email_outbox = EmailOutbox()
+
+
+def get_outbox():
+    """Get the email outbox for the current app"""
+    return current_app.extensions.get('email_outbox')
+
+
+def enqueue_email(kind, recipient, subject, body):
+    """Queue an email in the current transaction; the caller commits"""
+    from app.models import db, OutboundEmail
+
+    email = OutboundEmail(kind=kind, recipient=recipient, subject=subject[:200], body=body,
+                          status='pending', next_attempt_at=datetime.utcnow())
+    db.session.add(email)
+    g.outbox_pending = True
+    return email
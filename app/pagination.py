@@ -0,0 +1,219 @@
+"""
+Result windows and opaque cursors for paginated listings.
+
+ResultWindow exposes the same attributes templates already use on
+Flask-SQLAlchemy's Pagination (items, page, pages, has_next, iter_pages,
+...) so listings that compute their own windows can share jobs.html.
+KeysetWindow pages by seeking past the sort key of the last row shown
+instead of with OFFSET, so every page costs the same to fetch.
+
+A count carried from one page to the next in a link is signed with the
+app's SECRET_KEY and bound to its query, so a client can't make a listing
+claim more matches than the first page counted.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import tuple_
+
+TOTAL_SALT = 'result-total'
+
+
+def _cursor_value(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def encode_cursor(*values):
+    """Encode a position (e.g. score and id) as an opaque URL-safe string"""
+    raw = json.dumps(values, separators=(',', ':'), default=_cursor_value).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor; returns None if it is malformed"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _total_serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=TOTAL_SALT)
+
+
+def sign_total(total, scope):
+    """Signed token carrying a result count for the listing identified by scope"""
+    if total is None:
+        return None
+    return _total_serializer().dumps([scope, total])
+
+
+def load_total(token, scope):
+    """The count in a sign_total token for scope; None if it is missing, forged or for another scope"""
+    if not token:
+        return None
+    try:
+        values = _total_serializer().loads(token)
+    except BadSignature:
+        return None
+    if not isinstance(values, list) or len(values) != 2 or values[0] != scope:
+        return None
+    total = values[1]
+    return total if isinstance(total, int) and not isinstance(total, bool) and total >= 0 else None
+
+
+class ResultWindow:
+    """One page of results plus the navigation state around it"""
+
+    def __init__(self, items, page, per_page, total, next_cursor=None, fuzzy=False, prev_cursor=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        # True when the items are typo-tolerant matches rather than exact ones
+        self.fuzzy = fuzzy
+
+    @property
+    def pages(self):
+        if not self.total or not self.per_page:
+            return 0
+        return math.ceil(self.total / self.per_page)
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """Yield page numbers for a pagination widget, None marks a gap"""
+        pages_end = self.pages + 1
+        if pages_end == 1:
+            return
+
+        left_end = min(1 + left_edge, pages_end)
+        yield from range(1, left_end)
+        if left_end == pages_end:
+            return
+
+        mid_start = max(left_end, self.page - left_current)
+        mid_end = min(self.page + right_current + 1, pages_end)
+        if mid_start - left_end > 0:
+            yield None
+        yield from range(mid_start, mid_end)
+        if mid_end == pages_end:
+            return
+
+        right_start = max(mid_end, pages_end - right_edge)
+        if right_start - mid_end > 0:
+            yield None
+        yield from range(right_start, pages_end)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class KeysetWindow(ResultWindow):
+    """A window fetched by seeking; only the neighbouring pages are linkable
+
+    ``total`` may be approximate, so the next and previous links come from
+    the cursors rather than from the page count.
+    """
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def prev_num(self):
+        return max(self.page - 1, 1) if self.has_prev else None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, **kwargs):
+        """The first page is always reachable without a cursor"""
+        if self.page > 1:
+            yield 1
+        if self.page > 2:
+            yield None
+        yield self.page
+
+
+def keyset_window(query, keys, per_page, cursor=None, page=1, total=None, parsers=None, descending=True):
+    """Fetch one window of query ordered by keys, newest (largest) first
+
+    ``keys`` are columns that together order rows uniquely, e.g. the posted
+    date and the id. The rows of a window are found with a row-value
+    comparison against the cursor, which an index on the keys answers
+    without reading the rows of earlier pages. ``parsers`` turn decoded
+    cursor values back into key values (e.g. datetime.fromisoformat).
+    With ``descending=False`` the smallest keys come first instead.
+    """
+    parsers = parsers or [None] * len(keys)
+
+    position = None
+    backwards = False
+    values = decode_cursor(cursor)
+    if values and len(values) == len(keys) + 1 and values[0] in ('next', 'prev'):
+        try:
+            position = tuple(parse(value) if parse else value for parse, value in zip(parsers, values[1:]))
+            backwards = values[0] == 'prev'
+        except (TypeError, ValueError):
+            position = None
+    # Walking back through a descending listing reads it ascending, and vice versa
+    ascending = backwards == descending
+    if position is not None:
+        row_key = tuple_(*keys)
+        query = query.filter(row_key > tuple_(*position) if ascending else row_key < tuple_(*position))
+
+    ordering = [key.asc() if ascending else key.desc() for key in keys]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    # Whether rows exist before and after this window
+    earlier = more if backwards else position is not None
+    later = position is not None if backwards else more
+    if not earlier:
+        page = 1
+    elif page < 2:
+        page = 2
+
+    def position_of(row):
+        return [getattr(row, key.key) for key in keys]
+
+    next_cursor = encode_cursor('next', *position_of(rows[-1])) if rows and later else None
+    prev_cursor = encode_cursor('prev', *position_of(rows[0])) if rows and earlier else None
+    return KeysetWindow(rows, page, per_page, total, next_cursor=next_cursor, prev_cursor=prev_cursor)
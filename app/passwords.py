@@ -0,0 +1,224 @@
+"""
+Password hashing off the request threads.
+
+Werkzeug's KDFs are deliberately slow, and a gunicorn worker has only a
+couple of request threads, so a few logins at once used to stall every
+other page. Hashes and checks now run in a small per-worker process pool.
+At most PASSWORD_HASH_MAX_PENDING of them may be queued or running; past
+that, callers get PasswordHashingBusy straight away instead of piling up
+behind the pool.
+
+The KDF is a deployment setting (PASSWORD_HASH_METHOD, any method
+Werkzeug's generate_password_hash accepts). Stored hashes made with other
+parameters keep working, and login replaces them once the password is
+known to be right.
+"""
+import atexit
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Werkzeug method string for new hashes, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+PASSWORD_HASH_METHOD = 'scrypt'
+
+# Hashing processes per worker; 0 hashes on the calling thread
+PASSWORD_HASH_WORKERS = 1
+
+# Hashes queued or running at once before callers are turned away
+PASSWORD_HASH_MAX_PENDING = 8
+
+# Longest a caller waits for its hash, in seconds
+PASSWORD_HASH_TIMEOUT = 10
+
+# Recent latencies kept for the percentiles in stats()
+LATENCY_SAMPLES = 256
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many hashes are already waiting"""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored, password):
+    return check_password_hash(stored, password)
+
+
+def hash_parameters(stored):
+    """The method part of a Werkzeug hash, e.g. 'scrypt:32768:8:1'"""
+    return (stored or '').split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Bounded process pool for password hashes, with timing metrics"""
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING, timeout=PASSWORD_HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        # Werkzeug fills in default parameters, so compare against a real hash
+        self.parameters = hash_parameters(generate_password_hash('', method=method))
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._counts = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0, 'failed': 0}
+        self._seconds = 0.0
+        self._pending = 0
+        self._started = time.monotonic()
+
+    def _executor(self):
+        # Started on first use, so it belongs to the process serving requests
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _run(self, kind, function, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counts['rejected'] += 1
+            raise PasswordHashingBusy('Too many password hashes in progress')
+
+        started = time.monotonic()
+        with self._lock:
+            self._pending += 1
+        future = None
+        try:
+            if self.workers:
+                future = self._executor().submit(function, *args)
+                # The slot stays taken until the pool is done with the hash, even
+                # when the caller gives up waiting, so max_pending bounds the pool
+                future.add_done_callback(self._release)
+                try:
+                    result = future.result(timeout=self.timeout)
+                except Exception:
+                    # Drop it from the queue if it hasn't started yet
+                    future.cancel()
+                    raise
+            else:
+                result = function(*args)
+        except Exception:
+            with self._lock:
+                self._counts['failed'] += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            if future is None:
+                self._release()
+
+        with self._lock:
+            self._counts[kind] += 1
+            self._seconds += elapsed
+            self._latencies.append(elapsed)
+        return result
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def hash(self, password):
+        return self._run('hashed', _hash, password, self.method)
+
+    def verify(self, stored, password):
+        if not stored:
+            return False
+        return self._run('verified', _verify, stored, password)
+
+    def needs_rehash(self, stored):
+        """True when stored was made with other parameters than the current ones"""
+        return hash_parameters(stored) != self.parameters
+
+    def record_rehash(self):
+        with self._lock:
+            self._counts['rehashed'] += 1
+
+    def stats(self):
+        """Counts, throughput and latency (queue wait included) of this worker's hashes"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            done = self._counts['hashed'] + self._counts['verified']
+            uptime = time.monotonic() - self._started
+
+            def percentile(fraction):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000, 1)
+
+            return {
+                'method': self.parameters,
+                'workers': self.workers,
+                'pending': self._pending,
+                **self._counts,
+                'per_second': round(done / uptime, 3) if uptime else 0.0,
+                'mean_ms': round(self._seconds / done * 1000, 1) if done else None,
+                'p50_ms': percentile(0.5),
+                'p95_ms': percentile(0.95),
+            }
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class Passwords:
+    """Flask extension that gives each worker its password hashing pool"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        hasher = PasswordHasher(
+            method=app.config.get('PASSWORD_HASH_METHOD', PASSWORD_HASH_METHOD),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', PASSWORD_HASH_WORKERS),
+            max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_MAX_PENDING),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', PASSWORD_HASH_TIMEOUT)
+        )
+        app.extensions['password_hasher'] = hasher
+        atexit.register(hasher.shutdown)
+
+
+passwords = Passwords()
+
+
+def get_password_hasher():
+    """Get the password hasher for the current app, if it has one"""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('password_hasher')
+
+
+def hash_password(password):
+    """Hash a new password with the configured KDF"""
+    hasher = get_password_hasher()
+    if hasher is None:
+        return generate_password_hash(password)
+    return hasher.hash(password)
+
+
+def verify_password(stored, password):
+    """Check a password against a stored hash of any supported method"""
+    hasher = get_password_hasher()
+    if hasher is None:
+        return check_password_hash(stored, password)
+    return hasher.verify(stored, password)
+
+
+def password_needs_rehash(stored):
+    """True when stored should be replaced by a hash with the current KDF"""
+    hasher = get_password_hasher()
+    return hasher is not None and hasher.needs_rehash(stored)
@@ -0,0 +1,187 @@
+"""
+Presence tracking for signed-in users.
+
+Every authenticated request marks its user as seen. The users.last_seen
+column is written behind: a sliding window of minute buckets keeps each
+user's latest sighting, so a user is queued for writing at most once a
+minute. Queued sightings are flushed in one batched UPDATE at most every
+PRESENCE_FLUSH_SECONDS.
+
+The admin dashboard's active session, daily and monthly active figures
+are counted from the indexed last_seen column in one query, so they
+cover every worker and instance. They lag live traffic by at most one
+flush interval.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, session
+
+# Users seen within this many minutes count as active sessions
+ACTIVE_SESSION_MINUTES = 15
+
+# Day window behind the monthly active users figure
+MONTHLY_ACTIVE_DAYS = 30
+
+# How often pending last_seen values are written to the database
+PRESENCE_FLUSH_SECONDS = 60
+
+
+class SlidingPresence:
+    """Latest bucket each user was seen in, over a sliding window of fixed-width buckets"""
+
+    def __init__(self, bucket_seconds, window):
+        self.bucket_seconds = bucket_seconds
+        self.window = window
+        self._latest = {}  # user id -> bucket the user was last seen in
+        self._buckets = {}  # bucket -> set of user ids last seen in it
+
+    def bucket_of(self, timestamp):
+        return int(timestamp // self.bucket_seconds)
+
+    def touch(self, user_id, timestamp):
+        """Record a sighting; returns True when the user changed bucket"""
+        bucket = self.bucket_of(timestamp)
+        previous = self._latest.get(user_id)
+        if previous is not None and previous >= bucket:
+            return False
+        if previous is not None:
+            self._discard(user_id, previous)
+        self._latest[user_id] = bucket
+        self._buckets.setdefault(bucket, set()).add(user_id)
+        self._expire(bucket)
+        return True
+
+    def forget(self, user_id):
+        previous = self._latest.pop(user_id, None)
+        if previous is not None:
+            self._discard(user_id, previous)
+
+    def _discard(self, user_id, bucket):
+        users = self._buckets.get(bucket)
+        if users is not None:
+            users.discard(user_id)
+            if not users:
+                del self._buckets[bucket]
+
+    def _expire(self, current):
+        for bucket in [bucket for bucket in self._buckets if bucket <= current - self.window]:
+            for user_id in self._buckets.pop(bucket):
+                if self._latest.get(user_id) == bucket:
+                    del self._latest[user_id]
+
+
+class PresenceTracker:
+    """Per-worker sightings waiting to be written to users.last_seen"""
+
+    def __init__(self, session_minutes=ACTIVE_SESSION_MINUTES, flush_seconds=PRESENCE_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._minutes = SlidingPresence(60, session_minutes)
+        self._pending = {}  # user id -> latest unsaved sighting
+        self._next_flush = time.time() + flush_seconds
+
+    def touch(self, user_id, now=None):
+        """Record that user_id made a request"""
+        now = time.time() if now is None else now
+        with self._lock:
+            # last_seen is only kept to the minute
+            if self._minutes.touch(user_id, now):
+                self._pending[user_id] = now
+
+    def forget(self, user_id):
+        """Drop a signed-out user, so their next sighting is written straight away"""
+        with self._lock:
+            self._minutes.forget(user_id)
+
+    def counts(self, now=None):
+        """Active sessions, daily and monthly active users of every worker
+
+        Counted from users.last_seen after flushing this worker's sightings.
+        """
+        from app.models import db, User
+
+        if self._pending:
+            self.flush()
+        now = now or datetime.utcnow()
+        session_cutoff = now - timedelta(minutes=self._minutes.window)
+        day_cutoff = now - timedelta(days=1)
+        month_cutoff = now - timedelta(days=MONTHLY_ACTIVE_DAYS)
+        row = db.session.query(
+            db.func.count(db.case((User.last_seen >= session_cutoff, 1))),
+            db.func.count(db.case((User.last_seen >= day_cutoff, 1))),
+            db.func.count()
+        ).filter(User.last_seen >= month_cutoff).one()
+        return {'active_sessions': row[0], 'daily_active_users': row[1], 'monthly_active_users': row[2]}
+
+    def flush_due(self, now=None):
+        now = time.time() if now is None else now
+        return bool(self._pending) and now >= self._next_flush
+
+    def flush(self):
+        """Write the pending last_seen values in one batched UPDATE"""
+        from app.models import db, User
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._next_flush = time.time() + self.flush_seconds
+        if not pending:
+            return 0
+
+        users = User.__table__
+        statement = (
+            users.update()
+            .where(users.c.id == db.bindparam('user_id'))
+            # Presence is not an edit of the account, so keep updated_at
+            .values(last_seen=db.bindparam('seen_at'), updated_at=users.c.updated_at)
+        )
+        rows = [
+            {'user_id': user_id, 'seen_at': datetime.utcfromtimestamp(seen)}
+            for user_id, seen in pending.items()
+        ]
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(statement, rows)
+        except Exception as e:
+            print(f"Error flushing last_seen: {e}")
+            # Keep the sightings for the next attempt unless newer ones arrived
+            with self._lock:
+                for user_id, seen in pending.items():
+                    self._pending.setdefault(user_id, seen)
+            return 0
+        return len(rows)
+
+
+class Presence:
+    """Flask extension that records authenticated requests"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        tracker = PresenceTracker(
+            session_minutes=app.config.get('ACTIVE_SESSION_MINUTES', ACTIVE_SESSION_MINUTES),
+            flush_seconds=app.config.get('PRESENCE_FLUSH_SECONDS', PRESENCE_FLUSH_SECONDS)
+        )
+        app.extensions['presence'] = tracker
+
+        @app.before_request
+        def record_presence():
+            user_id = session.get('user_id')
+            if user_id is not None:
+                tracker.touch(user_id)
+
+        @app.teardown_request
+        def flush_presence(exc=None):
+            if tracker.flush_due():
+                tracker.flush()
+
+
+presence = Presence()
+
+
+def get_presence():
+    """Get the presence tracker for the current app"""
+    return current_app.extensions.get('presence')
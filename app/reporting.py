@@ -0,0 +1,399 @@
+"""
+Pre-aggregated reporting figures.
+
+/admin/reports used to count the users, job_postings and applications
+tables on every load. Two small tables now hold the figures instead:
+
+* report_counts has the current number of users per role, jobs per
+  active/inactive state and applications per status.
+* report_rollups has the users registered, jobs posted and applications
+  submitted per hour and per day.
+
+Both are kept up to date from the ORM: every flush turns the users, jobs
+and applications it inserts, updates or deletes into count deltas that are
+applied in the same transaction, so the figures commit or roll back with
+the change. Writes that bypass the ORM (bulk updates and deletes) must
+report their rows with record_count_changes() or
+record_application_deletes(). ``flask backfill-reports`` rebuilds both
+tables from the raw tables; init_production.py runs it once when they are
+empty. Workers never backfill on start-up, where two of them could both
+add the full counts.
+
+The top employers and top seekers lists still need grouped queries over
+the raw tables, so each worker keeps them in a SnapshotCache for
+LEADERBOARD_CACHE_SECONDS and at most one request per worker recomputes
+them at a time.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+# Rollup granularities and the function truncating a timestamp to each
+GRANULARITIES = {
+    'hour': lambda value: value.replace(minute=0, second=0, microsecond=0),
+    'day': lambda value: value.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+# Days of daily rollups read by the reports page
+REPORT_DAYS = 30
+
+# Entries in the top employers and top seekers lists
+LEADERBOARD_SIZE = 5
+
+# How long a worker reuses those lists, in seconds
+LEADERBOARD_CACHE_SECONDS = 300
+
+
+def job_state(is_active):
+    return 'active' if is_active else 'inactive'
+
+
+def tracked_attributes():
+    """Model attributes whose changes move rows between report dimensions"""
+    from app.models import User, JobPosting, Application
+
+    return (User.role, JobPosting.is_active, Application.status)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    """No-op; registered only for its active_history flag"""
+
+
+def _committed(obj, attribute):
+    """Value of attribute as last loaded from the database"""
+    history = inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attribute)
+
+
+def _changed(obj, attribute):
+    """(old, new) when attribute was changed in this flush, else None"""
+    history = inspect(obj).attrs[attribute].history
+    if history.added and history.deleted and history.added[0] != history.deleted[0]:
+        return history.deleted[0], history.added[0]
+    return None
+
+
+class ReportDeltas:
+    """Count changes collected from one flush"""
+
+    def __init__(self):
+        self.counts = Counter()  # (metric, dimension) -> delta
+        self.rollups = Counter()  # (granularity, metric, period start, dimension) -> delta
+
+    def count(self, metric, dimension, delta=1):
+        self.counts[(metric, str(dimension))] += delta
+
+    def move(self, metric, old, new):
+        self.count(metric, old, -1)
+        self.count(metric, new, 1)
+
+    def created(self, metric, dimension, timestamp):
+        timestamp = timestamp or datetime.utcnow()
+        for granularity, truncate in GRANULARITIES.items():
+            self.rollups[(granularity, metric, truncate(timestamp), str(dimension))] += 1
+
+    def collect(self, session):
+        from app.models import User, JobPosting, Application
+
+        for obj in session.new:
+            if isinstance(obj, User):
+                self.count('users', obj.role)
+                self.created('users_registered', obj.role, obj.created_at)
+            elif isinstance(obj, JobPosting):
+                self.count('jobs', job_state(obj.is_active))
+                self.created('jobs_posted', 'all', obj.posted_date)
+            elif isinstance(obj, Application):
+                self.count('applications', obj.status)
+                self.created('applications_submitted', 'all', obj.application_date)
+
+        for obj in session.dirty:
+            if isinstance(obj, User):
+                change = _changed(obj, 'role')
+                if change:
+                    self.move('users', *change)
+            elif isinstance(obj, JobPosting):
+                change = _changed(obj, 'is_active')
+                if change:
+                    self.move('jobs', *map(job_state, change))
+            elif isinstance(obj, Application):
+                change = _changed(obj, 'status')
+                if change:
+                    self.move('applications', *change)
+
+        for obj in session.deleted:
+            if isinstance(obj, User):
+                self.count('users', _committed(obj, 'role'), -1)
+            elif isinstance(obj, JobPosting):
+                self.count('jobs', job_state(_committed(obj, 'is_active')), -1)
+            elif isinstance(obj, Application):
+                self.count('applications', _committed(obj, 'status'), -1)
+
+    def apply(self, connection):
+        from app.models import ReportCount, ReportRollup
+
+        counts = [
+            {'metric': metric, 'dimension': dimension, 'count': delta}
+            for (metric, dimension), delta in self.counts.items() if delta
+        ]
+        rollups = [
+            {'granularity': granularity, 'metric': metric, 'period_start': period_start,
+             'dimension': dimension, 'count': delta}
+            for (granularity, metric, period_start, dimension), delta in self.rollups.items() if delta
+        ]
+        for model, rows in ((ReportCount, counts), (ReportRollup, rollups)):
+            for row in rows:
+                _add_count(connection, model.__table__, row)
+
+
+def _add_count(connection, table, row):
+    """Add row['count'] to the row with the same key, creating it if needed"""
+    dialect = connection.dialect.name
+    keys = [column.name for column in table.primary_key.columns]
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(**row)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={'count': table.c.count + statement.excluded.count}
+        )
+        connection.execute(statement)
+        return
+
+    match = [table.c[key] == row[key] for key in keys]
+    updated = connection.execute(
+        table.update().where(*match).values(count=table.c.count + row['count'])
+    )
+    if not updated.rowcount:
+        connection.execute(table.insert().values(**row))
+
+
+def record_report_deltas(session, flush_context):
+    """after_flush hook applying the reporting deltas of the flush"""
+    deltas = ReportDeltas()
+    deltas.collect(session)
+    if deltas.counts or deltas.rollups:
+        deltas.apply(session.connection())
+
+
+def record_count_changes(metric, changes):
+    """Apply count changes made by a bulk UPDATE or DELETE
+
+    ``changes`` maps dimensions of metric to deltas, e.g.
+    {'active': -3, 'inactive': 3} for three jobs deactivated at once. Call
+    this in the same transaction as the statement.
+    """
+    from app.models import db
+
+    deltas = ReportDeltas()
+    for dimension, delta in changes.items():
+        deltas.count(metric, dimension, delta)
+    deltas.apply(db.session.connection())
+
+
+def record_application_deletes(query):
+    """Discount applications that are about to be bulk-deleted
+
+    ``query`` selects the Application rows; call this in the same
+    transaction, before the delete.
+    """
+    from app.models import db, Application
+
+    rows = query.with_entities(Application.status, func.count()).group_by(Application.status).all()
+    deltas = ReportDeltas()
+    for status, count in rows:
+        deltas.count('applications', status, -count)
+    deltas.apply(db.session.connection())
+
+
+def backfill_reports():
+    """Rebuild report_counts and report_rollups from the raw tables
+
+    Returns the number of (count, rollup) rows written.
+    """
+    from app.models import db, User, JobPosting, Application, ReportCount, ReportRollup
+
+    deltas = ReportDeltas()
+    for role, count in db.session.query(User.role, func.count()).group_by(User.role):
+        deltas.count('users', role, count)
+    for is_active, count in db.session.query(JobPosting.is_active, func.count()).group_by(JobPosting.is_active):
+        deltas.count('jobs', job_state(is_active), count)
+    for status, count in db.session.query(Application.status, func.count()).group_by(Application.status):
+        deltas.count('applications', status, count)
+
+    # Stream the timestamps rather than loading the rows
+    sources = (
+        ('users_registered', User.created_at, User.role),
+        ('jobs_posted', JobPosting.posted_date, None),
+        ('applications_submitted', Application.application_date, None),
+    )
+    for metric, timestamp_column, dimension_column in sources:
+        columns = [timestamp_column] + ([dimension_column] if dimension_column is not None else [])
+        for row in db.session.query(*columns).execution_options(yield_per=1000):
+            dimension = row[1] if dimension_column is not None else 'all'
+            deltas.created(metric, dimension, row[0])
+
+    try:
+        db.session.query(ReportCount).delete(synchronize_session=False)
+        db.session.query(ReportRollup).delete(synchronize_session=False)
+        deltas.apply(db.session.connection())
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(deltas.counts), len(deltas.rollups)
+
+
+def current_counts(metric=None):
+    """Current rows per (metric, dimension), or per dimension of one metric"""
+    from app.models import db, ReportCount
+
+    query = db.session.query(ReportCount.metric, ReportCount.dimension, ReportCount.count)
+    if metric is not None:
+        query = query.filter(ReportCount.metric == metric)
+    counts = Counter()
+    for row in query:
+        counts[row.dimension if metric is not None else (row.metric, row.dimension)] = row.count
+    return counts
+
+
+def report_figures(now=None):
+    """Headline figures for the reports page from the reporting tables
+
+    Two queries whatever the size of the raw tables: one over report_counts
+    and one over the last REPORT_DAYS daily rollups (plus the last 24 hourly
+    ones).
+    """
+    from app.models import db, ReportRollup
+
+    now = now or datetime.utcnow()
+    counts = current_counts()
+
+    today = GRANULARITIES['day'](now)
+    month_start = today - timedelta(days=REPORT_DAYS - 1)
+    week_start = today - timedelta(days=6)
+    last_day_start = GRANULARITIES['hour'](now) - timedelta(hours=23)
+
+    created = Counter()
+    rollups = db.session.query(
+        ReportRollup.granularity, ReportRollup.metric, ReportRollup.period_start, ReportRollup.count
+    ).filter(db.or_(
+        db.and_(ReportRollup.granularity == 'day', ReportRollup.period_start >= month_start),
+        db.and_(ReportRollup.granularity == 'hour', ReportRollup.period_start >= last_day_start)
+    ))
+    for row in rollups:
+        if row.granularity == 'hour':
+            created[(row.metric, 'last_24_hours')] += row.count
+            continue
+        created[(row.metric, 'month')] += row.count
+        if row.period_start >= week_start:
+            created[(row.metric, 'week')] += row.count
+        if row.period_start >= today:
+            created[(row.metric, 'today')] += row.count
+
+    def total(metric):
+        return sum(count for (name, _), count in counts.items() if name == metric)
+
+    return {
+        'users': {role: counts[('users', role)] for role in ('seeker', 'employer', 'admin')},
+        'total_users': total('users'),
+        'total_jobs': total('jobs'),
+        'active_jobs': counts[('jobs', 'active')],
+        'applications': {status: counts[('applications', status)] for status in ('pending', 'reviewed', 'accepted', 'rejected')},
+        'total_applications': total('applications'),
+        'created': created,
+    }
+
+
+class Reporting:
+    """Flask extension that keeps the reporting tables in step with writes"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.stats import SnapshotCache
+
+        app.extensions['report_leaderboards'] = SnapshotCache(
+            load_leaderboards,
+            ttl=app.config.get('LEADERBOARD_CACHE_SECONDS', LEADERBOARD_CACHE_SECONDS)
+        )
+
+        if not event.contains(Session, 'after_flush', record_report_deltas):
+            event.listen(Session, 'after_flush', record_report_deltas)
+            # Load the old value when one of these is set on an expired object,
+            # so the flush can tell which dimension the row moved from
+            for attribute in tracked_attributes():
+                event.listen(attribute, 'set', _keep_old_value, active_history=True)
+
+
+def load_leaderboards(limit=LEADERBOARD_SIZE):
+    """Top employers by jobs posted and top seekers by applications made"""
+    from app.models import db, User, JobPosting, Application
+
+    # Jobs and application counters summed in one grouped query
+    employers = db.session.query(
+        User.username,
+        # Users have no company name of their own; take it from their postings
+        func.max(JobPosting.company_name).label('company_name'),
+        func.count(JobPosting.id).label('jobs_count'),
+        func.coalesce(func.sum(JobPosting.application_count), 0).label('applications_count')
+    ).join(JobPosting, User.id == JobPosting.employer_id)\
+     .filter(User.role == 'employer')\
+     .group_by(User.id, User.username)\
+     .order_by(func.count(JobPosting.id).desc())\
+     .limit(limit).all()
+
+    # Application and acceptance counts in one grouped query
+    seekers = db.session.query(
+        User.username,
+        User.last_login,
+        User.created_at,
+        func.count(Application.id).label('applications_count'),
+        func.count(db.case((Application.status == 'accepted', 1))).label('accepted_count')
+    ).join(Application, User.id == Application.seeker_id)\
+     .filter(User.role == 'seeker')\
+     .group_by(User.id, User.username, User.last_login, User.created_at)\
+     .order_by(func.count(Application.id).desc())\
+     .limit(limit).all()
+
+    return {
+        'top_employers': [{
+            'username': row.username,
+            'company_name': row.company_name or 'N/A',
+            'jobs_count': row.jobs_count,
+            'applications_count': row.applications_count
+        } for row in employers],
+        'top_seekers': [{
+            'username': row.username,
+            'applications_count': row.applications_count,
+            'success_rate': round(row.accepted_count / row.applications_count * 100, 1) if row.applications_count else 0,
+            'last_login': row.last_login or row.created_at
+        } for row in seekers],
+    }
+
+
+def report_leaderboards():
+    """Top employers and seekers, reused for up to LEADERBOARD_CACHE_SECONDS
+
+    Falls back to empty lists when they cannot be computed; that result is
+    not cached, so the next request tries again.
+    """
+    try:
+        cache = current_app.extensions.get('report_leaderboards')
+        return cache.get() if cache is not None else load_leaderboards()
+    except Exception as e:
+        print(f"Error getting top employers and seekers: {e}")
+        return {'top_employers': [], 'top_seekers': []}
+
+
+reporting = Reporting()
@@ -0,0 +1,53 @@
+"""
+Stateless, signed password reset tokens.
+
+A token carries the user's id and a fingerprint of their current
+password hash, signed and timestamped with the app's SECRET_KEY. Nothing
+is stored when one is issued. Checking one is a signature and age check,
+a primary-key lookup and a comparison of the fingerprint. Setting a new
+password changes the fingerprint, so each token works once and every
+older token for the account stops working too.
+"""
+import hashlib
+import hmac
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# How long a reset link stays valid, in seconds
+RESET_TOKEN_MAX_AGE = 3600
+
+RESET_TOKEN_SALT = 'password-reset'
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=RESET_TOKEN_SALT)
+
+
+def password_fingerprint(password_hash):
+    """Keyed digest of a stored hash; tokens never reveal the hash itself"""
+    key = current_app.config['SECRET_KEY'].encode('utf-8')
+    return hmac.new(key, (password_hash or '').encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def issue_reset_token(user):
+    """Signed token letting user set a new password"""
+    return _serializer().dumps({'uid': user.id, 'fp': password_fingerprint(user.password)})
+
+
+def load_reset_token(token, max_age=None):
+    """The user a token was issued to, or None if it is invalid, expired or used"""
+    from app.models import db, User
+
+    max_age = max_age if max_age is not None else current_app.config.get('RESET_TOKEN_MAX_AGE', RESET_TOKEN_MAX_AGE)
+    try:
+        payload = _serializer().loads(token, max_age=max_age)
+    except BadSignature:
+        return None
+    if not isinstance(payload, dict) or not isinstance(payload.get('uid'), int):
+        return None
+
+    user = db.session.get(User, payload['uid'])
+    if user is None or not hmac.compare_digest(str(payload.get('fp', '')), password_fingerprint(user.password)):
+        return None
+    return user
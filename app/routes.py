@@ -1,15 +1,30 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify
-from app.models import db, User, JobPosting, Application
-from werkzeug.security import check_password_hash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify, abort, make_response, Response, stream_with_context
+from app.models import db, User, JobPosting, Application, APPLICATION_STATUSES
+from app.search import index_job, remove_job
+from app.fulltext import match_jobs
+from app.autocomplete import get_suggestion_index, SUGGESTION_FIELDS, DEFAULT_LIMIT, MAX_LIMIT
+from app.facets import parse_facet_filters, facet_clauses, facet_counts, cached_facet_counts, POSTED_WITHIN_LABELS
+from app.pagination import keyset_window, sign_total, load_total
+from app.fragments import get_fragment_cache, FRAGMENT_MAX_AGE
+from app.identity import load_current_user, current_identity, remember_identity, forget_identity
+from app.stats import get_system_overview
+from app.presence import get_presence
+from app.reporting import report_figures, report_leaderboards, record_application_deletes
+from app.activity import record_activity, get_recent_activity
+from app.user_grid import parse_user_grid_args, user_grid_window, user_grid_clauses, USER_GRID_SORTS, USER_ROLES
+from app.exports import parse_export_args, stream_export, export_filename, EXPORT_STATEMENTS, EXPORT_FORMATS
+from app.passwords import PasswordHashingBusy, get_password_hasher
+from app.outbox import enqueue_email
+from app.sessions import session_stats
+from app.database import pool_stats
+from app.bulk import (parse_bulk_ids, bulk_set_users_active, bulk_set_jobs_active, bulk_delete_jobs,
+                      refresh_after_bulk, BULK_USER_ACTIONS, BULK_JOB_ACTIONS)
 from datetime import datetime, timedelta
 import json
-from sqlalchemy import func
-import requests
+from sqlalchemy.orm import joinedload
 
-from werkzeug.security import check_password_hash
 from datetime import datetime
 import json
-from sqlalchemy import func
 
 # Create a blueprint for main routes
 main = Blueprint('main', __name__)
@@ -42,12 +57,21 @@ def validate_session_and_redirect():
             return redirect_to_user_dashboard(user_role)
     return None
 
+def time_ago(timestamp, now):
+    """Describe how long before now timestamp was, e.g. '5 min ago'"""
+    time_diff = now - timestamp
+    if time_diff.days == 0:
+        if time_diff.seconds < 3600:
+            return f"{time_diff.seconds // 60} min ago"
+        return f"{time_diff.seconds // 3600} hours ago"
+    return f"{time_diff.days} days ago"
+
 # Update the home route to handle auto-redirect for logged-in users
 @main.route('/')
 def home():
     """Home page with statistics"""
     try:
-        stats = User.get_system_overview()
+        stats = get_system_overview()
         return render_template('home.html', 
                              total_users=stats['total_users'],
                              total_jobs=stats['total_jobs'],
@@ -65,10 +89,14 @@ def health_check():
     try:
         # Check database connection
         db.session.execute(db.text('SELECT 1'))
+        hasher = get_password_hasher()
         return jsonify({
             'status': 'healthy',
             'timestamp': datetime.utcnow().isoformat(),
-            'database': 'connected'
+            'database': 'connected',
+            'password_hashing': hasher.stats() if hasher else None,
+            'sessions': session_stats(),
+            'database_pool': pool_stats()
         }), 200
     except Exception as e:
         return jsonify({
@@ -79,16 +107,88 @@ def health_check():
 
 @main.route('/jobs')
 def jobs():
-    """Job listings route - displays all active job postings"""
-    # Get all active job postings, ordered by most recent
+    """Job listings route - displays active job postings with facet filters"""
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 10  # Number of jobs per page
+    search_query = request.args.get('search', '').strip()
+    filters = parse_facet_filters(request.args)
+    now = datetime.utcnow()
+    
+    # Jobs being browsed before facet selections are applied
+    base_clauses = [JobPosting.is_active == True]
+    if search_query:
+        search_clause = match_jobs(search_query)
+        if search_clause is not None:
+            base_clauses.append(search_clause)
+    
+    # One grouped query gives every facet count and the total number of matches,
+    # reused for a short while so paging through results doesn't recount
+    facets = cached_facet_counts(search_query, base_clauses, filters, now=now)
+    
+    # Seek past the (posted_date, id) of the previous page instead of using OFFSET
+    jobs = keyset_window(
+        JobPosting.query.options(joinedload(JobPosting.employer))
+                        .filter(*base_clauses, *facet_clauses(filters, now=now)),
+        (JobPosting.posted_date, JobPosting.id), per_page,
+        cursor=cursor, page=page, total=facets['total'],
+        parsers=(datetime.fromisoformat, int)
+    )
+    
+    pagination_args = {'search': search_query or None}
+    pagination_args.update(filters)
+    
+    return render_template('jobs.html', jobs=jobs, facets=facets, filters=filters,
+                           posted_within_labels=POSTED_WITHIN_LABELS,
+                           pagination_args=pagination_args)
+
+@main.route('/jobs/<int:job_id>/detail')
+def job_detail_fragment(job_id):
+    """Job details for the listing modal, fetched when the modal is opened"""
+    cache = get_fragment_cache()
+    html = cache.get(job_id) if cache is not None else None
+    if html is not None:
+        # Another worker may have deactivated or deleted the job since it was cached
+        still_active = db.session.query(
+            JobPosting.query.filter_by(id=job_id, is_active=True).exists()
+        ).scalar()
+        if not still_active:
+            cache.remove_job(job_id)
+            abort(404)
+    else:
+        job = JobPosting.query.options(joinedload(JobPosting.employer))\
+                              .filter_by(id=job_id, is_active=True).first()
+        if not job:
+            abort(404)
+        html = render_template('job_detail_fragment.html', job=job)
+        if cache is not None:
+            cache.set(job_id, html)
+    
+    # The fragment is the same for every visitor, so browsers and proxies may keep it
+    response = make_response(html)
+    response.headers['Cache-Control'] = f'public, max-age={FRAGMENT_MAX_AGE}'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@main.route('/jobs/<int:job_id>/apply_form')
+def job_apply_fragment(job_id):
+    """Application form for the listing modal, prefilled for the current seeker"""
+    if not is_logged_in() or session.get('user_role') != 'seeker':
+        abort(403)
+    
+    job = JobPosting.query.filter_by(id=job_id, is_active=True).first()
+    if not job:
+        abort(404)
     
-    jobs = JobPosting.query.filter_by(is_active=True)\
-                          .order_by(JobPosting.posted_date.desc())\
-                          .paginate(page=page, per_page=per_page, error_out=False)
+    already_applied = db.session.query(
+        Application.query.filter_by(job_id=job_id, seeker_id=session['user_id']).exists()
+    ).scalar()
     
-    return render_template('jobs.html', jobs=jobs)
+    response = make_response(render_template('job_apply_fragment.html', job=job, user=get_current_user(),
+                                              already_applied=already_applied))
+    # Filled in with the seeker's personal details, so never stored by caches
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
 
 @main.route('/post_job', methods=['GET', 'POST'])
 def post_job():
@@ -174,6 +274,9 @@ def post_job():
             
             db.session.add(new_job)
             db.session.commit()
+            index_job(new_job)
+            record_activity('job', 'Job Posted' if is_active else 'Draft Saved', actor_id=new_job.employer_id,
+                            actor_name=session.get('username'), details=f"{new_job.title} position")
             
             if is_active:
                 flash('Job posted successfully and is now live!', 'success')
@@ -294,7 +397,10 @@ def submit_application(job_id):
         )
         
         db.session.add(application)
+        JobPosting.count_application(job_id, new_status=application.status)
         db.session.commit()
+        record_activity('application', 'Application', actor_id=application.seeker_id,
+                        actor_name=session.get('username'), details=f"Applied to {job.title}")
         
         flash('Application submitted successfully!', 'success')
         return redirect(url_for('main.seeker_dashboard'))
@@ -327,23 +433,26 @@ def login():
             
             if user:
                 print(f"User role: {user.role}")
-                password_match = check_password_hash(user.password, password)
+                try:
+                    password_match = user.check_password(password)
+                except PasswordHashingBusy:
+                    flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+                    return render_template('login.html'), 503
                 print(f"Password match: {password_match}")
                 
                 if password_match:
                     # Store user information in session
-                    session['user_id'] = user.id
-                    session['username'] = user.username
-                    session['user_role'] = user.role
-                    session['user_email'] = user.email
+                    remember_identity(user)
                     
                     # Set session permanent if remember me is checked
                     if remember_me:
                         session.permanent = True
                     
-                    # Update last login (optional - only if column exists)
+                    # Update last login (optional - only if column exists), and
+                    # replace a hash made with outdated KDF parameters
                     try:
                         user.last_login = datetime.now()
+                        user.rehash_password_if_needed(password)
                         db.session.commit()
                     except Exception as e:
                         print(f"Could not update last_login: {e}")
@@ -434,17 +543,21 @@ def register():
             new_user = User(username=username, email=email, password=password, role=role)
             db.session.add(new_user)
             db.session.commit()
+            record_activity('user', 'New User', actor_id=new_user.id, actor_name=new_user.username,
+                            details=f"Registered as {new_user.role.title()}")
             
             # Auto-login after successful registration
-            session['user_id'] = new_user.id
-            session['user_role'] = new_user.role
-            session['username'] = new_user.username
+            remember_identity(new_user)
             
             flash(f'Account created successfully! Welcome to Job Board, {username}!', 'success')
             
             # Redirect to appropriate dashboard based on user role
             return redirect_to_user_dashboard(new_user.role)
                 
+        except PasswordHashingBusy:
+            db.session.rollback()
+            flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'warning')
+            return render_template('register.html'), 503
         except Exception as e:
             db.session.rollback()
             flash('An error occurred while creating your account. Please try again.', 'error')
@@ -456,7 +569,10 @@ def register():
 def logout():
     """Logout route - clears user session"""
     username = session.get('username', 'User')
-    session.clear()
+    tracker = get_presence()
+    if tracker is not None and session.get('user_id') is not None:
+        tracker.forget(session['user_id'])
+    forget_identity()
     flash(f'You have been logged out successfully. Goodbye, {username}!', 'info')
     return redirect(url_for('main.home'))
 
@@ -485,29 +601,42 @@ def seeker_dashboard():
         return redirect(url_for('main.login'))
     
     try:
-        # Get applied jobs with real data from database
-        applied_jobs = current_user.get_applied_jobs()
-        
-        # Calculate statistics
-        total_applications = len(applied_jobs)
-        pending_count = len([app for app in applied_jobs if app.get('status') == 'pending'])
-        reviewed_count = len([app for app in applied_jobs if app.get('status') == 'reviewed'])
-        accepted_count = len([app for app in applied_jobs if app.get('status') == 'accepted'])
-        rejected_count = len([app for app in applied_jobs if app.get('status') == 'rejected'])
+        # Status counts from one grouped query, then one page of applications
+        status_counts = current_user.get_application_status_counts()
+        applied_jobs = current_user.get_applied_jobs(
+            cursor=request.args.get('cursor'),
+            page=request.args.get('page', 1, type=int)
+        )
+        applied_jobs.total = status_counts['total']
         
         return render_template('seeker_dashboard.html', 
                              applied_jobs=applied_jobs,
                              user=current_user,
-                             total_applications=total_applications,
-                             pending_count=pending_count,
-                             reviewed_count=reviewed_count,
-                             accepted_count=accepted_count,
-                             rejected_count=rejected_count)
+                             total_applications=status_counts['total'],
+                             pending_count=status_counts['pending'],
+                             reviewed_count=status_counts['reviewed'],
+                             accepted_count=status_counts['accepted'],
+                             rejected_count=status_counts['rejected'])
                              
     except Exception as e:
         flash('Error loading dashboard data. Please try again.', 'error')
         return redirect(url_for('main.home'))
 
+@main.route('/applications/<int:application_id>/detail')
+def application_detail_fragment(application_id):
+    """A seeker's own application in full, fetched when its dashboard modal is opened"""
+    if not is_logged_in() or session.get('user_role') != 'seeker':
+        abort(403)
+    
+    current_user = get_current_user()
+    application = current_user.get_application_details(application_id) if current_user else None
+    if not application:
+        abort(404)
+    
+    response = make_response(render_template('application_detail_fragment.html', application=application))
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
+
 @main.route('/employer_dashboard')
 def employer_dashboard():
     """Employer dashboard - displays posted jobs and received applications"""
@@ -538,7 +667,7 @@ def employer_dashboard():
         total_jobs = len(posted_jobs)
         active_jobs = len([job for job in posted_jobs if job.get('is_active', True)])
         total_applications = sum(job.get('application_count', 0) for job in posted_jobs)
-        pending_applications = len([app for app in recent_applications if app.get('status') == 'pending'])
+        pending_applications = sum(job.get('pending_count', 0) for job in posted_jobs)
         total_views = sum(job.get('view_count', 0) for job in posted_jobs)
         
         return render_template('employer_dashboard.html',
@@ -578,7 +707,11 @@ def admin_dashboard():
     
     try:
         # Get system overview with real data from database
-        system_stats = User.get_system_overview()
+        system_stats = get_system_overview()
+        tracker = get_presence()
+        activity_counts = tracker.counts() if tracker else {
+            'active_sessions': 0, 'daily_active_users': 0, 'monthly_active_users': 0
+        }
         
         # Get admin-specific data
         admin_data = {
@@ -587,7 +720,7 @@ def admin_dashboard():
             'system_health': {
                 'database_status': 'Connected',
                 'last_backup': 'Not configured',
-                'active_sessions': len([u for u in User.get_active_users() if hasattr(u, 'id')])
+                **activity_counts
             }
         }
         
@@ -715,6 +848,8 @@ def create_admin():
                 print(f"User.create_admin returned: {success}")
                 
                 if success:
+                    record_activity('admin', 'Admin Created', actor_id=current_user.id,
+                                    actor_name=current_user.username, details=username)
                     flash(f'Admin "{username}" created successfully with assigned permissions!', 'success')
                     return redirect(url_for('main.admin_dashboard'))
                 else:
@@ -751,12 +886,19 @@ def manage_users():
         return redirect(url_for('main.home'))
     
     try:
-        # Simple approach - get all users directly
-        users = User.query.order_by(User.created_at.desc()).all()
-        print(f"Found {len(users)} users")  # Debug line
+        # One keyset window of the grid's columns, searched by username/email prefix
+        filters = parse_user_grid_args(request.args)
+        users = user_grid_window(
+            filters,
+            cursor=request.args.get('cursor'),
+            page=request.args.get('page', 1, type=int)
+        )
         
         return render_template('manage_users.html', 
                              users=users, 
+                             filters=filters,
+                             sorts=USER_GRID_SORTS,
+                             roles=USER_ROLES,
                              user=current_user)
         
     except Exception as e:
@@ -831,18 +973,38 @@ def edit_profile():
 def search():
     """Job search route - allows users to search for jobs by keyword"""
     query = request.args.get('q', '').strip()
-    jobs = []
+    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor', '').strip()
+    # Signed by the first page, so the count can't be made up in the URL
+    total = load_total(request.args.get('total', ''), query)
+    per_page = 10  # Number of jobs per page
     
-    if query:
-        try:
-            # Get search results from the model
-            jobs = JobPosting.search_jobs(query)
-            flash(f'Found {len(jobs)} job(s) matching "{query}"', 'info')
-        except Exception as e:
-            flash('An error occurred while searching. Please try again.', 'error')
-            jobs = []
+    # Get one ranked window of search results; only the first page counts the matches
+    jobs = JobPosting.search_page(query, page=page, per_page=per_page, cursor=cursor, total=total)
+    if query and page == 1:
+        if jobs.fuzzy and jobs.total:
+            flash(f'No exact matches for "{query}". Showing {jobs.total} similar job(s).', 'info')
+        else:
+            flash(f'Found {jobs.total} job(s) matching "{query}"', 'info')
     
-    return render_template('jobs.html', jobs=jobs, search_query=query, is_search=True)
+    return render_template('jobs.html', jobs=jobs, search_query=query, is_search=True,
+                           pagination_args={'q': query, 'total': sign_total(jobs.total or None, query)})
+
+@main.route('/autocomplete')
+def autocomplete():
+    """Typeahead suggestions for the job search box, answered from memory"""
+    prefix = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+    kind = request.args.get('type', '').strip()
+    if kind not in SUGGESTION_FIELDS.values():
+        kind = None
+    
+    suggestion_index = get_suggestion_index()
+    suggestions = suggestion_index.suggest(prefix, limit=limit, kind=kind) if suggestion_index else []
+    
+    response = jsonify({'query': prefix, 'suggestions': suggestions})
+    response.headers['Cache-Control'] = 'public, max-age=30'
+    return response
 
 @main.route('/dashboard')
 def get_user_dashboard():
@@ -868,11 +1030,8 @@ def is_logged_in():
 
 # Utility function to get current user
 def get_current_user():
-    """Get current logged-in user object"""
-    if is_logged_in():
-        user_id = session.get('user_id')
-        return User.query.get(user_id)
-    return None
+    """Get current logged-in user object (loaded once per request)"""
+    return load_current_user()
 
 # Make utility functions available in templates
 @main.app_template_global()
@@ -880,11 +1039,33 @@ def current_user():
     """Template global function to get current user"""
     return get_current_user()
 
+@main.app_template_global('current_identity')
+def current_identity_global():
+    """Template global function to get the logged-in user's id, username and role without a query"""
+    return current_identity()
+
 @main.app_template_global()
 def logged_in():
     """Template global function to check login status"""
     return is_logged_in()
 
+@main.app_template_global()
+def modify_query(**updates):
+    """Template global function to link to the current page with changed arguments
+    
+    Arguments set to None are dropped. Any page or cursor is reset because
+    changing a filter changes the result set.
+    """
+    args = request.args.to_dict()
+    args.pop('page', None)
+    args.pop('cursor', None)
+    for key, value in updates.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
 # Error handlers
 @main.errorhandler(404)
 def not_found(error):
@@ -966,6 +1147,7 @@ def edit_job(job_id):
         
         try:
             db.session.commit()
+            index_job(job)
             
             if is_active and was_draft:
                 flash('Job published successfully!', 'success')
@@ -1009,6 +1191,9 @@ def publish_job(job_id):
         job.published_at = datetime.utcnow()
         
         db.session.commit()
+        index_job(job)
+        record_activity('job', 'Job Posted', actor_id=job.employer_id, actor_name=session.get('username'),
+                        details=f"{job.title} position")
         flash('Job published successfully!', 'success')
         
     except Exception as e:
@@ -1034,8 +1219,15 @@ def delete_job(job_id):
         return redirect(url_for('main.employer_dashboard'))
     
     try:
+        # Delete the applications in one statement rather than loading each for the cascade
+        applications = Application.query.filter_by(job_id=job_id)
+        record_application_deletes(applications)
+        applications.delete(synchronize_session=False)
         db.session.delete(job)
         db.session.commit()
+        remove_job(job_id)
+        record_activity('job', 'Job Deleted', actor_id=session['user_id'], actor_name=session.get('username'),
+                        details=f"{job.title} position")
         flash('Job deleted successfully!', 'success')
         
     except Exception as e:
@@ -1121,15 +1313,19 @@ def update_application_status(application_id):
     new_status = request.form.get('status')
     notes = request.form.get('notes', '').strip()
     
-    if new_status not in ['pending', 'reviewed', 'accepted', 'rejected']:
+    if new_status not in APPLICATION_STATUSES:
         flash('Invalid application status.', 'error')
         return redirect(url_for('main.view_application', application_id=application_id))
     
     try:
+        if new_status != application.status:
+            JobPosting.count_application(application.job_id, new_status=new_status, old_status=application.status)
         application.status = new_status
         application.employer_notes = notes
         application.reviewed_date = datetime.now()
         db.session.commit()
+        record_activity('application', 'Status Changed', actor_id=session['user_id'],
+                        actor_name=session.get('username'), details=f"Application #{application.id} marked {new_status}")
         flash(f'Application status updated to {new_status}.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -1189,6 +1385,8 @@ def edit_user(user_id):
                 user_to_edit.role = request.form.get('role', user_to_edit.role)
             
             db.session.commit()
+            record_activity('admin', 'User Updated', actor_id=current_user.id,
+                            actor_name=current_user.username, details=user_to_edit.username)
             flash('User updated successfully!', 'success')
             return redirect(url_for('main.manage_users'))
             
@@ -1222,6 +1420,8 @@ def deactivate_user(user_id):
         db.session.commit()
         
         status = "activated" if user_to_update.is_active else "deactivated"
+        record_activity('admin', f'User {status.title()}', actor_id=session['user_id'],
+                        actor_name=session.get('username'), details=user_to_update.username)
         flash(f'User {user_to_update.username} has been {status}.', 'success')
         
     except Exception as e:
@@ -1243,267 +1443,223 @@ def admin_manage_jobs():
     
     # Get filter parameters
     status_filter = request.args.get('status', '')
-    job_type_filter = request.args.get('job_type', '')
     search_query = request.args.get('search', '')
+    filters = parse_facet_filters(request.args)
+    now = datetime.utcnow()
     
-    # Base query for all jobs
-    query = JobPosting.query
+    # Jobs being browsed before facet selections are applied
+    base_clauses = JobPosting.admin_clauses(status_filter, search_query)
     
-    # Apply filters
-    if status_filter == 'active':
-        query = query.filter(JobPosting.is_active == True, JobPosting.is_draft == False)
-    elif status_filter == 'inactive':
-        query = query.filter(JobPosting.is_active == False, JobPosting.is_draft == False)
-    elif status_filter == 'draft':
-        query = query.filter(JobPosting.is_draft == True)
+    # Facet counts for job type, location and posting age from one grouped query
+    facets = facet_counts(base_clauses, filters, now=now)
     
-    if job_type_filter:
-        query = query.filter(JobPosting.job_type == job_type_filter)
+    # One page of projected rows with the employer name and application counts
+    jobs = JobPosting.get_admin_page(
+        base_clauses + facet_clauses(filters, now=now),
+        cursor=request.args.get('cursor'),
+        page=request.args.get('page', 1, type=int),
+        total=facets['total']
+    )
     
-    if search_query:
-        query = query.filter(
-            db.or_(
-                JobPosting.title.contains(search_query),
-                JobPosting.company_name.contains(search_query),
-                JobPosting.description.contains(search_query)
-            )
-        )
+    # Filters to keep on the pagination links
+    pagination_args = {'status': status_filter or None, 'search': search_query or None}
+    pagination_args.update(filters)
     
-    # Get all jobs with employer information
-    jobs = query.join(User, JobPosting.employer_id == User.id).add_columns(
-        User.username.label('employer_username')
-    ).order_by(JobPosting.posted_date.desc()).all()
-    
-    # Process the results to include application counts
-    jobs_data = []
-    for job, employer_username in jobs:
-        job_dict = {
-            'id': job.id,
-            'title': job.title,
-            'company_name': job.company_name,
-            'location': job.location,
-            'job_type': job.job_type,
-            'salary_range': job.salary_range,
-            'description': job.description,
-            'posted_date': job.posted_date,
-            'is_active': job.is_active,
-            'is_draft': job.is_draft,
-            'employer_id': job.employer_id,
-            'employer': type('obj', (object,), {'username': employer_username})(),
-            'applications': Application.query.filter_by(job_id=job.id).all()
-        }
-        jobs_data.append(job_dict)
+    return render_template('admin_manage_jobs.html', jobs=jobs, facets=facets, filters=filters,
+                           posted_within_labels=POSTED_WITHIN_LABELS, pagination_args=pagination_args)
+
+def bulk_result(success, message, redirect_to, **counts):
+    """Answer a bulk request with JSON for API clients, else flash and redirect"""
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'success': success, 'message': message, **counts}), (200 if success else 400)
+    flash(message, 'success' if success else 'error')
+    return redirect(redirect_to)
+
+@main.route('/admin/bulk/users', methods=['POST'])
+def admin_bulk_users():
+    """Activate or deactivate many users at once, by id or by the grid filters"""
+    if not is_logged_in():
+        flash('Please log in to access admin features.', 'error')
+        return redirect(url_for('main.login'))
+    
+    if session.get('user_role') != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.home'))
+    
+    action = request.form.get('action', '')
+    ids = parse_bulk_ids(request.form.getlist('ids'))
+    filters = parse_user_grid_args(request.form)
+    back = url_for('main.manage_users', q=filters['q'], role=filters['role'], sort=filters['sort'])
+    
+    if action not in BULK_USER_ACTIONS:
+        return bulk_result(False, 'Unknown bulk action.', back)
+    if ids:
+        clauses = [User.id.in_(ids)]
+    elif request.form.get('scope') == 'matching' and (filters['q'] or filters['role']):
+        clauses = user_grid_clauses(filters)
+    else:
+        return bulk_result(False, 'Select users or filter the list first.', back)
+    
+    active = action == 'activate'
+    try:
+        # One UPDATE for the whole selection; the acting admin is never included
+        user_ids = bulk_set_users_active(clauses, active, exclude_id=session['user_id'])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in bulk user update: {e}")
+        return bulk_result(False, 'Error updating users. Please try again.', back)
+    
+    refresh_after_bulk(user_ids=user_ids, deactivated_users=not active)
+    status = 'activated' if active else 'deactivated'
+    record_activity('admin', f'Users {status.title()}', actor_id=session['user_id'],
+                    actor_name=session.get('username'), details=f"{len(user_ids)} users")
+    return bulk_result(True, f'{len(user_ids)} users {status}.', back, users=len(user_ids))
+
+@main.route('/admin/bulk/jobs', methods=['POST'])
+def admin_bulk_jobs():
+    """Activate, deactivate, expire or delete many jobs at once, by id or by the listing filters"""
+    if not is_logged_in():
+        flash('Please log in to access admin features.', 'error')
+        return redirect(url_for('main.login'))
+    
+    if session.get('user_role') != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.home'))
+    
+    action = request.form.get('action', '')
+    ids = parse_bulk_ids(request.form.getlist('ids'))
+    status_filter = request.form.get('status', '')
+    search_query = request.form.get('search', '')
+    filters = parse_facet_filters(request.form)
+    now = datetime.utcnow()
+    back_args = {'status': status_filter or None, 'search': search_query or None}
+    back_args.update(filters)
+    back = url_for('main.admin_manage_jobs', **back_args)
+    
+    if action not in BULK_JOB_ACTIONS:
+        return bulk_result(False, 'Unknown bulk action.', back)
+    if ids:
+        clauses = [JobPosting.id.in_(ids)]
+    elif request.form.get('scope') == 'matching' and any(back_args.values()):
+        clauses = JobPosting.admin_clauses(status_filter, search_query) + facet_clauses(filters, now=now)
+    else:
+        return bulk_result(False, 'Select jobs or filter the list first.', back)
+    
+    if action == 'expire':
+        # Expiring takes down published jobs older than the given age
+        older_than = request.form.get('older_than_days', type=int)
+        if not older_than or older_than < 1:
+            return bulk_result(False, 'Give the age in days of the jobs to expire.', back)
+        clauses += [JobPosting.is_draft == False, JobPosting.posted_date < now - timedelta(days=older_than)]
     
-    return render_template('admin_manage_jobs.html', jobs=jobs_data)
+    removed_applications = 0
+    try:
+        if action == 'delete':
+            job_ids, removed_applications = bulk_delete_jobs(clauses)
+        else:
+            job_ids = bulk_set_jobs_active(clauses, action == 'activate', now=now)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in bulk job update: {e}")
+        return bulk_result(False, 'Error updating jobs. Please try again.', back)
+    
+    refresh_after_bulk(job_ids=job_ids)
+    status = action.rstrip('e') + 'ed'
+    details = f"{len(job_ids)} jobs"
+    if action == 'delete':
+        details += f" and {removed_applications} applications"
+    record_activity('admin', f'Jobs {status.title()}', actor_id=session['user_id'],
+                    actor_name=session.get('username'), details=details)
+    return bulk_result(True, f'{details} {status}.', back, jobs=len(job_ids), applications=removed_applications)
+
+@main.route('/admin/export/<kind>')
+def admin_export(kind):
+    """Stream users, jobs or applications as CSV or NDJSON, optionally gzipped"""
+    if not is_logged_in():
+        flash('Please log in to access this page.', 'error')
+        return redirect(url_for('main.login'))
+    
+    if session.get('user_role') != 'admin':
+        flash('Access denied. Admin privileges required.', 'error')
+        return redirect(url_for('main.home'))
+    
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORT_STATEMENTS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    
+    filters = parse_export_args(request.args)
+    statement = EXPORT_STATEMENTS[kind](request.args, filters)
+    filename = export_filename(kind, fmt, compress=filters['gzip'])
+    
+    record_activity('admin', 'Data Export', actor_id=session.get('user_id'),
+                    actor_name=session.get('username'), details=f"Exported {kind} as {fmt}")
+    
+    # Rows are read and sent a chunk at a time; nothing is buffered per export
+    response = Response(
+        stream_with_context(stream_export(statement, fmt, compress=filters['gzip'])),
+        mimetype='application/gzip' if filters['gzip'] else EXPORT_FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 @main.route('/admin/reports')
 def admin_reports():
     """Admin reports and analytics page"""
     try:
-        from datetime import datetime, timedelta
-        
-        # Basic counts with error handling
-        total_users = db.session.query(User).count()
-        total_jobs = db.session.query(JobPosting).count()
-        total_applications = db.session.query(Application).count()
-        
-        # Users by role
-        seekers_count = db.session.query(User).filter_by(role='seeker').count()
-        employers_count = db.session.query(User).filter_by(role='employer').count()
-        admins_count = db.session.query(User).filter_by(role='admin').count()
-        
-        # Recent data (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        new_users_month = db.session.query(User).filter(User.created_at >= thirty_days_ago).count()
-        
-        # Active jobs
-        active_jobs = db.session.query(JobPosting).filter_by(is_active=True).count()
-        
-        # Application statistics
-        pending_applications = db.session.query(Application).filter_by(status='pending').count()
-        accepted_applications = db.session.query(Application).filter_by(status='accepted').count()
+        # Headline figures come from the pre-aggregated reporting tables
+        figures = report_figures()
+        total_users = figures['total_users']
+        total_jobs = figures['total_jobs']
+        active_jobs = figures['active_jobs']
+        total_applications = figures['total_applications']
+        created = figures['created']
         
         # Calculate success rate safely
         success_rate = 0
         if total_applications > 0:
-            success_rate = (accepted_applications / total_applications) * 100
-        
-        # Recent activity - Get real data from database
-        recent_users = db.session.query(User)\
-            .order_by(User.created_at.desc())\
-            .limit(5).all()
-        
-        recent_jobs = db.session.query(JobPosting)\
-            .order_by(JobPosting.posted_date.desc())\
-            .limit(5).all()
-        
-        # FIX: Use seeker_id instead of user_id for Application
-        recent_applications = db.session.query(Application)\
-            .join(JobPosting, Application.job_id == JobPosting.id)\
-            .join(User, Application.seeker_id == User.id)\
-            .order_by(Application.application_date.desc())\
-            .limit(5).all()
-        
-        # Top employers - Get real data with proper joins
-        top_employers = []
-        try:
-            employers_data = db.session.query(
-                User.id,
-                User.username,
-                User.company_name,
-                func.count(JobPosting.id).label('jobs_count')
-            ).join(JobPosting, User.id == JobPosting.employer_id)\
-             .filter(User.role == 'employer')\
-             .group_by(User.id, User.username, User.company_name)\
-             .order_by(func.count(JobPosting.id).desc())\
-             .limit(5).all()
-            
-            for employer_data in employers_data:
-                # Get application count for this employer's jobs
-                app_count = db.session.query(Application)\
-                    .join(JobPosting, Application.job_id == JobPosting.id)\
-                    .filter(JobPosting.employer_id == employer_data.id)\
-                    .count()
-                
-                top_employers.append({
-                    'username': employer_data.username,
-                    'company_name': employer_data.company_name or 'N/A',
-                    'jobs_count': employer_data.jobs_count,
-                    'applications_count': app_count
-                })
-        except Exception as e:
-            print(f"Error getting top employers: {e}")
-            top_employers = []
-        
-        # Top seekers - Get real data with proper joins (FIX: Use seeker_id)
-        top_seekers = []
-        try:
-            seekers_data = db.session.query(
-                User.id,
-                User.username,
-                func.count(Application.id).label('applications_count')
-            ).join(Application, User.id == Application.seeker_id)\
-             .filter(User.role == 'seeker')\
-             .group_by(User.id, User.username)\
-             .order_by(func.count(Application.id).desc())\
-             .limit(5).all()
-            
-            for seeker_data in seekers_data:
-                # Calculate success rate for this seeker (FIX: Use seeker_id)
-                total_apps = seeker_data.applications_count
-                accepted_apps = db.session.query(Application)\
-                    .filter(Application.seeker_id == seeker_data.id, Application.status == 'accepted')\
-                    .count()
-                
-                success_rate_seeker = (accepted_apps / total_apps * 100) if total_apps > 0 else 0
-                
-                # Get last login (if available)
-                user = db.session.query(User).get(seeker_data.id)
-                last_login = user.last_login if hasattr(user, 'last_login') and user.last_login else user.created_at
-                
-                top_seekers.append({
-                    'username': seeker_data.username,
-                    'applications_count': seeker_data.applications_count,
-                    'success_rate': round(success_rate_seeker, 1),
-                    'last_login': last_login
-                })
-        except Exception as e:
-            print(f"Error getting top seekers: {e}")
-            top_seekers = []
-        
-        # Recent system activity - Build from real database events
-        recent_activity = []
-        
-        # Add recent user registrations
-        for user in recent_users[:3]:  # Get top 3
-            time_diff = datetime.utcnow() - user.created_at
-            if time_diff.days == 0:
-                if time_diff.seconds < 3600:
-                    time_str = f"{time_diff.seconds // 60} min ago"
-                else:
-                    time_str = f"{time_diff.seconds // 3600} hours ago"
-            else:
-                time_str = f"{time_diff.days} days ago"
-            
-            recent_activity.append({
-                'time': time_str,
-                'activity': 'New User',
-                'activity_type': 'user',
-                'user': user.username,
-                'details': f"Registered as {user.role.title()}"
-            })
-        
-        # Add recent job postings
-        for job in recent_jobs[:3]:  # Get top 3
-            time_diff = datetime.utcnow() - job.posted_date
-            if time_diff.days == 0:
-                if time_diff.seconds < 3600:
-                    time_str = f"{time_diff.seconds // 60} min ago"
-                else:
-                    time_str = f"{time_diff.seconds // 3600} hours ago"
-            else:
-                time_str = f"{time_diff.days} days ago"
-            
-            # Get employer username
-            employer = db.session.query(User).get(job.employer_id)
-            
-            recent_activity.append({
-                'time': time_str,
-                'activity': 'Job Posted',
-                'activity_type': 'job',
-                'user': employer.username if employer else 'Unknown',
-                'details': f"{job.title} position"
-            })
-        
-        # Add recent applications (FIX: Use seeker_id)
-        for app in recent_applications[:3]:  # Get top 3
-            time_diff = datetime.utcnow() - app.application_date
-            if time_diff.days == 0:
-                if time_diff.seconds < 3600:
-                    time_str = f"{time_diff.seconds // 60} min ago"
-                else:
-                    time_str = f"{time_diff.seconds // 3600} hours ago"
-            else:
-                time_str = f"{time_diff.days} days ago"
-            
-            # Get applicant username (FIX: Use seeker_id)
-            applicant = db.session.query(User).get(app.seeker_id)
-            job = db.session.query(JobPosting).get(app.job_id)
-            
-            recent_activity.append({
-                'time': time_str,
-                'activity': 'Application',
-                'activity_type': 'application',
-                'user': applicant.username if applicant else 'Unknown',
-                'details': f"Applied to {job.title if job else 'Unknown Job'}"
-            })
-        
-        # Sort recent activity by time (most recent first)
-        # For simplicity, we'll use the existing order since we're getting recent items
-        recent_activity = sorted(recent_activity, key=lambda x: x['time'])[:10]
+            success_rate = (figures['applications']['accepted'] / total_applications) * 100
+        
+        # Top employers and seekers need grouped queries; each worker reuses them for a while
+        leaderboards = report_leaderboards()
+        top_employers = leaderboards['top_employers']
+        top_seekers = leaderboards['top_seekers']
+        
+        # Recent system activity, newest first from the activity log
+        now = datetime.utcnow()
+        recent_activity = [{
+            'time': time_ago(event.occurred_at, now),
+            'activity': event.action,
+            'activity_type': event.event_type,
+            'user': event.actor_name or 'Unknown',
+            'details': event.details or ''
+        } for event in get_recent_activity(limit=10)]
         
         # Build reports object
         reports = {
             'user_growth': {
                 'total_users': total_users,
-                'seekers_count': seekers_count,
-                'employers_count': employers_count,
-                'admins_count': admins_count,
-                'new_this_month': new_users_month
+                'seekers_count': figures['users']['seeker'],
+                'employers_count': figures['users']['employer'],
+                'admins_count': figures['users']['admin'],
+                'new_this_month': created[('users_registered', 'month')]
             },
             'job_statistics': {
                 'total_jobs': total_jobs,
                 'active_jobs': active_jobs,
-                'draft_jobs': total_jobs - active_jobs,
-                'jobs_this_month': 0,  # Can be calculated if needed
+                'inactive_jobs': total_jobs - active_jobs,
+                'jobs_this_month': created[('jobs_posted', 'month')],
                 'avg_applications': round(total_applications / max(total_jobs, 1), 1),
                 'top_employers': top_employers
             },
             'application_trends': {
                 'total_applications': total_applications,
-                'new_this_week': 0,  # Can be calculated if needed
-                'applications_today': 0,  # Can be calculated if needed
-                'pending_applications': pending_applications,
+                'new_this_week': created[('applications_submitted', 'week')],
+                'applications_today': created[('applications_submitted', 'today')],
+                'applications_last_24_hours': created[('applications_submitted', 'last_24_hours')],
+                'pending_applications': figures['applications']['pending'],
                 'success_rate': round(success_rate, 1),
                 'conversion_rate': round(success_rate, 1),
                 'top_seekers': top_seekers
@@ -1541,8 +1697,11 @@ def toggle_job_status(job_id):
             job.published_at = datetime.utcnow()
         
         db.session.commit()
+        index_job(job)
         
         status_text = "activated" if job.is_active else "deactivated"
+        record_activity('admin', f'Job {status_text.title()}', actor_id=session['user_id'],
+                        actor_name=session.get('username'), details=job.title)
         
         return jsonify({
             'success': True, 
@@ -1621,6 +1780,9 @@ def admin_edit_job(job_id):
         
         try:
             db.session.commit()
+            index_job(job)
+            record_activity('admin', 'Job Edited', actor_id=session['user_id'],
+                            actor_name=session.get('username'), details=job.title)
             
             if is_active and was_draft:
                 flash('Job published successfully!', 'success')
@@ -1654,18 +1816,15 @@ def forgot_password():
             try:
                 # Generate reset token
                 reset_token = user.generate_reset_token()
-                db.session.commit()
                 
                 # Create reset link
                 reset_url = url_for('main.reset_password', token=reset_token, _external=True)
                 
-                # Send email using Formspree (or your preferred service)
-                success = send_password_reset_email(user.email, user.username, reset_url)
+                # Queue the email with the token; the outbox delivers it in the background
+                queue_password_reset_email(user.email, user.username, reset_url)
+                db.session.commit()
                 
-                if success:
-                    flash('Password reset instructions have been sent to your email address.', 'success')
-                else:
-                    flash('There was an error sending the email. Please try again later.', 'error')
+                flash('Password reset instructions have been sent to your email address.', 'success')
                     
             except Exception as e:
                 db.session.rollback()
@@ -1682,10 +1841,10 @@ def forgot_password():
 @main.route('/reset_password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
     """Reset password route - allows user to set new password with valid token"""
-    # Find user by reset token
-    user = User.query.filter_by(reset_token=token).first()
+    # The signed token names the user; one primary-key lookup checks it
+    user = User.verify_reset_token(token)
     
-    if not user or not user.verify_reset_token(token):
+    if not user:
         flash('Invalid or expired password reset link.', 'error')
         return redirect(url_for('main.forgot_password'))
     
@@ -1707,9 +1866,8 @@ def reset_password(token):
             return render_template('reset_password.html', token=token)
         
         try:
-            # Update password and clear reset token
+            # The new password hash also invalidates the token
             user.set_password(password)
-            user.clear_reset_token()
             db.session.commit()
             
             flash('Your password has been reset successfully! You can now log in with your new password.', 'success')
@@ -1722,15 +1880,10 @@ def reset_password(token):
     
     return render_template('reset_password.html', token=token)
 
-def send_password_reset_email(email, username, reset_url):
-    """Send password reset email using Formspree or similar service"""
-    try:
-        # Option 1: Using Formspree (replace YOUR_FORM_ID with actual Formspree form ID)
-        formspree_url = "https://formspree.io/f/xeolrqde"  # Replace with Formspree form ID
-        
-        # Email content
-        subject = "Password Reset Request - FindJob"
-        message = f"""
+def queue_password_reset_email(email, username, reset_url):
+    """Queue the password reset email in the current transaction"""
+    subject = "Password Reset Request - FindJob"
+    message = f"""
 Hello {username},
 
 You recently requested to reset your password for your FindJob account.
@@ -1745,53 +1898,4 @@ If you did not request this password reset, please ignore this email or contact
 Best regards,
 The FindJob Team
         """
-        
-        # Prepare form data for Formspree
-        form_data = {
-            'email': email,
-            'subject': subject,
-            'message': message,
-            '_replyto': email,
-            '_subject': subject
-        }
-        
-        # Send via Formspree
-        response = requests.post(formspree_url, data=form_data)
-        
-        if response.status_code == 200:
-            return True
-        else:
-            print(f"Formspree error: {response.status_code} - {response.text}")
-            return False
-            
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
-
-# Alternative email sending function using a different service
-def send_password_reset_email_alternative(email, username, reset_url):
-    """Alternative email sending using EmailJS or similar client-side service"""
-    try:
-        # You can also use services like EmailJS, Netlify Forms, etc.
-        # This is a placeholder for your preferred email service
-        
-        # For now, we'll just log the email content (for development)
-        print(f"""
-=== PASSWORD RESET EMAIL ===
-To: {email}
-Subject: Password Reset Request - FindJob
-
-Hello {username},
-
-Click this link to reset your password:
-{reset_url}
-
-This link expires in 1 hour.
-===========================
-        """)
-        
-        return True  # Return True for testing purposes
-        
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return False
\ No newline at end of file
+    return enqueue_email('password_reset', email, subject, message)
\ No newline at end of file
@@ -0,0 +1,360 @@
+"""
+Pluggable job search engines.
+
+The default engine keeps an in-memory inverted index over active job
+postings so /search never has to scan the job_postings table. The index
+is built once per worker in create_app and kept current by the job write
+routes through index_job() and remove_job(). Deployments with several
+workers or instances can set SEARCH_ENGINE=fulltext to query the shared
+database full-text index instead.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Fields of JobPosting that are searchable
+INDEXED_FIELDS = ('title', 'description', 'company_name', 'location')
+
+# Relative weight of a match in each field when ranking results
+SEARCH_FIELD_WEIGHTS = {
+    'title': 3.0,
+    'company_name': 2.0,
+    'description': 1.0,
+    'location': 1.0,
+}
+
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Bulk changes touching more jobs than this rebuild the job indexes
+JOB_REFRESH_REBUILD_THRESHOLD = 500
+
+
+def tokenize(text):
+    """Split text into lowercase alphanumeric tokens"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SearchEngine:
+    """Base class for job search backends"""
+
+    name = 'base'
+
+    def rebuild(self):
+        """Rebuild any derived search structures from the database"""
+
+    def index_job(self, job):
+        """Add or refresh a job posting in the index"""
+
+    def remove_job(self, job_id):
+        """Drop a job posting from the index"""
+
+    def search(self, keyword):
+        """Return ids of active jobs matching keyword, newest first"""
+        raise NotImplementedError
+
+    def ranked_search(self, keyword, limit, offset=0, after=None):
+        """Return (hits, total) where hits are the best (score, job id) pairs
+
+        Hits are ordered by score then id, both descending. ``after`` is the
+        last (score, job id) of the previous window; when given only hits
+        ranked below it are returned.
+        """
+        raise NotImplementedError
+
+
+class FullTextSearchEngine(SearchEngine):
+    """Engine that matches with the database full-text index (see app.fulltext)"""
+
+    name = 'fulltext'
+
+    def search(self, keyword):
+        from app.models import db, JobPosting
+        from app.fulltext import match_jobs
+
+        clause = match_jobs(keyword)
+        if clause is None:
+            return []
+
+        rows = db.session.query(JobPosting.id).filter(
+            JobPosting.is_active == True,
+            clause
+        ).order_by(JobPosting.posted_date.desc(), JobPosting.id.desc()).all()
+        return [row.id for row in rows]
+
+    def ranked_search(self, keyword, limit, offset=0, after=None):
+        from app.fulltext import get_fulltext_backend
+
+        return get_fulltext_backend().ranked(keyword, limit, offset=offset, after=after)
+
+
+class IndexedDocument:
+    """Per-job data kept by the inverted index for matching and scoring"""
+
+    __slots__ = ('tokens', 'posted_date', 'term_counts', 'lengths')
+
+    def __init__(self, job):
+        self.posted_date = job.posted_date or datetime.min
+        self.term_counts = {}
+        self.lengths = {}
+        tokens = set()
+        for field in INDEXED_FIELDS:
+            field_tokens = tokenize(getattr(job, field, None))
+            self.term_counts[field] = Counter(field_tokens)
+            self.lengths[field] = len(field_tokens)
+            tokens.update(field_tokens)
+        self.tokens = frozenset(tokens)
+
+
+class InvertedIndexSearchEngine(SearchEngine):
+    """In-process tokenized inverted index over active job postings"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}  # token -> set of job ids
+        self._documents = {}  # job id -> IndexedDocument
+        self._field_lengths = dict.fromkeys(INDEXED_FIELDS, 0)
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._documents)
+
+    def rebuild(self):
+        """Load every active job posting and rebuild the index from scratch"""
+        from app.models import db, JobPosting
+
+        columns = [JobPosting.id, JobPosting.posted_date] + [
+            getattr(JobPosting, field) for field in INDEXED_FIELDS
+        ]
+        rows = db.session.query(*columns).filter(JobPosting.is_active == True).all()
+
+        postings = {}
+        documents = {}
+        field_lengths = dict.fromkeys(INDEXED_FIELDS, 0)
+        for row in rows:
+            document = IndexedDocument(row)
+            documents[row.id] = document
+            for field in INDEXED_FIELDS:
+                field_lengths[field] += document.lengths[field]
+            for token in document.tokens:
+                postings.setdefault(token, set()).add(row.id)
+
+        with self._lock:
+            self._postings = postings
+            self._documents = documents
+            self._field_lengths = field_lengths
+            self.built_at = datetime.utcnow()
+
+    def index_job(self, job):
+        """Add or refresh a job; inactive jobs are removed instead"""
+        if not job.is_active:
+            self.remove_job(job.id)
+            return
+
+        document = IndexedDocument(job)
+        with self._lock:
+            self._unindex(job.id)
+            self._documents[job.id] = document
+            for field in INDEXED_FIELDS:
+                self._field_lengths[field] += document.lengths[field]
+            for token in document.tokens:
+                self._postings.setdefault(token, set()).add(job.id)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            self._unindex(job_id)
+
+    def search(self, keyword):
+        """Return ids of jobs containing every query token, newest first"""
+        with self._lock:
+            matches = self._match(set(tokenize(keyword)))
+            documents = self._documents
+            return sorted(matches, key=lambda job_id: (documents[job_id].posted_date, job_id), reverse=True)
+
+    def ranked_search(self, keyword, limit, offset=0, after=None):
+        """Score matches with field-weighted BM25 and keep a top-k heap"""
+        query_tokens = set(tokenize(keyword))
+        with self._lock:
+            matches = self._match(query_tokens)
+            if not matches:
+                return [], 0
+
+            total_documents = len(self._documents)
+            idf = {}
+            for token in query_tokens:
+                document_frequency = len(self._postings[token])
+                idf[token] = math.log(1 + (total_documents - document_frequency + 0.5) / (document_frequency + 0.5))
+            averages = {
+                field: max(self._field_lengths[field] / total_documents, 1.0)
+                for field in INDEXED_FIELDS
+            }
+
+            hits = ((self._score(self._documents[job_id], idf, averages), job_id) for job_id in matches)
+            if after is not None:
+                after = tuple(after)
+                hits = (hit for hit in hits if hit < after)
+            top = heapq.nlargest(offset + limit, hits)
+
+        return top[offset:], len(matches)
+
+    def _match(self, query_tokens):
+        """Ids of documents containing every query token; caller holds the lock"""
+        if not query_tokens:
+            return set()
+
+        posting_lists = []
+        for token in query_tokens:
+            posting = self._postings.get(token)
+            if not posting:
+                return set()
+            posting_lists.append(posting)
+
+        # Intersect starting from the rarest token to keep the work small
+        posting_lists.sort(key=len)
+        matches = set(posting_lists[0])
+        for posting in posting_lists[1:]:
+            matches &= posting
+            if not matches:
+                break
+        return matches
+
+    @staticmethod
+    def _score(document, idf, averages):
+        """Sum of per-field BM25 scores scaled by SEARCH_FIELD_WEIGHTS"""
+        score = 0.0
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            counts = document.term_counts[field]
+            if not counts:
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * document.lengths[field] / averages[field])
+            for token, token_idf in idf.items():
+                frequency = counts.get(token)
+                if frequency:
+                    score += weight * token_idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return score
+
+    def _unindex(self, job_id):
+        """Remove a job's postings; caller must hold the lock"""
+        document = self._documents.pop(job_id, None)
+        if document is None:
+            return
+        for field in INDEXED_FIELDS:
+            self._field_lengths[field] -= document.lengths[field]
+        for token in document.tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.discard(job_id)
+                if not posting:
+                    del self._postings[token]
+
+
+SEARCH_ENGINES = {
+    FullTextSearchEngine.name: FullTextSearchEngine,
+    InvertedIndexSearchEngine.name: InvertedIndexSearchEngine,
+}
+
+
+class JobSearch:
+    """Flask extension that owns the configured search engine"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create the engine named by SEARCH_ENGINE and build it"""
+        engine_name = app.config.get('SEARCH_ENGINE', InvertedIndexSearchEngine.name)
+        engine_class = SEARCH_ENGINES.get(engine_name)
+        if engine_class is None:
+            raise ValueError(f"Unknown SEARCH_ENGINE: {engine_name}")
+
+        engine = engine_class()
+        app.extensions['job_search'] = engine
+        register_job_index(app, engine)
+
+        with app.app_context():
+            try:
+                engine.rebuild()
+            except Exception as e:
+                print(f"Error building search index: {e}")
+
+
+job_search = JobSearch()
+
+
+def register_job_index(app, index):
+    """Have index_job()/remove_job() keep an in-process job index current
+
+    The index must provide index_job(job) and remove_job(job_id).
+    """
+    app.extensions.setdefault('job_indexes', []).append(index)
+
+
+def get_search_engine():
+    """Get the search engine for the current app, falling back to full-text"""
+    engine = current_app.extensions.get('job_search')
+    if engine is None:
+        engine = FullTextSearchEngine()
+    return engine
+
+
+def index_job(job):
+    """Refresh a job posting in every job index after it was committed"""
+    for index in current_app.extensions.get('job_indexes', []):
+        try:
+            index.index_job(job)
+        except Exception as e:
+            print(f"Error indexing job {job.id} in {type(index).__name__}: {e}")
+
+
+def remove_job(job_id):
+    """Drop a job posting from every job index after it was deleted"""
+    for index in current_app.extensions.get('job_indexes', []):
+        try:
+            index.remove_job(job_id)
+        except Exception as e:
+            print(f"Error removing job {job_id} from {type(index).__name__}: {e}")
+
+
+def refresh_jobs(job_ids):
+    """Bring every job index up to date after a bulk change to job_ids
+
+    Refreshes the jobs that still exist in one query and drops the rest.
+    Past JOB_REFRESH_REBUILD_THRESHOLD jobs each index is rebuilt instead.
+    """
+    from app.models import JobPosting
+
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    indexes = current_app.extensions.get('job_indexes', [])
+    if len(job_ids) > JOB_REFRESH_REBUILD_THRESHOLD:
+        for index in indexes:
+            try:
+                if hasattr(index, 'rebuild'):
+                    index.rebuild()
+                else:
+                    for job_id in job_ids:
+                        index.remove_job(job_id)
+            except Exception as e:
+                print(f"Error rebuilding {type(index).__name__}: {e}")
+        return
+
+    remaining = set(job_ids)
+    for job in JobPosting.query.filter(JobPosting.id.in_(job_ids)):
+        remaining.discard(job.id)
+        index_job(job)
+    for job_id in remaining:
+        remove_job(job_id)
@@ -0,0 +1,427 @@
+"""
+Pluggable session storage.
+
+SESSION_TYPE picks where session data lives:
+
+* 'cookie' keeps Flask's signed cookie, which holds the data itself.
+* 'sqlalchemy' keeps it in the user_sessions table, so every worker and
+  every instance sees the same sessions. The cookie only carries a
+  signed, random session id.
+* 'memory' keeps it in a dict in this process. It stands in for an
+  external key-value store in development and tests, and is not shared
+  between workers.
+
+Server-side sessions are written only when they change. An unchanged
+session is re-saved at most once per SESSION_REFRESH_SECONDS, and then
+only its expiry is updated. Data is stored as compact tagged JSON and is
+compressed once it grows past SESSION_COMPRESS_BYTES. Expired sessions
+are swept from the store every SESSION_SWEEP_SECONDS by a thread in each
+worker, or by ``flask sweep-sessions``.
+"""
+import secrets
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, Signer
+
+# How often each worker deletes expired sessions, in seconds; 0 leaves it to `flask sweep-sessions`
+SESSION_SWEEP_SECONDS = 3600
+
+# An unchanged session's expiry is pushed back at most this often, in seconds
+SESSION_REFRESH_SECONDS = 86400
+
+# Serialized sessions larger than this are stored compressed, in bytes
+SESSION_COMPRESS_BYTES = 512
+
+SESSION_ID_SALT = 'session-id'
+
+_JSON = b'j'
+_ZLIB = b'z'
+
+
+class ServerSideSession(SecureCookieSession):
+    """Session whose data lives in a store, found by the id in its cookie"""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.new = sid is None
+        self.sid = sid or new_session_id()
+        # Expiry recorded in the store when the session was loaded
+        self.expires_at = expires_at
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Move the data to a new id, e.g. at login, so an old id can't be reused"""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = new_session_id()
+        self.modified = True
+
+
+def new_session_id():
+    return secrets.token_urlsafe(32)
+
+
+class SessionSerializer:
+    """Tagged JSON (datetimes, bytes and tuples survive), compressed when large"""
+
+    def __init__(self, compress_bytes=SESSION_COMPRESS_BYTES):
+        self.compress_bytes = compress_bytes
+        self._json = TaggedJSONSerializer()
+
+    def dumps(self, data):
+        encoded = self._json.dumps(data).encode('utf-8')
+        if len(encoded) > self.compress_bytes:
+            compressed = zlib.compress(encoded)
+            if len(compressed) < len(encoded):
+                return _ZLIB + compressed
+        return _JSON + encoded
+
+    def loads(self, payload):
+        payload = bytes(payload)
+        if payload[:1] == _ZLIB:
+            return self._json.loads(zlib.decompress(payload[1:]).decode('utf-8'))
+        return self._json.loads(payload[1:].decode('utf-8'))
+
+
+class SessionStore:
+    """Base class for places server-side sessions are kept"""
+
+    name = 'base'
+
+    def load(self, sid, now):
+        """(payload, expires_at) of a live session, or None"""
+        raise NotImplementedError
+
+    def save(self, sid, payload, expires_at):
+        raise NotImplementedError
+
+    def touch(self, sid, expires_at):
+        """Push back the expiry of a session without rewriting it"""
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+    def sweep(self, now):
+        """Delete expired sessions; returns how many"""
+        raise NotImplementedError
+
+    def size(self, now):
+        """{'sessions': live sessions, 'bytes': their stored size}"""
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in a dict of this process; a stand-in for a key-value server"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid, now):
+        with self._lock:
+            stored = self._sessions.get(sid)
+        if stored is None or stored[1] <= now:
+            return None
+        return stored
+
+    def save(self, sid, payload, expires_at):
+        with self._lock:
+            self._sessions[sid] = (payload, expires_at)
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            if sid in self._sessions:
+                self._sessions[sid] = (self._sessions[sid][0], expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def sweep(self, now):
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+    def size(self, now):
+        with self._lock:
+            live = [payload for payload, expires_at in self._sessions.values() if expires_at > now]
+        return {'sessions': len(live), 'bytes': sum(len(payload) for payload in live)}
+
+
+class SqlSessionStore(SessionStore):
+    """Sessions in the user_sessions table, shared by every worker and instance
+
+    Each call runs in its own short transaction on the engine, apart from
+    the request's ORM session, which may already be committed or rolled
+    back by the time the session is saved.
+    """
+
+    name = 'sqlalchemy'
+
+    def _table(self):
+        from app.models import ServerSession
+        return ServerSession.__table__
+
+    def load(self, sid, now):
+        from app.models import db
+
+        sessions = self._table()
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                db.select(sessions.c.data, sessions.c.expires_at)
+                .where(sessions.c.id == sid, sessions.c.expires_at > now)
+            ).first()
+        return (row.data, row.expires_at) if row else None
+
+    def save(self, sid, payload, expires_at):
+        from app.models import db
+
+        sessions = self._table()
+        with db.engine.begin() as connection:
+            updated = connection.execute(
+                sessions.update().where(sessions.c.id == sid).values(data=payload, expires_at=expires_at)
+            ).rowcount
+            if not updated:
+                connection.execute(sessions.insert().values(id=sid, data=payload, expires_at=expires_at))
+
+    def touch(self, sid, expires_at):
+        from app.models import db
+
+        sessions = self._table()
+        with db.engine.begin() as connection:
+            connection.execute(sessions.update().where(sessions.c.id == sid).values(expires_at=expires_at))
+
+    def delete(self, sid):
+        from app.models import db
+
+        sessions = self._table()
+        with db.engine.begin() as connection:
+            connection.execute(sessions.delete().where(sessions.c.id == sid))
+
+    def sweep(self, now):
+        from app.models import db
+
+        sessions = self._table()
+        with db.engine.begin() as connection:
+            return connection.execute(sessions.delete().where(sessions.c.expires_at <= now)).rowcount
+
+    def size(self, now):
+        from app.models import db
+
+        sessions = self._table()
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                db.select(db.func.count(), db.func.coalesce(db.func.sum(db.func.length(sessions.c.data)), 0))
+                .where(sessions.c.expires_at > now)
+            ).one()
+        return {'sessions': row[0], 'bytes': int(row[1])}
+
+
+SESSION_STORES = {
+    MemorySessionStore.name: MemorySessionStore,
+    SqlSessionStore.name: SqlSessionStore,
+}
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data in a SessionStore and a signed id in the cookie"""
+
+    def __init__(self, store, serializer=None, refresh_seconds=SESSION_REFRESH_SECONDS,
+                 sweep_seconds=SESSION_SWEEP_SECONDS):
+        self.store = store
+        self.serializer = serializer or SessionSerializer()
+        self.refresh_seconds = refresh_seconds
+        self.sweep_seconds = sweep_seconds
+        self._lock = threading.Lock()
+        self._counts = {'loaded': 0, 'missing': 0, 'saved': 0, 'refreshed': 0,
+                        'unchanged': 0, 'deleted': 0, 'swept': 0}
+        self._size = None
+        self._sweeper = None
+        self._start_lock = threading.Lock()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._counts[key] += amount
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=SESSION_ID_SALT)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie or not app.secret_key:
+            return ServerSideSession()
+        try:
+            sid = self._signer(app).unsign(cookie).decode('utf-8')
+        except BadSignature:
+            return ServerSideSession()
+
+        try:
+            stored = self.store.load(sid, datetime.utcnow())
+            data = self.serializer.loads(stored[0]) if stored else None
+        except Exception as e:
+            print(f"Error loading session: {e}")
+            stored = data = None
+        if data is None:
+            # Unknown or expired ids are never reused
+            self._count('missing')
+            return ServerSideSession()
+        self._count('loaded')
+        return ServerSideSession(data, sid=sid, expires_at=stored[1])
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        partitioned = self.get_cookie_partitioned(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        try:
+            if session.previous_sid:
+                self.store.delete(session.previous_sid)
+                self._count('deleted')
+
+            # An emptied session is deleted along with its cookie
+            if not session:
+                if session.modified and not session.new:
+                    self.store.delete(session.sid)
+                    self._count('deleted')
+                    response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                           partitioned=partitioned, samesite=samesite, httponly=httponly)
+                    response.vary.add('Cookie')
+                return
+
+            now = datetime.utcnow()
+            expires_at = now + app.permanent_session_lifetime
+            if session.modified or session.new:
+                self.store.save(session.sid, self.serializer.dumps(dict(session)), expires_at)
+                self._count('saved')
+            elif self._due_for_refresh(app, session, expires_at):
+                self.store.touch(session.sid, expires_at)
+                self._count('refreshed')
+            else:
+                self._count('unchanged')
+                return
+        except Exception as e:
+            print(f"Error saving session: {e}")
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode('utf-8'),
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            partitioned=partitioned,
+            samesite=samesite,
+        )
+        response.vary.add('Cookie')
+
+    def _due_for_refresh(self, app, session, expires_at):
+        if not app.config.get('SESSION_REFRESH_EACH_REQUEST', True) or session.expires_at is None:
+            return False
+        return expires_at - session.expires_at >= timedelta(seconds=self.refresh_seconds)
+
+    def sweep(self, now=None):
+        """Delete expired sessions and remeasure the store; returns how many were deleted"""
+        now = now or datetime.utcnow()
+        removed = self.store.sweep(now)
+        self._count('swept', removed)
+        size = self.store.size(now)
+        with self._lock:
+            self._size = size
+        return removed
+
+    def stats(self):
+        """Store size as of the last sweep, and this worker's session traffic"""
+        with self._lock:
+            size = self._size
+            counts = dict(self._counts)
+        if size is None:
+            size = self.store.size(datetime.utcnow())
+            with self._lock:
+                self._size = size
+        return {'type': self.store.name, **size, **counts}
+
+    def start(self, app):
+        """Start this worker's expiry sweeper, once"""
+        if not self.sweep_seconds or self._sweeper is not None:
+            return
+        with self._start_lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._run, args=(app,), name='session-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _run(self, app):
+        while True:
+            time.sleep(self.sweep_seconds)
+            with app.app_context():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error sweeping expired sessions: {e}")
+
+
+class ServerSessions:
+    """Flask extension that installs the session store named by SESSION_TYPE"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('SESSION_TYPE', 'cookie')
+        if name == 'cookie':
+            return
+        store_class = SESSION_STORES.get(name)
+        if store_class is None:
+            print(f"Unknown SESSION_TYPE {name!r}; keeping sessions in signed cookies")
+            return
+
+        interface = ServerSideSessionInterface(
+            store_class(),
+            serializer=SessionSerializer(app.config.get('SESSION_COMPRESS_BYTES', SESSION_COMPRESS_BYTES)),
+            refresh_seconds=app.config.get('SESSION_REFRESH_SECONDS', SESSION_REFRESH_SECONDS),
+            sweep_seconds=app.config.get('SESSION_SWEEP_SECONDS', SESSION_SWEEP_SECONDS)
+        )
+        app.session_interface = interface
+        app.extensions['server_sessions'] = interface
+
+        # Started by the first request, so CLI commands and tests stay single-threaded
+        @app.before_request
+        def start_session_sweeper():
+            interface.start(app)
+
+
+server_sessions = ServerSessions()
+
+
+def get_session_interface():
+    """The server-side session interface of the current app, or None with cookie sessions"""
+    return current_app.extensions.get('server_sessions')
+
+
+def session_stats():
+    """Session store stats for /health"""
+    interface = get_session_interface()
+    if interface is None:
+        return {'type': 'cookie'}
+    return interface.stats()
@@ -0,0 +1,110 @@
+"""
+Cached system statistics.
+
+The home page and the admin dashboard both show the system overview, and
+every visit used to recount the users, jobs and applications tables.
+Each worker now keeps the last overview for OVERVIEW_CACHE_SECONDS. When
+it goes stale a single request recomputes it while concurrent requests
+keep getting the previous snapshot, so a burst of traffic never starts
+more than one refresh per worker. Only the very first load, when there is
+no snapshot to serve yet, makes other requests wait for it.
+"""
+import threading
+import time
+
+from flask import current_app
+
+# How long a worker reuses the system overview
+OVERVIEW_CACHE_SECONDS = 30
+
+
+class SnapshotCache:
+    """A single value refreshed by one caller at a time once it is stale"""
+
+    def __init__(self, loader, ttl=OVERVIEW_CACHE_SECONDS):
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()  # guards the fields below
+        self._refresh_lock = threading.Lock()  # held by the caller refreshing
+        self._value = None
+        self._expires_at = 0.0
+
+    def get(self):
+        with self._lock:
+            value, fresh = self._value, self._expires_at > time.monotonic()
+        if fresh:
+            return value
+
+        if value is not None:
+            # Someone else is already refreshing: serve the stale snapshot
+            if not self._refresh_lock.acquire(blocking=False):
+                return value
+        else:
+            self._refresh_lock.acquire()
+
+        try:
+            with self._lock:
+                # The snapshot may have been refreshed while we waited
+                if self._value is not None and self._expires_at > time.monotonic():
+                    return self._value
+            value = self.loader()
+            with self._lock:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl
+            return value
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self):
+        """Make the next get() recompute; the old value is served meanwhile"""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+            self._expires_at = 0.0
+
+
+class SystemStats:
+    """Flask extension that keeps a system overview snapshot for each worker"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import User
+
+        app.extensions['system_stats'] = SnapshotCache(
+            User.system_overview_snapshot,
+            ttl=app.config.get('OVERVIEW_CACHE_SECONDS', OVERVIEW_CACHE_SECONDS)
+        )
+
+
+system_stats = SystemStats()
+
+
+def get_system_overview():
+    """System overview reused for up to OVERVIEW_CACHE_SECONDS
+
+    Falls back to zeroed figures when the database cannot be counted; that
+    result is not cached, so the next request tries again.
+    """
+    from app.models import User
+
+    try:
+        cache = current_app.extensions.get('system_stats')
+        if cache is None:
+            return User.system_overview_snapshot()
+        return cache.get()
+    except Exception as e:
+        print(f"Error in get_system_overview: {e}")
+        return User.empty_system_overview()
+
+
+def invalidate_system_overview():
+    """Drop the cached overview, e.g. after a bulk change, so the next read recounts"""
+    cache = current_app.extensions.get('system_stats')
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,176 @@
+"""
+Paginated, searchable user grid for /admin/manage_users.
+
+The grid reads one keyset window at a time over the columns it shows, so
+a page costs the same whether the users table holds a hundred rows or a
+million. Searching matches a prefix of the username or email through
+expression indexes on lower(username) and lower(email): SQLite answers a
+range comparison on the expression from the index, PostgreSQL a LIKE
+prefix through text_pattern_ops indexes. Unfiltered and role-filtered
+totals come from the reporting counts rather than COUNT(*).
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, text
+
+from config.db_config import DatabaseConfig
+
+# Users per page
+USER_GRID_PAGE_SIZE = 25
+
+USER_ROLES = ('seeker', 'employer', 'admin')
+
+# Sort name -> (label, keyset key attributes of User, cursor parsers, descending)
+USER_GRID_SORTS = {
+    'newest': ('Newest first', ('created_at', 'id'), (datetime.fromisoformat, int), True),
+    'oldest': ('Oldest first', ('created_at', 'id'), (datetime.fromisoformat, int), False),
+    'username': ('Username A-Z', ('username',), (str,), False),
+    'username_desc': ('Username Z-A', ('username',), (str,), True),
+}
+
+DEFAULT_SORT = 'newest'
+
+# Longest search prefix honoured
+MAX_SEARCH_LENGTH = 120
+
+
+def parse_user_grid_args(args):
+    """Read the search, role filter and sort from request arguments"""
+    role = args.get('role', '').strip()
+    sort = args.get('sort', '').strip()
+    return {
+        'q': args.get('q', '').strip().lower()[:MAX_SEARCH_LENGTH] or None,
+        'role': role if role in USER_ROLES else None,
+        'sort': sort if sort in USER_GRID_SORTS else DEFAULT_SORT,
+    }
+
+
+class PrefixMatcher:
+    """Portable fallback: LIKE on the lowered column"""
+
+    dialect = 'unknown'
+
+    def install(self, connection):
+        return False
+
+    def clause(self, expression, prefix):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return expression.like(f"{escaped}%", escape='\\')
+
+
+class SqlitePrefixMatcher(PrefixMatcher):
+    """Range comparison on lower() expression indexes
+
+    SQLite only uses an index for LIKE on a plain column with a matching
+    collation, but it does use an expression index for a range.
+    """
+
+    dialect = 'sqlite'
+
+    INDEX_DDL = (
+        "CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username))",
+        "CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email))",
+    )
+
+    def install(self, connection):
+        for ddl in self.INDEX_DDL:
+            connection.execute(text(ddl))
+        return True
+
+    def clause(self, expression, prefix):
+        # Every string starting with prefix sorts at or after it and before
+        # the prefix with its last character bumped
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return (expression >= prefix) & (expression < upper)
+
+
+class PostgresPrefixMatcher(PrefixMatcher):
+    """LIKE prefix on lower() expression indexes with text_pattern_ops"""
+
+    dialect = 'postgresql'
+
+    INDEX_DDL = (
+        "CREATE INDEX IF NOT EXISTS ix_users_username_lower ON users (lower(username) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_users_email_lower ON users (lower(email) text_pattern_ops)",
+    )
+
+    def install(self, connection):
+        for ddl in self.INDEX_DDL:
+            connection.execute(text(ddl))
+        return True
+
+
+PREFIX_MATCHERS = {
+    SqlitePrefixMatcher.dialect: SqlitePrefixMatcher,
+    PostgresPrefixMatcher.dialect: PostgresPrefixMatcher,
+}
+
+
+class UserGrid:
+    """Flask extension that creates the search indexes and picks the matcher"""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app.models import db
+
+        database_type = DatabaseConfig.get_database_type(app.config.get('SQLALCHEMY_DATABASE_URI'))
+        matcher = PREFIX_MATCHERS.get(database_type, PrefixMatcher)()
+
+        with app.app_context():
+            try:
+                with db.engine.begin() as connection:
+                    matcher.install(connection)
+            except Exception as e:
+                print(f"User search indexes unavailable: {e}")
+                matcher = PrefixMatcher()
+
+        app.extensions['user_grid'] = matcher
+
+
+user_grid = UserGrid()
+
+
+def get_prefix_matcher():
+    """Get the prefix matcher for the current app"""
+    return current_app.extensions.get('user_grid') or PrefixMatcher()
+
+
+def user_grid_clauses(filters):
+    """SQL filter clauses for User matching the role and search filters"""
+    from app.models import db, User
+
+    clauses = []
+    if filters.get('role'):
+        clauses.append(User.role == filters['role'])
+    if filters.get('q'):
+        matcher = get_prefix_matcher()
+        clauses.append(db.or_(
+            matcher.clause(func.lower(User.username), filters['q']),
+            matcher.clause(func.lower(User.email), filters['q'])
+        ))
+    return clauses
+
+
+def user_grid_window(filters, cursor=None, page=1, per_page=USER_GRID_PAGE_SIZE):
+    """One window of the user grid for the filters from parse_user_grid_args()"""
+    from app.models import db, User
+    from app.pagination import keyset_window
+    from app.reporting import current_counts
+
+    query = db.session.query(
+        User.id, User.username, User.email, User.role, User.full_name, User.created_at, User.is_active
+    ).filter(*user_grid_clauses(filters))
+
+    total = None
+    if not filters.get('q'):
+        counts = current_counts('users')
+        total = counts[filters['role']] if filters.get('role') else sum(counts.values())
+
+    _, key_names, parsers, descending = USER_GRID_SORTS[filters.get('sort') or DEFAULT_SORT]
+    keys = tuple(getattr(User, name) for name in key_names)
+    return keyset_window(query, keys, per_page, cursor=cursor, page=page, total=total,
+                         parsers=parsers, descending=descending)
@@ -8,6 +8,32 @@ from urllib.parse import urlparse
 # Get the project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
 
+# Connections each worker keeps for its request threads, and extra ones
+# for bursts and background threads (email delivery, session sweeping).
+# A Postgres server sees up to workers x (size + overflow) connections.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', os.environ.get('WEB_THREADS', 2)))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 3))
+
+# Longest a request waits for a free connection, in seconds
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+# Connections are replaced after this many seconds, before poolers and
+# proxies (Supabase's among them) drop them for being idle
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 300))
+
+# Longest a single Postgres statement may run, in milliseconds; 0 for no limit
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+# Applied to every new SQLite connection. WAL lets readers and a writer
+# work at once; NORMAL sync is safe with WAL and much cheaper than FULL.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # ms to wait on a locked database before failing
+    'mmap_size': 268435456,     # 256 MiB read through memory mapping
+    'cache_size': -65536,       # 64 MiB page cache (negative values are KiB)
+}
+
 # Database configuration
 class DatabaseConfig:
     """Database configuration for SQLite and PostgreSQL"""
@@ -18,13 +44,14 @@ class DatabaseConfig:
         return os.environ.get('DATABASE_URL', f'sqlite:///{PROJECT_ROOT / "findjob.db"}')
     
     @classmethod
-    def get_database_type(cls):
-        """Determine the database type from the URL"""
-        url = cls.get_database_url()
-        parsed = urlparse(url)
-        if parsed.scheme == 'sqlite':
+    def get_database_type(cls, url=None):
+        """Determine the database type from the URL (defaults to DATABASE_URL)"""
+        url = url or cls.get_database_url()
+        # Ignore the driver part of schemes like postgresql+psycopg2
+        scheme = urlparse(url).scheme.split('+')[0]
+        if scheme == 'sqlite':
             return 'sqlite'
-        elif parsed.scheme == 'postgresql':
+        elif scheme in ('postgresql', 'postgres'):
             return 'postgresql'
         else:
             return 'unknown'
@@ -37,6 +64,45 @@ class DatabaseConfig:
     def is_postgresql(cls):
         return cls.get_database_type() == 'postgresql'
     
+    @classmethod
+    def get_engine_profile(cls, url=None):
+        """Engine options and per-connection settings for the database at url
+
+        Returns a dict with the profile name, the create_engine options and
+        the SQLite pragmas to apply on connect.
+        """
+        url = url or cls.get_database_url()
+        database_type = cls.get_database_type(url)
+        profile = {'name': database_type, 'engine_options': {}, 'pragmas': {}}
+        
+        if database_type == 'postgresql':
+            profile['engine_options'] = {
+                'pool_size': DB_POOL_SIZE,
+                'max_overflow': DB_MAX_OVERFLOW,
+                'pool_timeout': DB_POOL_TIMEOUT,
+                'pool_recycle': DB_POOL_RECYCLE,
+                'pool_pre_ping': True,
+                # The timeout is a startup option: a SET on connect is lost behind
+                # a transaction-mode pooler. Per statement, so streamed exports
+                # (one FETCH at a time) aren't cut off
+                'connect_args': {
+                    'connect_timeout': 10,
+                    'application_name': 'findjob',
+                    'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}',
+                },
+            }
+        elif database_type == 'sqlite':
+            pragmas = dict(SQLITE_PRAGMAS)
+            if ':memory:' in url or url.rstrip('/') == 'sqlite:':
+                # One shared connection; WAL and memory mapping need a file
+                del pragmas['journal_mode'], pragmas['mmap_size']
+            else:
+                profile['engine_options'] = {'pool_timeout': DB_POOL_TIMEOUT}
+            profile['pragmas'] = pragmas
+        else:
+            profile['engine_options'] = {'pool_pre_ping': True, 'pool_recycle': DB_POOL_RECYCLE}
+        return profile
+    
     # SQLAlchemy configuration
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False  # Set to True for SQL debugging
@@ -0,0 +1,58 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Application bound to a throwaway SQLite database"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    # Hash inline; the pool itself is exercised in test_auth.py
+    monkeypatch.setenv('PASSWORD_HASH_WORKERS', '0')
+    # Queue email without delivery threads; tests deliver explicitly to files
+    monkeypatch.setenv('EMAIL_WORKERS', '0')
+    monkeypatch.setenv('EMAIL_TRANSPORT', 'file')
+    monkeypatch.setenv('EMAIL_FILE_DIR', str(tmp_path / 'outbox'))
+
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements run inside it
+
+    With a table name only statements reading from that table are kept.
+    """
+    from app.models import db
+
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def counting(table=None):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if table is None or f'FROM {table}' in statement:
+                statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+    return counting
@@ -38,6 +38,20 @@ def init_production():
             else:
                 print("Admin user already exists")
 
+            # Fill the reporting tables once; workers never backfill them on start-up
+            from app.models import ReportCount
+            from app.reporting import backfill_reports
+            if db.session.query(ReportCount.metric).first() is None:
+                print("Backfilling report tables...")
+                counts, rollups = backfill_reports()
+                print(f"Report tables backfilled: {counts} count row(s), {rollups} rollup row(s)")
+
+            # Likewise seed an empty activity feed from the latest rows
+            from app.activity import seed_activity
+            seeded = seed_activity()
+            if seeded:
+                print(f"Activity log seeded with {seeded} event(s)")
+
         print("Production initialization completed successfully!")
         return True
 
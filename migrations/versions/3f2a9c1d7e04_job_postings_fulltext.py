@@ -0,0 +1,83 @@
+"""Full-text search structures for job_postings
+
+PostgreSQL gets a generated, weighted tsvector column with a GIN index.
+SQLite gets an external-content FTS5 table kept in sync by triggers.
+
+Revision ID: 3f2a9c1d7e04
+Revises: 
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e04'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE job_postings ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(company_name, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'C') ||
+                setweight(to_tsvector('english', coalesce(location, '')), 'D')
+            ) STORED
+        """)
+        op.execute("""
+            CREATE INDEX IF NOT EXISTS ix_job_postings_search_vector
+            ON job_postings USING GIN (search_vector)
+        """)
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS job_postings_fts USING fts5(
+                title, company_name, description, location,
+                content='job_postings', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS job_postings_fts_ai AFTER INSERT ON job_postings BEGIN
+                INSERT INTO job_postings_fts(rowid, title, company_name, description, location)
+                VALUES (new.id, new.title, new.company_name, new.description, new.location);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS job_postings_fts_ad AFTER DELETE ON job_postings BEGIN
+                INSERT INTO job_postings_fts(job_postings_fts, rowid, title, company_name, description, location)
+                VALUES ('delete', old.id, old.title, old.company_name, old.description, old.location);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER IF NOT EXISTS job_postings_fts_au
+            AFTER UPDATE OF title, company_name, description, location ON job_postings BEGIN
+                INSERT INTO job_postings_fts(job_postings_fts, rowid, title, company_name, description, location)
+                VALUES ('delete', old.id, old.title, old.company_name, old.description, old.location);
+                INSERT INTO job_postings_fts(rowid, title, company_name, description, location)
+                VALUES (new.id, new.title, new.company_name, new.description, new.location);
+            END
+        """)
+        op.execute("INSERT INTO job_postings_fts(job_postings_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_job_postings_search_vector")
+        op.execute("ALTER TABLE job_postings DROP COLUMN IF EXISTS search_vector")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS job_postings_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS job_postings_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS job_postings_fts_ai")
+        op.execute("DROP TABLE IF EXISTS job_postings_fts")
@@ -0,0 +1,42 @@
+"""Trigram indexes for typo-tolerant job search
+
+PostgreSQL only: enables pg_trgm and adds GIN trigram indexes on the job
+title, company name and location. Other databases use the in-process
+trigram index built at startup.
+
+Revision ID: 8b51e6d2a9f3
+Revises: 3f2a9c1d7e04
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b51e6d2a9f3'
+down_revision = '3f2a9c1d7e04'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_FIELDS = ('title', 'company_name', 'location')
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in TRIGRAM_FIELDS:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS ix_job_postings_{field}_trgm "
+            f"ON job_postings USING GIN ({field} gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for field in TRIGRAM_FIELDS:
+        op.execute(f"DROP INDEX IF EXISTS ix_job_postings_{field}_trgm")
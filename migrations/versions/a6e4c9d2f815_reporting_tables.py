@@ -0,0 +1,48 @@
+"""Reporting count and rollup tables
+
+Adds report_counts (current rows per role, job state and application
+status) and report_rollups (rows created per hour and per day). Fill them
+with ``flask backfill-reports`` after upgrading.
+
+Revision ID: a6e4c9d2f815
+Revises: f5c2d8e1b934
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6e4c9d2f815'
+down_revision = 'f5c2d8e1b934'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the tables
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'report_counts' not in existing:
+        op.create_table(
+            'report_counts',
+            sa.Column('metric', sa.String(length=40), nullable=False),
+            sa.Column('dimension', sa.String(length=40), nullable=False),
+            sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+            sa.PrimaryKeyConstraint('metric', 'dimension')
+        )
+    if 'report_rollups' not in existing:
+        op.create_table(
+            'report_rollups',
+            sa.Column('granularity', sa.String(length=8), nullable=False),
+            sa.Column('metric', sa.String(length=40), nullable=False),
+            sa.Column('period_start', sa.DateTime(), nullable=False),
+            sa.Column('dimension', sa.String(length=40), nullable=False),
+            sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+            sa.PrimaryKeyConstraint('granularity', 'metric', 'period_start', 'dimension')
+        )
+
+
+def downgrade():
+    op.drop_table('report_rollups')
+    op.drop_table('report_counts')
@@ -0,0 +1,41 @@
+"""Append-only activity_events log
+
+Revision ID: b3f7a1e6c428
+Revises: a6e4c9d2f815
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f7a1e6c428'
+down_revision = 'a6e4c9d2f815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the table
+    if 'activity_events' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'activity_events',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('occurred_at', sa.DateTime(), nullable=False),
+        sa.Column('event_type', sa.String(length=20), nullable=False),
+        sa.Column('action', sa.String(length=50), nullable=False),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('actor_name', sa.String(length=80), nullable=True),
+        sa.Column('details', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activity_events_occurred_at_id', 'activity_events', ['occurred_at', 'id'], unique=False)
+    op.create_index('ix_activity_events_type_occurred_at', 'activity_events', ['event_type', 'occurred_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_activity_events_type_occurred_at', table_name='activity_events')
+    op.drop_index('ix_activity_events_occurred_at_id', table_name='activity_events')
+    op.drop_table('activity_events')
@@ -0,0 +1,27 @@
+"""Composite index for keyset pagination of job listings
+
+Revision ID: c47d0e9b3a15
+Revises: 8b51e6d2a9f3
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d0e9b3a15'
+down_revision = '8b51e6d2a9f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the index
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('job_postings')}
+    if 'ix_job_postings_posted_date_id' not in existing:
+        op.create_index('ix_job_postings_posted_date_id', 'job_postings', ['posted_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_job_postings_posted_date_id', table_name='job_postings')
@@ -0,0 +1,39 @@
+"""Indexes for the admin user grid
+
+Adds (created_at, id) for keyset pagination and lower(username) /
+lower(email) expression indexes for prefix search (with text_pattern_ops
+on PostgreSQL so LIKE 'prefix%' can use them).
+
+Revision ID: c8d2e5f1a739
+Revises: b3f7a1e6c428
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8d2e5f1a739'
+down_revision = 'b3f7a1e6c428'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = ('username', 'email')
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the index
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('users')}
+    if 'ix_users_created_at_id' not in existing:
+        op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+    ops = ' text_pattern_ops' if op.get_bind().dialect.name == 'postgresql' else ''
+    for column in SEARCH_COLUMNS:
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_users_{column}_lower ON users (lower({column}){ops})")
+
+
+def downgrade():
+    for column in SEARCH_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_users_{column}_lower")
+    op.drop_index('ix_users_created_at_id', table_name='users')
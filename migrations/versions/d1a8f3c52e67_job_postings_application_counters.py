@@ -0,0 +1,45 @@
+"""Application counters on job_postings
+
+Adds application_count and one counter per application status, filled
+from the applications table.
+
+Revision ID: d1a8f3c52e67
+Revises: c47d0e9b3a15
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a8f3c52e67'
+down_revision = 'c47d0e9b3a15'
+branch_labels = None
+depends_on = None
+
+STATUSES = ('pending', 'reviewed', 'accepted', 'rejected')
+COUNTERS = ('application_count',) + tuple(f'{status}_count' for status in STATUSES)
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the columns
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('job_postings')}
+    with op.batch_alter_table('job_postings', schema=None) as batch_op:
+        for counter in COUNTERS:
+            if counter not in existing:
+                batch_op.add_column(sa.Column(counter, sa.Integer(), server_default='0', nullable=False))
+
+    recounts = ["application_count = (SELECT count(*) FROM applications WHERE applications.job_id = job_postings.id)"]
+    for status in STATUSES:
+        recounts.append(
+            f"{status}_count = (SELECT count(*) FROM applications "
+            f"WHERE applications.job_id = job_postings.id AND applications.status = '{status}')"
+        )
+    op.execute(f"UPDATE job_postings SET {', '.join(recounts)}")
+
+
+def downgrade():
+    with op.batch_alter_table('job_postings', schema=None) as batch_op:
+        for counter in reversed(COUNTERS):
+            batch_op.drop_column(counter)
@@ -0,0 +1,35 @@
+"""Server-side user_sessions store
+
+Revision ID: e4a7c2f9d1b6
+Revises: d9e3f6a2b84c
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2f9d1b6'
+down_revision = 'd9e3f6a2b84c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the table
+    if 'user_sessions' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'user_sessions',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_sessions_expires_at', 'user_sessions', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_sessions_expires_at', table_name='user_sessions')
+    op.drop_table('user_sessions')
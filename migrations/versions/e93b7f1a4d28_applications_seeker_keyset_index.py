@@ -0,0 +1,28 @@
+"""Composite index for keyset pagination of a seeker's applications
+
+Revision ID: e93b7f1a4d28
+Revises: d1a8f3c52e67
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93b7f1a4d28'
+down_revision = 'd1a8f3c52e67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the index
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('applications')}
+    if 'ix_applications_seeker_date_id' not in existing:
+        op.create_index('ix_applications_seeker_date_id', 'applications',
+                        ['seeker_id', 'application_date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_applications_seeker_date_id', table_name='applications')
@@ -0,0 +1,35 @@
+"""last_seen on users
+
+Adds the users.last_seen column written behind by the presence tracker,
+indexed for the daily and monthly active user figures.
+
+Revision ID: f5c2d8e1b934
+Revises: e93b7f1a4d28
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c2d8e1b934'
+down_revision = 'e93b7f1a4d28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by db.create_all() may already have the column
+    inspector = sa.inspect(op.get_bind())
+    if 'last_seen' not in {column['name'] for column in inspector.get_columns('users')}:
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('last_seen', sa.DateTime(), nullable=True))
+    if 'ix_users_last_seen' not in {index['name'] for index in inspector.get_indexes('users')}:
+        op.create_index('ix_users_last_seen', 'users', ['last_seen'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_last_seen', table_name='users')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('last_seen')
@@ -16,6 +16,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Search functionality
     initializeSearch();
     
+    // Typeahead suggestions
+    initializeAutocomplete();
+    
+    // Job details and application forms loaded on demand
+    initializeJobFragments();
+    
     // Auto-hide alerts
     initializeAlerts();
     
@@ -217,6 +223,139 @@ function initializeSearch() {
     }
 }
 
+// Typeahead suggestions for inputs with a data-autocomplete-url
+function initializeAutocomplete() {
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(function(input) {
+        const datalist = document.createElement('datalist');
+        datalist.id = input.id + 'Suggestions';
+        input.after(datalist);
+        input.setAttribute('list', datalist.id);
+        
+        const cache = {};
+        let controller = null;
+        
+        function render(suggestions) {
+            datalist.innerHTML = '';
+            suggestions.forEach(suggestion => {
+                const option = document.createElement('option');
+                option.value = suggestion.text;
+                option.label = suggestion.type + ' (' + suggestion.count + ')';
+                datalist.appendChild(option);
+            });
+        }
+        
+        input.addEventListener('input', function() {
+            const prefix = this.value.trim().toLowerCase();
+            if (!prefix) {
+                render([]);
+                return;
+            }
+            if (cache[prefix]) {
+                render(cache[prefix]);
+                return;
+            }
+            
+            // Only the latest keystroke matters
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            
+            const url = new URL(input.dataset.autocompleteUrl, window.location.origin);
+            url.searchParams.set('q', prefix);
+            fetch(url, { signal: controller.signal })
+                .then(response => response.json())
+                .then(data => {
+                    cache[prefix] = data.suggestions;
+                    render(data.suggestions);
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Autocomplete error:', error);
+                    }
+                });
+        });
+    });
+}
+
+// Fill the shared job modals with fragments fetched when they are opened
+function initializeJobFragments() {
+    const cache = {};
+    
+    document.querySelectorAll('.modal[data-job-fragment]').forEach(function(modal) {
+        const container = modal.querySelector('.job-fragment');
+        const placeholder = container.innerHTML;
+        const applyButton = modal.querySelector('[data-apply-button]');
+        
+        modal.addEventListener('show.bs.modal', function(event) {
+            const trigger = event.relatedTarget;
+            const url = trigger && trigger.dataset.fragmentUrl;
+            if (!url) {
+                return;
+            }
+            if (applyButton) {
+                applyButton.dataset.fragmentUrl = trigger.dataset.applyUrl || '';
+                applyButton.classList.toggle('d-none', !trigger.dataset.applyUrl);
+            }
+            
+            modal.dataset.fragmentUrl = url;
+            container.innerHTML = placeholder;
+            if (!cache[url]) {
+                cache[url] = fetch(url, { credentials: 'same-origin' }).then(response => {
+                    if (!response.ok) {
+                        throw new Error('HTTP ' + response.status);
+                    }
+                    return response.text();
+                });
+            }
+            cache[url]
+                .then(html => {
+                    // Another job may have been opened while this one loaded
+                    if (modal.dataset.fragmentUrl === url) {
+                        container.innerHTML = html;
+                        initializeApplicationForms(container);
+                    }
+                })
+                .catch(error => {
+                    delete cache[url];
+                    console.error('Job fragment error:', error);
+                    if (modal.dataset.fragmentUrl === url) {
+                        container.innerHTML = '<div class="modal-body"><div class="alert alert-danger mb-0">' +
+                            'This job could not be loaded. Please try again.</div></div>';
+                    }
+                });
+        });
+    });
+}
+
+// Client-side checks for application forms
+function initializeApplicationForms(root) {
+    const today = new Date().toISOString().split('T')[0];
+    root.querySelectorAll('[name="availability_date"]').forEach(input => {
+        input.min = today;
+    });
+    
+    root.querySelectorAll('[name="resume"]').forEach(input => {
+        input.addEventListener('change', function() {
+            if (this.files[0] && this.files[0].size > 5 * 1024 * 1024) { // 5MB
+                alert('Resume file size must be less than 5MB.');
+                this.value = '';
+            }
+        });
+    });
+    
+    root.querySelectorAll('form[data-portfolio-required]').forEach(form => {
+        form.addEventListener('submit', function(e) {
+            const links = ['portfolio_url', 'linkedin_url', 'github_url']
+                .map(name => this.querySelector('[name="' + name + '"]')?.value);
+            if (!links.some(Boolean)) {
+                e.preventDefault();
+                alert('Please provide at least one professional link (Portfolio, LinkedIn, or GitHub).');
+            }
+        });
+    });
+}
+
 // Auto-hide alerts with animation
 function initializeAlerts() {
     const alerts = document.querySelectorAll('.alert');
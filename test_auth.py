@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+import time
+
+import pytest
+
+
+def make_user(app, username, role='seeker'):
+    from app.models import db, User
+
+    with app.app_context():
+        user = User(username=username, email=f'{username}@test.com', password='password123', role=role)
+        db.session.add(user)
+        db.session.commit()
+
+
+def test_current_user_is_loaded_once_per_request(client, app, count_queries):
+    make_user(app, 'identityseeker')
+    client.post('/login', data={'email': 'identityseeker@test.com', 'password': 'password123'})
+
+    # Navigation and listings only need the session snapshot
+    with count_queries('users') as statements:
+        html = client.get('/jobs').get_data(as_text=True)
+    assert 'identityseeker' in html
+    assert statements == []
+
+    # Pages that need the row load it a single time
+    with count_queries('users') as statements:
+        assert client.get('/profile').status_code == 200
+    assert len(statements) == 1
+
+
+def test_identity_snapshot_follows_the_user_row(client, app):
+    from flask import session
+    from app.identity import current_identity, load_current_user
+    from app.models import db, User
+
+    make_user(app, 'snapshotuser')
+    with app.test_request_context():
+        user = User.query.filter_by(username='snapshotuser').first()
+        session['user_id'] = user.id
+        session['user_role'] = 'employer'
+
+        # Old sessions without a complete snapshot are filled from the row
+        identity = current_identity()
+        assert identity.username == 'snapshotuser' and identity.role == 'seeker'
+        assert load_current_user() is user
+
+        session.clear()
+        assert current_identity() is None and load_current_user() is None
+
+
+def test_presence_counts_come_from_last_seen_written_behind(client, app, count_queries):
+    from datetime import datetime, timedelta
+    from app.presence import get_presence
+    from app.models import db, User
+
+    make_user(app, 'presenceuser')
+    make_user(app, 'otherworker')
+    client.post('/login', data={'email': 'presenceuser@test.com', 'password': 'password123'})
+    client.get('/jobs')
+
+    with app.app_context():
+        tracker = get_presence()
+        user = User.query.filter_by(username='presenceuser').first()
+        user_id, updated_at = user.id, user.updated_at
+
+        # Sightings are buffered until a flush writes them in one batch
+        assert user.last_seen is None
+        assert tracker.flush() == 1
+        db.session.expire_all()
+        user = db.session.get(User, user_id)
+        assert user.last_seen is not None
+        assert user.updated_at == updated_at
+
+        # A user another worker flushed is counted too, in one query
+        other = User.query.filter_by(username='otherworker').first()
+        other.last_seen = datetime.utcnow() - timedelta(hours=3)
+        db.session.commit()
+        with count_queries('users') as statements:
+            counts = tracker.counts()
+        assert len(statements) == 1
+        assert counts == {'active_sessions': 1, 'daily_active_users': 2, 'monthly_active_users': 2}
+
+        # Sliding windows: out of the session window after 15 minutes, still a monthly active
+        later = tracker.counts(now=datetime.utcnow() + timedelta(days=2))
+        assert later == {'active_sessions': 0, 'daily_active_users': 0, 'monthly_active_users': 2}
+
+
+def test_activity_is_logged_in_batches_and_pruned_by_age(client, app, count_queries, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.activity import get_activity_log, get_recent_activity
+    from app.models import db, ActivityEvent
+
+    client.post('/register', data={'username': 'activityuser', 'email': 'activityuser@test.com',
+                                   'password': 'password123', 'confirm_password': 'password123', 'role': 'seeker',
+                                   'terms': 'on'})
+
+    with app.app_context():
+        # Queued in process until a batch is due or the feed is read
+        assert ActivityEvent.query.filter_by(actor_name='activityuser').count() == 0
+        with count_queries('activity_events') as statements:
+            events = get_recent_activity(limit=5)
+        assert (events[0].action, events[0].actor_name) == ('New User', 'activityuser')
+        assert len(statements) == 1
+
+        log = get_activity_log()
+        log.record('admin', 'Old Event', occurred_at=datetime.utcnow() - timedelta(days=log.retention_days + 1))
+        log.flush()
+        assert log.prune() == 1
+        assert ActivityEvent.query.filter_by(action='Old Event').count() == 0
+
+        # Request teardown prunes one bounded batch at a time
+        monkeypatch.setattr('app.activity.PRUNE_BATCH_SIZE', 2)
+        for _ in range(3):
+            log.record('admin', 'Old Event', occurred_at=datetime.utcnow() - timedelta(days=log.retention_days + 1))
+        log.flush()
+        assert log.prune(max_batches=1) == 2 and log.prune_due()
+        assert log.prune(max_batches=1) == 1 and not log.prune_due()
+        assert ActivityEvent.query.filter_by(actor_name='activityuser').count() == 1
+
+
+def test_manage_users_grid_pages_sorts_and_searches_by_prefix(client, app, count_queries):
+    from app.models import db, User
+    from app.user_grid import user_grid_window
+
+    with app.app_context():
+        db.session.add_all([
+            User(username=f'grid{i:02d}', email=f'grid{i:02d}@test.com', password='password123',
+                 role='employer' if i % 3 == 0 else 'seeker')
+            for i in range(30)
+        ])
+        db.session.add(User(username='other', email='Grid.Mail@test.com', password='password123'))
+        db.session.commit()
+
+        # Username order, forward through every page and back again
+        filters = {'q': None, 'role': None, 'sort': 'username'}
+        first = user_grid_window(filters, per_page=12)
+        second = user_grid_window(filters, cursor=first.next_cursor, page=2, per_page=12)
+        assert [row.username for row in first.items][:2] == ['admin', 'grid00']
+        assert second.items[0].username == 'grid11'
+        assert first.total == 32
+        back = user_grid_window(filters, cursor=second.prev_cursor, page=1, per_page=12)
+        assert [row.id for row in back.items] == [row.id for row in first.items]
+
+        # Prefix search over username and email, case-insensitively, with a role filter
+        matches = user_grid_window({'q': 'grid.', 'role': None, 'sort': 'newest'})
+        assert [row.username for row in matches.items] == ['other']
+        employers = user_grid_window({'q': 'grid1', 'role': 'employer', 'sort': 'oldest'})
+        assert [row.username for row in employers.items] == ['grid12', 'grid15', 'grid18']
+
+    client.post('/login', data={'email': 'admin@findjob.com', 'password': 'admin123'})
+    with count_queries('users') as statements:
+        html = client.get('/admin/manage_users?q=grid2&sort=username').get_data(as_text=True)
+    assert 'grid29' in html and 'grid19' not in html
+    # The admin's own row plus the grid window
+    assert len(statements) == 2
+
+
+def test_admin_exports_stream_filtered_rows(client, app):
+    import csv
+    import gzip
+    import io
+    import json
+    from app.models import db, User, JobPosting, Application
+    from app.exports import applications_export, parse_export_args, stream_export
+    from werkzeug.datastructures import MultiDict
+
+    with app.app_context():
+        employer = User(username='exportemployer', email='exportemployer@test.com', password='password123',
+                        role='employer')
+        seekers = [User(username=f'export{i}', email=f'export{i}@test.com', password='password123')
+                   for i in range(5)]
+        db.session.add_all([employer] + seekers)
+        db.session.flush()
+        job = JobPosting(title='Exported role', description='x', company_name='Acme', location='Lagos',
+                         employer_id=employer.id, is_active=True)
+        db.session.add(job)
+        db.session.flush()
+        db.session.add_all([Application(job_id=job.id, seeker_id=seeker.id, full_name=seeker.username,
+                                        email=seeker.email, status='accepted' if i % 2 else 'pending')
+                            for i, seeker in enumerate(seekers)])
+        db.session.commit()
+        employer_id = employer.id
+
+        # Chunks are encoded as they are read
+        args = MultiDict({'status': 'pending'})
+        chunks = list(stream_export(applications_export(args, parse_export_args(args)), 'ndjson', chunk_rows=2))
+        assert len(chunks) == 2
+        rows = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        assert [row['full_name'] for row in rows] == ['export0', 'export2', 'export4']
+        assert rows[0]['job_title'] == 'Exported role'
+
+    assert client.get('/admin/export/users').status_code == 302
+
+    client.post('/login', data={'email': 'admin@findjob.com', 'password': 'admin123'})
+    response = client.get('/admin/export/users?format=csv&q=export&role=seeker')
+    assert response.mimetype == 'text/csv' and 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['username'] for row in rows] == [f'export{i}' for i in range(5)]
+    assert 'password' not in rows[0]
+
+    response = client.get('/admin/export/applications?format=csv&gzip=1&status=accepted')
+    assert response.mimetype == 'application/gzip'
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.get_data()).decode())))
+    assert [row['full_name'] for row in rows] == ['export1', 'export3']
+
+    # Job exports follow the listing's search, and would-be formulas are quoted
+    with app.app_context():
+        from app.search import index_job
+        formula = JobPosting(title='=HYPERLINK("http://evil")', description='x', company_name='-Acme',
+                             location='Lagos', employer_id=employer_id, is_active=True)
+        db.session.add(formula)
+        db.session.commit()
+        for posting in JobPosting.query.all():
+            index_job(posting)
+    response = client.get('/admin/export/jobs?format=csv&search=Exported')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['title'] for row in rows] == ['Exported role']
+    response = client.get('/admin/export/jobs?format=csv&search=HYPERLINK')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(row['title'], row['company_name']) for row in rows] == [("'=HYPERLINK(\"http://evil\")", "'-Acme")]
+
+    assert client.get('/admin/export/passwords').status_code == 404
+
+
+def test_admin_bulk_deactivates_matching_users(client, app):
+    from app.models import db, User
+
+    for i in range(4):
+        make_user(app, f'spammer{i}', role='employer')
+    make_user(app, 'spamhunter', role='seeker')
+
+    client.post('/login', data={'email': 'admin@findjob.com', 'password': 'admin123'})
+    response = client.post('/admin/bulk/users', data={'action': 'deactivate', 'scope': 'matching',
+                                                      'q': 'spam', 'role': 'employer'})
+    assert response.status_code == 302
+    assert '4 users deactivated.' in client.get(response.headers['Location']).get_data(as_text=True)
+
+    # The acting admin is never part of the selection
+    with app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+    response = client.post('/admin/bulk/users', headers={'Accept': 'application/json'},
+                           data={'action': 'deactivate', 'ids': [admin_id]})
+    assert response.get_json()['users'] == 0
+
+    with app.app_context():
+        active = {user.username: user.is_active for user in User.query.filter(User.username.like('spam%'))}
+    assert active == {'spammer0': False, 'spammer1': False, 'spammer2': False, 'spammer3': False, 'spamhunter': True}
+
+
+def test_password_pool_rehashes_outdated_hashes_on_login(client, app):
+    from werkzeug.security import generate_password_hash
+    from app.models import db, User
+    from app.passwords import PasswordHasher, PasswordHashingBusy
+
+    # Hashes run in a separate process and are timed
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, max_pending=1)
+    try:
+        stored = hasher.hash('secret')
+        assert stored.startswith('pbkdf2:sha256:1000$') and hasher.verify(stored, 'secret')
+        assert hasher.stats()['hashed'] == 1 and hasher.stats()['verified'] == 1
+        assert hasher.stats()['p95_ms'] is not None
+
+        # A hash the caller stopped waiting for keeps its slot until the pool finishes it
+        hasher.timeout = 0.1
+        with pytest.raises(TimeoutError):
+            hasher._run('hashed', time.sleep, 1)
+        assert hasher.stats()['pending'] == 1
+        with pytest.raises(PasswordHashingBusy):
+            hasher.hash('secret')
+        deadline = time.monotonic() + 10
+        while hasher.stats()['pending'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        hasher.timeout = 10
+        assert hasher.verify(stored, 'secret')
+    finally:
+        hasher.shutdown()
+
+    # Callers past the queue limit are turned away instead of waiting
+    hasher._slots.acquire()
+    try:
+        raised = False
+        try:
+            hasher.hash('secret')
+        except PasswordHashingBusy:
+            raised = True
+        assert raised and hasher.stats()['rejected'] == 2
+    finally:
+        hasher._slots.release()
+
+    with app.app_context():
+        user = User(username='legacyhash', email='legacyhash@test.com', password='x')
+        user.password = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+        db.session.add(user)
+        db.session.commit()
+
+    client.post('/login', data={'email': 'legacyhash@test.com', 'password': 'password123'})
+    with app.app_context():
+        rehashed = User.query.filter_by(username='legacyhash').one().password
+        assert rehashed.startswith('scrypt:') and app.extensions['password_hasher'].stats()['rehashed'] == 1
+    assert client.get('/health').get_json()['password_hashing']['method'].startswith('scrypt:')
+
+
+def test_password_reset_tokens_are_signed_and_single_use(client, app, count_queries, tmp_path):
+    import re
+    from email import message_from_bytes, policy
+    from app.models import User
+    from app.outbox import get_outbox
+
+    make_user(app, 'forgetful')
+
+    # Issuing the token writes nothing to users; the email is only queued
+    with count_queries() as statements:
+        client.post('/forgot_password', data={'email': 'forgetful@test.com'})
+    assert not [s for s in statements if s.startswith('UPDATE users')]
+
+    with app.app_context():
+        assert get_outbox().deliver_due() == 1
+    sent = next((tmp_path / 'outbox').glob('*-password_reset.eml')).read_bytes()
+    body = message_from_bytes(sent, policy=policy.default).get_content()
+    token = re.search(r'/reset_password/(\S+)', body).group(1)
+
+    # Tampered tokens are rejected
+    assert client.get(f'/reset_password/{token[:-2]}xx').status_code == 302
+    assert client.get(f'/reset_password/{token}').status_code == 200
+
+    new_password = {'password': 'newsecret1', 'confirm_password': 'newsecret1'}
+    client.post(f'/reset_password/{token}', data=new_password)
+    with app.app_context():
+        user = User.query.filter_by(username='forgetful').one()
+        assert user.check_password('newsecret1')
+        # The password change spends the token, and stale ones expire
+        assert User.verify_reset_token(token) is None
+        fresh = user.generate_reset_token()
+        assert User.verify_reset_token(fresh).id == user.id
+        app.config['RESET_TOKEN_MAX_AGE'] = -1
+        assert User.verify_reset_token(fresh) is None
+
+
+@pytest.fixture
+def sql_sessions(monkeypatch):
+    monkeypatch.setenv('SESSION_TYPE', 'sqlalchemy')
+
+
+def test_server_side_sessions_write_lazily_and_expire(sql_sessions, client, app, count_queries):
+    from datetime import datetime, timedelta
+    from app.models import db, ServerSession
+    from app.sessions import get_session_interface
+
+    make_user(app, 'sessionseeker')
+
+    # Before login the session is written once; login moves it to a new id
+    client.post('/forgot_password', data={'email': 'nobody@test.com'})
+    anonymous = client.get_cookie('session').value
+    client.post('/login', data={'email': 'sessionseeker@test.com', 'password': 'password123'})
+    cookie = client.get_cookie('session').value
+    assert cookie != anonymous and '.' in cookie and 'sessionseeker' not in cookie
+    with app.app_context():
+        assert ServerSession.query.count() == 1
+
+    # Pages that don't change the session only read it
+    client.get('/jobs')
+    with count_queries('user_sessions') as reads, count_queries() as statements:
+        assert 'sessionseeker' in client.get('/jobs').get_data(as_text=True)
+    assert len(reads) == 1
+    assert not [s for s in statements if 'user_sessions' in s and not s.startswith('SELECT')]
+
+    # Logging out deletes the logged-in session
+    client.get('/logout')
+    with app.app_context():
+        assert ServerSession.query.count() == 1  # the goodbye flash message
+        interface = get_session_interface()
+        assert interface.sweep(datetime.utcnow() + timedelta(days=31)) == 1
+        assert ServerSession.query.count() == 0
+        stats = interface.stats()
+    assert stats['type'] == 'sqlalchemy' and stats['sessions'] == 0 and stats['deleted'] == 2
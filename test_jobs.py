@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+
+from datetime import datetime, timedelta
+
+from werkzeug.datastructures import MultiDict
+
+
+def add_jobs(db, employer_id, specs, now):
+    from app.models import JobPosting
+
+    jobs = []
+    for title, job_type, location, days_ago in specs:
+        jobs.append(JobPosting(title=title, description=f'{title} role', company_name='Acme',
+                               location=location, job_type=job_type, employer_id=employer_id,
+                               posted_date=now - timedelta(days=days_ago, hours=1), is_active=True))
+    db.session.add_all(jobs)
+    db.session.commit()
+    return jobs
+
+
+def make_employer(db, name='listingemployer'):
+    from app.models import User
+
+    employer = User(username=name, email=f'{name}@test.com', password='password123', role='employer')
+    db.session.add(employer)
+    db.session.commit()
+    return employer
+
+
+def test_facet_counts_apply_other_selections(app):
+    from app.models import db, JobPosting
+    from app.facets import facet_counts, parse_facet_filters
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db)
+        add_jobs(db, employer.id, [
+            ('Developer', 'full-time', 'Lagos', 0),
+            ('Designer', 'full-time', 'Abuja', 3),
+            ('Tester', 'contract', 'Lagos', 10),
+            ('Writer', 'contract', 'Lagos', 60),
+        ], now)
+        active = [JobPosting.is_active == True]
+
+        facets = facet_counts(active, parse_facet_filters(MultiDict()), now=now)
+        assert facets['total'] == 4
+        assert facets['job_type'] == [('contract', 2), ('full-time', 2)]
+        assert facets['location'] == [('Lagos', 3), ('Abuja', 1)]
+        assert facets['posted_within'] == [(1, 1), (7, 2), (30, 3)]
+
+        # A facet's own selection does not narrow its counts, the others do
+        filters = parse_facet_filters(MultiDict({'location': 'lagos', 'posted_within': '30'}))
+        facets = facet_counts(active, filters, now=now)
+        assert facets['total'] == 2
+        assert facets['job_type'] == [('contract', 1), ('full-time', 1)]
+        assert facets['location'] == [('Lagos', 2), ('Abuja', 1)]
+        assert facets['posted_within'] == [(1, 1), (7, 1), (30, 2)]
+
+
+def test_jobs_page_filters_by_facets(client, app):
+    from app.models import db
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db)
+        add_jobs(db, employer.id, [
+            ('Platform Developer', 'full-time', 'Lagos', 0),
+            ('Contract Tester', 'contract', 'Abuja', 2),
+        ], now)
+
+    html = client.get('/jobs?job_type=contract').get_data(as_text=True)
+    assert 'Contract Tester' in html
+    assert 'Platform Developer' not in html
+    assert '1 matching job(s)' in html
+
+
+def test_keyset_window_pages_forward_and_back(app):
+    from app.models import db, JobPosting
+    from app.pagination import keyset_window
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db)
+        # Pairs of jobs share a posted date so the id has to break ties
+        jobs = add_jobs(db, employer.id, [(f'Job {i}', 'full-time', 'Lagos', i // 2) for i in range(7)], now)
+        expected = sorted(jobs, key=lambda job: (job.posted_date, job.id), reverse=True)
+
+        def window(cursor=None, page=1):
+            return keyset_window(JobPosting.query.filter(JobPosting.is_active == True),
+                                 (JobPosting.posted_date, JobPosting.id), 3,
+                                 cursor=cursor, page=page, total=len(jobs),
+                                 parsers=(datetime.fromisoformat, int))
+
+        first = window()
+        assert first.items == expected[:3] and not first.has_prev
+        second = window(first.next_cursor, page=2)
+        third = window(second.next_cursor, page=3)
+        assert second.items == expected[3:6] and third.items == expected[6:]
+        assert not third.has_next and third.pages == 3
+
+        back = window(third.prev_cursor, page=2)
+        assert back.items == second.items and back.has_next
+        start = window(back.prev_cursor, page=1)
+        assert start.items == first.items and not start.has_prev
+
+        # A tampered cursor starts over from the first page
+        assert window('not-a-cursor', page=4).items == first.items
+
+
+def test_jobs_page_loads_job_details_on_demand(client, app):
+    from app.models import db, User, JobPosting
+    from app.fragments import get_fragment_cache
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db)
+        job = add_jobs(db, employer.id, [('Platform Developer', 'full-time', 'Lagos', 0)], now)[0]
+        job.description = 'Platform work. ' * 20 + 'Full description of the platform role'
+        seeker = User(username='fragmentseeker', email='fragmentseeker@test.com',
+                      password='password123', role='seeker')
+        db.session.add(seeker)
+        db.session.commit()
+        job_id = job.id
+
+    # The listing links to the fragment instead of embedding the modal
+    html = client.get('/jobs').get_data(as_text=True)
+    assert f'/jobs/{job_id}/detail' in html
+    assert 'Full description of the platform role' not in html
+
+    response = client.get(f'/jobs/{job_id}/detail')
+    assert response.status_code == 200
+    assert 'Full description of the platform role' in response.get_data(as_text=True)
+    assert 'public' in response.headers['Cache-Control']
+    assert client.get(f'/jobs/{job_id}/detail', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/jobs/9999/detail').status_code == 404
+
+    # A job deactivated behind this worker's cache is not served from it
+    with app.app_context():
+        db.session.execute(db.update(JobPosting).where(JobPosting.id == job_id).values(is_active=False))
+        db.session.commit()
+    assert client.get(f'/jobs/{job_id}/detail').status_code == 404
+    with app.app_context():
+        db.session.execute(db.update(JobPosting).where(JobPosting.id == job_id).values(is_active=True))
+        db.session.commit()
+        # and edits made elsewhere show up once entries expire
+        cache = get_fragment_cache()
+        cache.set(job_id, 'stale', now=0)
+        assert cache.get(job_id, now=cache.ttl_seconds - 1) == 'stale'
+        assert cache.get(job_id, now=cache.ttl_seconds) is None
+
+    assert client.get(f'/jobs/{job_id}/apply_form').status_code == 403
+    client.post('/login', data={'email': 'fragmentseeker@test.com', 'password': 'password123'})
+    form = client.get(f'/jobs/{job_id}/apply_form')
+    assert form.status_code == 200
+    assert 'fragmentseeker@test.com' in form.get_data(as_text=True)
+
+
+def test_application_counters_follow_writes_and_reconcile(client, app):
+    from app.models import db, User, JobPosting, Application
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db, 'counteremployer')
+        job_id = add_jobs(db, employer.id, [('Counted Role', 'full-time', 'Lagos', 0)], now)[0].id
+        seeker = User(username='counterseeker', email='counterseeker@test.com',
+                      password='password123', role='seeker')
+        db.session.add(seeker)
+        db.session.commit()
+
+    client.post('/login', data={'email': 'counterseeker@test.com', 'password': 'password123'})
+    client.post(f'/submit_application/{job_id}', data={'full_name': 'Counter Seeker',
+                                                        'email': 'counterseeker@test.com'})
+    client.get('/logout')
+
+    with app.app_context():
+        job = db.session.get(JobPosting, job_id)
+        assert (job.application_count, job.pending_count) == (1, 1)
+        application_id = Application.query.filter_by(job_id=job_id).one().id
+
+    client.post('/login', data={'email': 'counteremployer@test.com', 'password': 'password123'})
+    client.post(f'/update_application_status/{application_id}', data={'status': 'accepted'})
+
+    with app.app_context():
+        job = db.session.get(JobPosting, job_id)
+        assert (job.application_count, job.pending_count, job.accepted_count) == (1, 0, 1)
+
+        # Counters knocked out of step are rebuilt from the applications table
+        job.application_count = 7
+        db.session.commit()
+        assert JobPosting.reconcile_application_counts() == 1
+        assert JobPosting.reconcile_application_counts() == 0
+        assert db.session.get(JobPosting, job_id).application_count == 1
+
+    result = app.test_cli_runner().invoke(args=['reconcile-application-counts'])
+    assert '0 job(s) were out of step' in result.output
+
+
+def test_employer_dashboard_query_budget(client, app, count_queries):
+    from app.models import db, User, Application
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db, 'budgetemployer')
+        employer_id = employer.id
+
+    def add_applicants(start, count):
+        with app.app_context():
+            jobs = add_jobs(db, employer_id, [(f'Role {i}', 'full-time', 'Lagos', 0)
+                                              for i in range(start, start + count)], now)
+            for i, job in enumerate(jobs, start):
+                seeker = User(username=f'budgetseeker{i}', email=f'budgetseeker{i}@test.com',
+                              password='password123', role='seeker')
+                db.session.add(seeker)
+                db.session.flush()
+                db.session.add(Application(job_id=job.id, seeker_id=seeker.id, full_name=seeker.username,
+                                           email=seeker.email, status='pending'))
+            db.session.commit()
+
+    client.post('/login', data={'email': 'budgetemployer@test.com', 'password': 'password123'})
+
+    add_applicants(0, 2)
+    with count_queries() as few:
+        assert client.get('/employer_dashboard').status_code == 200
+
+    add_applicants(2, 12)
+    with count_queries() as many:
+        html = client.get('/employer_dashboard').get_data(as_text=True)
+    assert 'budgetseeker13' in html
+
+    # User, posted jobs and recent applications, whatever the data size
+    assert len(few) == len(many) <= 3
+
+
+def test_seeker_dashboard_counts_by_status_and_pages_applications(client, app, count_queries):
+    from app.models import db, User, Application
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db, 'seekerpageemployer')
+        jobs = add_jobs(db, employer.id, [(f'Role {i}', 'full-time', 'Lagos', 0) for i in range(23)], now)
+        seeker = User(username='pagedseeker', email='pagedseeker@test.com', password='password123', role='seeker')
+        db.session.add(seeker)
+        db.session.flush()
+        statuses = ['pending', 'reviewed', 'accepted', 'rejected']
+        for i, job in enumerate(jobs):
+            db.session.add(Application(job_id=job.id, seeker_id=seeker.id, full_name='Paged', email=seeker.email,
+                                       status=statuses[i % 4], cover_letter=f'Letter {i}',
+                                       application_date=now - timedelta(minutes=i)))
+        db.session.commit()
+
+        counts = seeker.get_application_status_counts()
+        assert counts == {'pending': 6, 'reviewed': 6, 'accepted': 6, 'rejected': 5, 'total': 23}
+
+        first = seeker.get_applied_jobs(per_page=20)
+        second = seeker.get_applied_jobs(per_page=20, cursor=first.next_cursor, page=2)
+        assert [a['job_title'] for a in first.items][:2] == ['Role 0', 'Role 1']
+        assert [a['job_title'] for a in second.items] == ['Role 20', 'Role 21', 'Role 22']
+        assert 'cover_letter' not in first.items[0]
+        application_id = first.items[0]['application_id']
+
+    client.post('/login', data={'email': 'pagedseeker@test.com', 'password': 'password123'})
+    with count_queries() as statements:
+        html = client.get('/seeker_dashboard').get_data(as_text=True)
+    assert 'Letter 0' not in html and 'Page 1 of 2' in html
+    # User, status counts and one page of applications
+    assert len(statements) == 3
+
+    detail = client.get(f'/applications/{application_id}/detail').get_data(as_text=True)
+    assert 'Letter 0' in detail
+
+
+def test_admin_job_listing_pages_projected_rows(client, app, count_queries):
+    from app.models import db, JobPosting, ADMIN_DESCRIPTION_PREVIEW
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db, 'adminlistemployer')
+        jobs = add_jobs(db, employer.id, [(f'Listed {i:02d}', 'full-time', 'Lagos', i) for i in range(30)], now)
+        jobs[0].description = 'a' * ADMIN_DESCRIPTION_PREVIEW + 'TAIL'
+        db.session.commit()
+
+        first = JobPosting.get_admin_page([], per_page=25)
+        assert first.total is None and len(first.items) == 25
+        newest = first.items[0]
+        assert newest.title == 'Listed 00' and newest.employer_username == 'adminlistemployer'
+        assert len(newest.description) == ADMIN_DESCRIPTION_PREVIEW and newest.description_truncated
+        assert not first.items[1].description_truncated
+
+    client.post('/login', data={'email': 'admin@findjob.com', 'password': 'admin123'})
+    with count_queries() as statements:
+        html = client.get('/admin/manage_jobs').get_data(as_text=True)
+    assert 'Listed 24' in html and 'Listed 25' not in html and 'TAIL' not in html
+    # Facet counts and one page of jobs
+    assert len(statements) == 2
+
+    second = client.get(f'/admin/manage_jobs?page=2&cursor={first.next_cursor}').get_data(as_text=True)
+    assert 'Listed 25' in second and 'Listed 29' in second and 'Listed 24' not in second
+
+
+def test_admin_bulk_job_actions_are_set_based(client, app, count_queries):
+    from app.models import db, User, JobPosting, Application
+    from app.reporting import current_counts
+    from app.search import index_job
+
+    now = datetime.utcnow()
+    with app.app_context():
+        employer = make_employer(db, 'bulkemployer')
+        jobs = add_jobs(db, employer.id, [(f'Bulkrole {i}', 'full-time', 'Lagos', i * 10) for i in range(6)], now)
+        seeker = User(username='bulkseeker', email='bulkseeker@test.com', password='password123')
+        db.session.add(seeker)
+        db.session.flush()
+        db.session.add_all([Application(job_id=job.id, seeker_id=seeker.id, full_name='Bulk', email=seeker.email)
+                            for job in jobs[:3]])
+        db.session.commit()
+        for job in jobs:
+            index_job(job)
+        ids = [job.id for job in jobs]
+        seeker_id = seeker.id
+        before = current_counts('jobs')
+        assert len(JobPosting.search_jobs('bulkrole')) == 6
+
+    client.post('/login', data={'email': 'admin@findjob.com', 'password': 'admin123'})
+    headers = {'Accept': 'application/json'}
+
+    # Two ticked jobs in one UPDATE
+    with count_queries() as statements:
+        response = client.post('/admin/bulk/jobs', headers=headers,
+                               data={'action': 'deactivate', 'ids': f'{ids[0]},{ids[1]}'})
+    assert response.get_json()['jobs'] == 2
+    assert len([s for s in statements if s.startswith('UPDATE job_postings')]) == 1
+
+    # Every matching job posted more than 25 days ago
+    response = client.post('/admin/bulk/jobs', headers=headers,
+                           data={'action': 'expire', 'scope': 'matching', 'search': 'bulkrole', 'older_than_days': 25})
+    assert response.get_json()['jobs'] == 3
+
+    # Deleting takes the applications with the jobs
+    response = client.post('/admin/bulk/jobs', headers=headers, data={'action': 'delete', 'ids': ids[:3]})
+    assert response.get_json() == {'success': True, 'message': '3 jobs and 3 applications deleted.',
+                                   'jobs': 3, 'applications': 3}
+
+    # Refusing to act on an unfiltered listing
+    assert client.post('/admin/bulk/jobs', headers=headers, data={'action': 'delete', 'scope': 'matching'}).status_code == 400
+
+    with app.app_context():
+        assert [job.id for job in JobPosting.search_jobs('bulkrole')] == []
+        assert db.session.query(JobPosting).filter(JobPosting.id.in_(ids)).count() == 3
+        assert Application.query.filter_by(seeker_id=seeker_id).count() == 0
+        after = current_counts('jobs')
+        assert after['active'] == before['active'] - 6 and after['inactive'] == before['inactive'] + 3
+        assert current_counts('applications')['pending'] == 0
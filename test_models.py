@@ -2,6 +2,7 @@
 
 import sys
 import os
+import pytest
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app import create_app
@@ -67,5 +68,183 @@ def test_models():
             # Clean up test data
             db.session.rollback()
 
+
+def test_system_overview_is_aggregated_and_cached(client, app, count_queries):
+    from app.stats import get_system_overview
+
+    with app.app_context():
+        employer = User(username='statsemployer', email='statsemployer@test.com', password='password123', role='employer')
+        seeker = User(username='statsseeker', email='statsseeker@test.com', password='password123', role='seeker')
+        db.session.add_all([employer, seeker])
+        db.session.commit()
+        job = JobPosting(title='Stats Job', description='Counting', employer_id=employer.id,
+                         company_name='Stats Co', location='Remote', job_type='full-time')
+        db.session.add(job)
+        db.session.commit()
+        db.session.add(Application(job_id=job.id, seeker_id=seeker.id, full_name='Stats Seeker', email=seeker.email))
+        db.session.commit()
+
+        # One aggregate statement plus the newest users and jobs
+        with count_queries() as statements:
+            overview = User.get_system_overview()
+        assert len(statements) == 3
+        assert overview['total_users'] == 3  # including the default admin
+        assert (overview['seekers_count'], overview['employers_count'], overview['admins_count']) == (1, 1, 1)
+        assert (overview['total_jobs'], overview['jobs_posted_today']) == (1, 1)
+        assert (overview['total_applications'], overview['new_applications_this_month']) == (1, 1)
+        assert overview['recent_jobs'][0].title == 'Stats Job'
+
+    # Pages reuse the snapshot until it expires
+    client.get('/')
+    with count_queries() as statements:
+        assert client.get('/').status_code == 200
+    assert statements == []
+
+    with app.test_request_context():
+        app.extensions['system_stats'].invalidate()
+        db.session.add(User(username='lateuser', email='lateuser@test.com', password='password123'))
+        db.session.commit()
+        assert get_system_overview()['total_users'] == 4
+
+
+def test_report_tables_follow_writes_and_match_backfill(app, count_queries):
+    from app.models import ReportCount, ReportRollup
+    from app.reporting import report_figures, report_leaderboards, record_application_deletes, backfill_reports
+
+    def snapshot():
+        counts = {(row.metric, row.dimension): row.count for row in ReportCount.query if row.count}
+        rollups = {(row.granularity, row.metric, row.period_start, row.dimension): row.count
+                   for row in ReportRollup.query if row.count}
+        return counts, rollups
+
+    with app.app_context():
+        employer = User(username='reportemployer', email='reportemployer@test.com', password='password123', role='employer')
+        seekers = [User(username=f'reportseeker{i}', email=f'reportseeker{i}@test.com', password='password123')
+                   for i in range(3)]
+        db.session.add_all([employer] + seekers)
+        db.session.commit()
+        jobs = [JobPosting(title=f'Report Job {i}', description='Reporting', employer_id=employer.id,
+                           company_name='Report Co', location='Remote', job_type='full-time') for i in range(2)]
+        db.session.add_all(jobs)
+        db.session.commit()
+        for seeker in seekers:
+            db.session.add(Application(job_id=jobs[0].id, seeker_id=seeker.id, full_name=seeker.username, email=seeker.email))
+        db.session.add(Application(job_id=jobs[1].id, seeker_id=seekers[0].id, full_name='Other', email=seekers[0].email))
+        db.session.commit()
+
+        # Updates move rows between dimensions, deletes take them away
+        application = Application.query.filter_by(job_id=jobs[0].id).first()
+        application.status = 'accepted'
+        jobs[1].is_active = False
+        seekers[2].role = 'employer'
+        db.session.commit()
+        applications = Application.query.filter_by(job_id=jobs[1].id)
+        record_application_deletes(applications)
+        applications.delete(synchronize_session=False)
+        db.session.delete(jobs[1])
+        db.session.commit()
+
+        figures = report_figures()
+        assert figures['users'] == {'seeker': 2, 'employer': 2, 'admin': 1}
+        assert (figures['total_jobs'], figures['active_jobs']) == (1, 1)
+        assert figures['applications'] == {'pending': 2, 'reviewed': 0, 'accepted': 1, 'rejected': 0}
+        assert figures['created'][('applications_submitted', 'today')] == 4
+        assert figures['created'][('jobs_posted', 'last_24_hours')] == 2
+
+        # Rebuilding from the raw tables gives the same counts (rollups keep deleted rows)
+        incremental_counts, _ = snapshot()
+        backfill_reports()
+        assert snapshot()[0] == incremental_counts
+
+        # The top lists are grouped once, then reused by the worker
+        boards = report_leaderboards()
+        assert [row['username'] for row in boards['top_employers']] == ['reportemployer']
+        assert boards['top_seekers'][0]['applications_count'] == 1
+        with count_queries() as statements:
+            assert report_leaderboards() == boards
+        assert statements == []
+
+
+def test_outbox_delivers_in_batches_and_retries_with_backoff(app, tmp_path):
+    from datetime import datetime, timedelta
+    from app.models import OutboundEmail
+    from app.outbox import enqueue_email, get_outbox, EmailDeliveryError, EmailTransport
+
+    with app.test_request_context():
+        for i in range(3):
+            enqueue_email('notice', f'person{i}@test.com', f'Notice {i}', f'Body {i}')
+        db.session.commit()
+
+        outbox = get_outbox()
+        outbox.batch_size = 2
+        assert outbox.deliver_due() == 2
+        assert outbox.deliver_due() == 1
+        assert outbox.deliver_due() == 0
+        files = sorted(os.listdir(tmp_path / 'outbox'))
+        assert len(files) == 3 and 'Subject: Notice 0' in (tmp_path / 'outbox' / files[0]).read_text()
+        assert {email.status for email in OutboundEmail.query} == {'sent'}
+
+        class FlakyTransport(EmailTransport):
+            def send(self, email):
+                raise EmailDeliveryError('provider down', permanent=email.recipient.startswith('bad'))
+
+        outbox.transport = FlakyTransport()
+        enqueue_email('notice', 'later@test.com', 'Retry', 'Body')
+        enqueue_email('notice', 'bad@test.com', 'Rejected', 'Body')
+        db.session.commit()
+
+        # A claimed batch is invisible to other workers until its lease lapses
+        claimed = outbox.claim()
+        assert len(claimed) == 2 and outbox.claim() == []
+        lapsed = datetime.utcnow() + timedelta(minutes=5)
+        assert outbox.deliver_due(now=lapsed) == 2
+        # The first claimant has lost those emails, so it won't send them again
+        assert not outbox.renew(claimed[0])
+
+        retry = OutboundEmail.query.filter_by(recipient='later@test.com').one()
+        assert retry.status == 'pending' and retry.attempts == 1 and retry.last_error == 'provider down'
+        assert retry.next_attempt_at > datetime.utcnow() + timedelta(seconds=20)
+        assert OutboundEmail.query.filter_by(recipient='bad@test.com').one().status == 'failed'
+        assert outbox.deliver_due() == 0
+
+
+def test_engine_profiles_tune_connections_and_time_checkouts(client, app, tmp_path):
+    from sqlalchemy import create_engine, exc
+    from config.db_config import DatabaseConfig
+    from app.database import PoolMetrics, TimedQueuePool, engine_options
+
+    # SQLite connections get the profile's pragmas
+    with app.app_context():
+        def pragma(name):
+            return db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+
+        assert pragma('journal_mode') == 'wal' and pragma('synchronous') == 1
+        assert pragma('busy_timeout') == 5000 and pragma('cache_size') == -65536
+
+    pool = client.get('/health').get_json()['database_pool']
+    assert pool['profile'] == 'sqlite' and pool['pool'] == 'TimedQueuePool'
+    assert pool['checkouts'] > 0 and pool['wait_p95_ms'] is not None
+
+    # Postgres gets a sized, pre-pinged, recycled pool and a statement timeout
+    profile = DatabaseConfig.get_engine_profile('postgresql+psycopg2://u:p@db.example.com/postgres')
+    assert profile['engine_options']['pool_pre_ping'] and profile['engine_options']['pool_recycle'] == 300
+    assert profile['engine_options']['connect_args']['options'] == '-c statement_timeout=30000'
+    assert engine_options('sqlite:///:memory:') == {}
+
+    # Callers that give up waiting for a connection are counted
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.05)
+    engine.pool.metrics = metrics = PoolMetrics()
+    held = engine.connect()
+    try:
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    finally:
+        held.close()
+        engine.dispose()
+    assert metrics.stats()['checkouts'] == 1 and metrics.stats()['timeouts'] == 1
+    assert metrics.stats()['wait_max_ms'] >= 50
+
+
 if __name__ == "__main__":
-    test_models()
\ No newline at end of file
+    test_models()
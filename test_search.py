@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.search import InvertedIndexSearchEngine, index_job, tokenize
+
+
+def make_job(job_id, title, days_ago=0, is_active=True, **fields):
+    return SimpleNamespace(
+        id=job_id,
+        title=title,
+        description=fields.get('description', ''),
+        company_name=fields.get('company_name', ''),
+        location=fields.get('location', ''),
+        posted_date=datetime(2024, 1, 31) - timedelta(days=days_ago),
+        is_active=is_active
+    )
+
+
+def test_tokenize():
+    assert tokenize('Senior Python-Developer (Lagos)') == ['senior', 'python', 'developer', 'lagos']
+    assert tokenize(None) == []
+
+
+def test_inverted_index_incremental_updates():
+    engine = InvertedIndexSearchEngine()
+    engine.index_job(make_job(1, 'Python Developer', days_ago=2, location='Lagos'))
+    engine.index_job(make_job(2, 'Java Developer', days_ago=1, company_name='Acme'))
+    engine.index_job(make_job(3, 'Designer', is_active=False))
+
+    # Newest first, every token must match
+    assert engine.search('developer') == [2, 1]
+    assert engine.search('developer LAGOS') == [1]
+    assert engine.search('designer') == []
+    assert engine.search('') == []
+
+    # Editing a job replaces its old tokens
+    engine.index_job(make_job(1, 'Data Analyst', days_ago=2))
+    assert engine.search('python') == []
+    assert engine.search('analyst') == [1]
+
+    # Deactivated and deleted jobs drop out of the index
+    engine.index_job(make_job(2, 'Java Developer', is_active=False))
+    engine.remove_job(1)
+    assert engine.search('developer') == []
+    assert len(engine) == 0
+
+
+def test_search_jobs_uses_index(app):
+    from app.models import db, User, JobPosting
+    from app.search import index_job
+
+    with app.app_context():
+        employer = User(username='searchemployer', email='search@test.com',
+                        password='password123', role='employer')
+        db.session.add(employer)
+        db.session.commit()
+
+        job = JobPosting(title='Backend Engineer', description='Flask and SQL',
+                         company_name='FindJob', location='Remote',
+                         employer_id=employer.id, is_active=True)
+        db.session.add(job)
+        db.session.commit()
+        index_job(job)
+
+        assert JobPosting.search_jobs('flask engineer') == [job]
+        assert JobPosting.search_jobs('django') == []
+
+
+def test_fulltext_matches_on_sqlite(app):
+    from app.models import db, User, JobPosting
+    from app.fulltext import match_jobs, get_fulltext_backend
+    from app.search import FullTextSearchEngine
+
+    with app.app_context():
+        assert get_fulltext_backend().dialect == 'sqlite'
+
+        employer = User(username='ftsemployer', email='fts@test.com',
+                        password='password123', role='employer')
+        db.session.add(employer)
+        db.session.commit()
+
+        active = JobPosting(title='Senior Developer', description='Python services',
+                            company_name='Acme', location='Lagos',
+                            employer_id=employer.id, is_active=True)
+        hidden = JobPosting(title='Junior Developer', description='Draft role',
+                            company_name='Acme', location='Abuja',
+                            employer_id=employer.id, is_active=False)
+        db.session.add_all([active, hidden])
+        db.session.commit()
+
+        # Triggers keep the FTS table in sync, including prefix matches
+        assert JobPosting.query.filter(match_jobs('devel')).count() == 2
+        assert FullTextSearchEngine().search('developer lagos') == [active.id]
+
+        active.location = 'Remote'
+        db.session.commit()
+        assert FullTextSearchEngine().search('lagos') == []
+
+        db.session.delete(hidden)
+        db.session.commit()
+        assert JobPosting.query.filter(match_jobs('developer')).count() == 1
+
+
+def test_ranked_search_weights_fields_and_pages_by_cursor():
+    engine = InvertedIndexSearchEngine()
+    engine.index_job(make_job(1, 'Office Manager', description='Work with a python team'))
+    engine.index_job(make_job(2, 'Python Developer', description='Build services'))
+    engine.index_job(make_job(3, 'Analyst', company_name='Python Labs'))
+    for job_id in range(4, 10):
+        engine.index_job(make_job(job_id, 'Clerk', description=f'python scripting {job_id}'))
+
+    # A title match outranks a company match, which outranks a description match
+    hits, total = engine.ranked_search('python', 3)
+    assert total == 9
+    assert [job_id for _, job_id in hits[:2]] == [2, 3]
+
+    # Cursor windows walk the same order as offsets without repeating hits
+    first, _ = engine.ranked_search('python', 4)
+    second, _ = engine.ranked_search('python', 4, after=first[-1])
+    by_offset, _ = engine.ranked_search('python', 4, offset=4)
+    assert second == by_offset
+    assert not set(first) & set(second)
+
+
+def test_search_page_on_sqlite_fulltext(app, count_queries):
+    from app.models import db, User, JobPosting
+    from app.search import FullTextSearchEngine
+    from app.pagination import sign_total, load_total
+
+    with app.app_context():
+        app.extensions['job_search'] = FullTextSearchEngine()
+        employer = User(username='rankemployer', email='rank@test.com',
+                        password='password123', role='employer')
+        db.session.add(employer)
+        db.session.commit()
+
+        jobs = [JobPosting(title='Clerk', description=f'developer tooling {i}', company_name='Acme',
+                           location='Lagos', employer_id=employer.id, is_active=True)
+                for i in range(5)]
+        best = JobPosting(title='Developer', description='Backend', company_name='Acme',
+                          location='Lagos', employer_id=employer.id, is_active=True)
+        db.session.add_all(jobs + [best])
+        db.session.commit()
+
+        window = JobPosting.search_page('developer', per_page=4)
+        assert window.total == 6 and window.pages == 2
+        assert window.items[0] == best
+        assert window.next_cursor
+
+        # Later pages don't count the matches again; the total travels in the link
+        with count_queries() as statements:
+            following = JobPosting.search_page('developer', page=2, per_page=4, cursor=window.next_cursor,
+                                               total=window.total)
+        assert not [statement for statement in statements if 'count(' in statement.lower()]
+        assert following.total == 6 and not following.has_next
+        assert len(following.items) == 2
+        assert not set(window.items) & set(following.items)
+        assert JobPosting.search_page('developer', page=2, per_page=4).items == following.items
+
+        # The carried total is signed by the first page and bound to its query
+        token = sign_total(window.total, 'developer')
+        assert load_total(token, 'developer') == 6
+        assert load_total(token, 'designer') is None and load_total('1000000000', 'developer') is None
+
+
+def test_trigram_index_tolerates_typos():
+    from app.fuzzy import TrigramIndex
+
+    index = TrigramIndex()
+    index.index_job(make_job(1, 'Backend Developer', company_name='Acme', location='Lagos'))
+    index.index_job(make_job(2, 'Data Analyst', company_name='Numbers', location='Abuja'))
+
+    assert index.similar_words('devloper')[0][1] == 'developer'
+    hits, total = index.ranked_search('devloper lagso', 10)
+    assert total == 1 and hits[0][1] == 1
+    assert index.ranked_search('zzzz', 10) == ([], 0)
+
+    index.index_job(make_job(1, 'Backend Developer', is_active=False))
+    assert index.ranked_search('devloper', 10) == ([], 0)
+
+
+def test_search_page_falls_back_to_fuzzy_matches(app):
+    from app.models import db, User, JobPosting
+
+    with app.app_context():
+        employer = User(username='fuzzyemployer', email='fuzzy@test.com',
+                        password='password123', role='employer')
+        db.session.add(employer)
+        db.session.commit()
+        job = JobPosting(title='Backend Developer', description='APIs', company_name='Acme',
+                         location='Lagos', employer_id=employer.id, is_active=True)
+        db.session.add(job)
+        db.session.commit()
+        index_job(job)
+
+        exact = JobPosting.search_page('developer')
+        assert not exact.fuzzy and exact.items == [job]
+
+        window = JobPosting.search_page('devloper')
+        assert window.fuzzy and window.items == [job]
+        assert JobPosting.search_page('devloper', fuzzy_fallback=False).total == 0
+
+
+def test_suggestions_rank_by_frequency_and_follow_updates():
+    from app.autocomplete import SuggestionIndex
+
+    index = SuggestionIndex()
+    index.index_job(make_job(1, 'Senior Developer', company_name='Acme', location='Lagos'))
+    index.index_job(make_job(2, 'Senior  developer', company_name='Devon Ltd', location='Lagos'))
+    index.index_job(make_job(3, 'Data Analyst', location='Lekki'))
+
+    # Word starts match and the more common phrase comes first
+    suggestions = index.suggest('dev')
+    assert [s['text'] for s in suggestions] == ['Senior Developer', 'Devon Ltd']
+    assert suggestions[0]['count'] == 2
+    assert [s['text'] for s in index.suggest('l', kind='location')] == ['Lagos', 'Lekki']
+
+    # Long or unmatched prefixes are answered without being memoised
+    memoised = len(index._top)
+    assert [s['text'] for s in index.suggest('develop')] == ['Senior Developer']
+    assert index.suggest('zzq') == [] and index.suggest('x' * 40) == []
+    assert len(index._top) == memoised
+
+    # Deactivating and deleting jobs refreshes the memoised prefixes
+    index.index_job(make_job(2, 'Senior Developer', is_active=False))
+    assert [s['count'] for s in index.suggest('dev')] == [1]
+    index.remove_job(1)
+    assert index.suggest('dev') == []
+
+
+def test_autocomplete_endpoint(client):
+    response = client.get('/autocomplete?q=dev&limit=5')
+    assert response.status_code == 200
+    assert response.get_json() == {'query': 'dev', 'suggestions': []}